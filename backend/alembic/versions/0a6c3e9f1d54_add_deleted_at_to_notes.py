@@ -0,0 +1,61 @@
+"""add soft delete (trash) to notes with partial indexes
+
+Revision ID: 0a6c3e9f1d54
+Revises: f2a7d4e81c39
+Create Date: 2026-10-17 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0a6c3e9f1d54'
+down_revision: Union[str, None] = 'f2a7d4e81c39'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+LIVE = sa.text('deleted_at IS NULL')
+
+
+def upgrade() -> None:
+    op.add_column('notes', sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True))
+
+    # Sibling ordering indexes only cover live notes, so trashed rows cost
+    # list/page/reorder queries nothing (they all filter deleted_at IS NULL)
+    op.drop_index('idx_notes_parent_position_created', table_name='notes')
+    op.create_index(
+        'idx_notes_parent_position_created',
+        'notes',
+        ['parent_id', 'position', sa.text('created_at DESC'), 'id'],
+        postgresql_where=LIVE,
+        sqlite_where=LIVE,
+    )
+    op.drop_index('idx_notes_parent_rank', table_name='notes')
+    op.create_index(
+        'idx_notes_parent_rank', 'notes', ['parent_id', 'rank'], postgresql_where=LIVE, sqlite_where=LIVE
+    )
+    # Trash listing, restore and the purge worker only look at trashed rows
+    op.create_index(
+        'idx_notes_deleted_at',
+        'notes',
+        ['deleted_at'],
+        postgresql_where=sa.text('deleted_at IS NOT NULL'),
+        sqlite_where=sa.text('deleted_at IS NOT NULL'),
+    )
+
+
+def downgrade() -> None:
+    op.execute('DELETE FROM notes WHERE deleted_at IS NOT NULL')
+    op.drop_index('idx_notes_deleted_at', table_name='notes')
+    op.drop_index('idx_notes_parent_rank', table_name='notes')
+    op.create_index('idx_notes_parent_rank', 'notes', ['parent_id', 'rank'])
+    op.drop_index('idx_notes_parent_position_created', table_name='notes')
+    op.create_index(
+        'idx_notes_parent_position_created',
+        'notes',
+        ['parent_id', 'position', sa.text('created_at DESC'), 'id'],
+    )
+    op.drop_column('notes', 'deleted_at')
@@ -0,0 +1,35 @@
+"""add note revision history (compressed deltas and snapshots)
+
+Revision ID: 1b8e5f2c7a90
+Revises: 0a6c3e9f1d54
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1b8e5f2c7a90'
+down_revision: Union[str, None] = '0a6c3e9f1d54'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The (note_id, version) primary key serves both listing and the
+    # "nearest snapshot at or below version" lookup
+    op.create_table(
+        'note_revisions',
+        sa.Column('note_id', sa.String(length=36), sa.ForeignKey('notes.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('version', sa.Integer(), primary_key=True),
+        sa.Column('kind', sa.String(length=8), nullable=False),
+        sa.Column('data', sa.LargeBinary(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('note_revisions')
@@ -0,0 +1,31 @@
+"""add composite sort index for keyset pagination
+
+Revision ID: 3f1c2a7d9e41
+Revises: 8b7f28de9c38
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1c2a7d9e41'
+down_revision: Union[str, None] = '8b7f28de9c38'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Matches the list ordering so keyset pages are a single index range scan
+    op.create_index(
+        'idx_notes_parent_position_created',
+        'notes',
+        ['parent_id', 'position', sa.text('created_at DESC'), 'id'],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('idx_notes_parent_position_created', table_name='notes')
@@ -0,0 +1,33 @@
+"""add table_revisions change counter
+
+Revision ID: 5a0e6b2c4d17
+Revises: 3f1c2a7d9e41
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5a0e6b2c4d17'
+down_revision: Union[str, None] = '3f1c2a7d9e41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    table = op.create_table(
+        'table_revisions',
+        sa.Column('name', sa.String(length=64), primary_key=True),
+        sa.Column('revision', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+    # Seed the notes counter so writes only ever need an UPDATE
+    op.bulk_insert(table, [{'name': 'notes', 'revision': 0}])
+
+
+def downgrade() -> None:
+    op.drop_table('table_revisions')
@@ -0,0 +1,62 @@
+"""add fractional rank to notes
+
+Revision ID: 7c9d1e3f5a62
+Revises: 5a0e6b2c4d17
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from itertools import groupby
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c9d1e3f5a62'
+down_revision: Union[str, None] = '5a0e6b2c4d17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+
+
+def spread_ranks(count: int) -> list[str]:
+    """`count` evenly spaced base-36 ranks (frozen copy of the app helper at this revision)."""
+    base = len(DIGITS)
+    width = 1
+    while base**width <= count:
+        width += 1
+    step = base**width // (count + 1)
+    ranks = []
+    for i in range(1, count + 1):
+        value = i * step
+        digits = []
+        for _ in range(width):
+            value, digit = divmod(value, base)
+            digits.append(DIGITS[digit])
+        ranks.append(''.join(reversed(digits)).rstrip('0'))
+    return ranks
+
+
+def upgrade() -> None:
+    op.add_column('notes', sa.Column('rank', sa.String(length=64), nullable=True))
+    op.create_index('idx_notes_parent_rank', 'notes', ['parent_id', 'rank'])
+
+    # Backfill ranks from the existing integer positions, per sibling group
+    conn = op.get_bind()
+    rows = conn.execute(
+        sa.text("SELECT id, parent_id FROM notes ORDER BY parent_id NULLS FIRST, position, created_at, id")
+    ).all()
+    updates = []
+    for _, group in groupby(rows, key=lambda row: row.parent_id):
+        siblings = list(group)
+        for row, rank in zip(siblings, spread_ranks(len(siblings))):
+            updates.append({'id': row.id, 'rank': rank})
+    if updates:
+        conn.execute(sa.text("UPDATE notes SET rank = :rank WHERE id = :id"), updates)
+
+
+def downgrade() -> None:
+    op.drop_index('idx_notes_parent_rank', table_name='notes')
+    op.drop_column('notes', 'rank')
@@ -0,0 +1,51 @@
+"""add materialized path to notes
+
+Revision ID: 9e2f4a6b8c03
+Revises: 7c9d1e3f5a62
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e2f4a6b8c03'
+down_revision: Union[str, None] = '7c9d1e3f5a62'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('notes', sa.Column('path', sa.Text(), nullable=True))
+
+    # Backfill from the parent map; resolved top-down so each path is built once
+    conn = op.get_bind()
+    parent_of = dict(conn.execute(sa.text("SELECT id, parent_id FROM notes")).all())
+    paths: dict[str, str] = {}
+    for note_id in parent_of:
+        chain = []
+        current = note_id
+        while current is not None and current not in paths:
+            chain.append(current)
+            current = parent_of.get(current)
+        prefix = paths[current] if current is not None else "/"
+        for ancestor_id in reversed(chain):
+            prefix = f"{prefix}{ancestor_id}/"
+            paths[ancestor_id] = prefix
+    if paths:
+        conn.execute(
+            sa.text("UPDATE notes SET path = :path WHERE id = :id"),
+            [{'id': note_id, 'path': path} for note_id, path in paths.items()],
+        )
+
+    op.alter_column('notes', 'path', nullable=False)
+    # text_pattern_ops lets PostgreSQL serve "path LIKE 'prefix%'" from the index
+    op.create_index('idx_notes_path', 'notes', ['path'], postgresql_ops={'path': 'text_pattern_ops'})
+
+
+def downgrade() -> None:
+    op.drop_index('idx_notes_path', table_name='notes')
+    op.drop_column('notes', 'path')
@@ -0,0 +1,39 @@
+"""add full-text search index to notes
+
+Revision ID: b41d7e9a2f58
+Revises: 9e2f4a6b8c03
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from app.models.search import POSTGRES_SEARCH_DDL, SQLITE_SEARCH_DDL
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b41d7e9a2f58'
+down_revision: Union[str, None] = '9e2f4a6b8c03'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        for statement in POSTGRES_SEARCH_DDL:
+            op.execute(statement)
+    else:
+        for statement in SQLITE_SEARCH_DDL:
+            op.execute(statement)
+        op.execute("INSERT INTO notes_fts(notes_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_index('idx_notes_search_vector', table_name='notes')
+        op.drop_column('notes', 'search_vector')
+    else:
+        for trigger in ('notes_fts_insert', 'notes_fts_delete', 'notes_fts_update'):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS notes_fts")
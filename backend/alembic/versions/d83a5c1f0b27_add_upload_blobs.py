@@ -0,0 +1,48 @@
+"""add content-addressed upload blobs and note references
+
+Revision ID: d83a5c1f0b27
+Revises: b41d7e9a2f58
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd83a5c1f0b27'
+down_revision: Union[str, None] = 'b41d7e9a2f58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'upload_blobs',
+        sa.Column('sha256', sa.String(length=64), primary_key=True),
+        sa.Column('path', sa.String(length=255), nullable=False),
+        sa.Column('size', sa.BigInteger(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column('last_uploaded_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+    # GC scans unreferenced blobs oldest first
+    op.create_index('idx_upload_blobs_last_uploaded_at', 'upload_blobs', ['last_uploaded_at'])
+
+    op.create_table(
+        'note_uploads',
+        sa.Column('note_id', sa.String(length=36), sa.ForeignKey('notes.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column(
+            'sha256', sa.String(length=64), sa.ForeignKey('upload_blobs.sha256', ondelete='CASCADE'), primary_key=True
+        ),
+    )
+    # Reference counts / "is this blob used anywhere" look up by blob
+    op.create_index('idx_note_uploads_sha256', 'note_uploads', ['sha256'])
+
+
+def downgrade() -> None:
+    op.drop_index('idx_note_uploads_sha256', table_name='note_uploads')
+    op.drop_table('note_uploads')
+    op.drop_index('idx_upload_blobs_last_uploaded_at', table_name='upload_blobs')
+    op.drop_table('upload_blobs')
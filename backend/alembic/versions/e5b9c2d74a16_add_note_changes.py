@@ -0,0 +1,35 @@
+"""add note change log for incremental sync
+
+Revision ID: e5b9c2d74a16
+Revises: d83a5c1f0b27
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5b9c2d74a16'
+down_revision: Union[str, None] = 'd83a5c1f0b27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'note_changes',
+        sa.Column('seq', sa.BigInteger(), sa.Identity(), primary_key=True),
+        sa.Column('note_id', sa.String(length=36), nullable=False),
+        sa.Column('op', sa.String(length=8), nullable=False),
+        sa.Column('changed_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+    # Retention pruning deletes the oldest entries by age
+    op.create_index('idx_note_changes_changed_at', 'note_changes', ['changed_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('idx_note_changes_changed_at', table_name='note_changes')
+    op.drop_table('note_changes')
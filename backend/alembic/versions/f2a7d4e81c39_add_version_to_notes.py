@@ -0,0 +1,26 @@
+"""add version counter to notes for patch updates
+
+Revision ID: f2a7d4e81c39
+Revises: e5b9c2d74a16
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2a7d4e81c39'
+down_revision: Union[str, None] = 'e5b9c2d74a16'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('notes', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('notes', 'version')
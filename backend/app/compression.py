@@ -0,0 +1,187 @@
+"""gzip/brotli response compression.
+
+Like Starlette's GZipMiddleware, but negotiates brotli or gzip from
+Accept-Encoding (q-values honoured), leaves small bodies, non-text types,
+partial content and already-encoded responses alone, and sync-flushes each
+chunk of a streaming body so NDJSON exports still arrive incrementally.
+"""
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli  # type: ignore[import-untyped]
+except ImportError:  # gzip only
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+)
+# Compressing these would hold back events until the compressor flushes
+UNCOMPRESSED_TYPES = ("text/event-stream",)
+
+
+def accepted_encodings(request_headers: Headers) -> set[str]:
+    """Content codings the client accepts (q=0 entries excluded)."""
+    accepted = set()
+    for item in request_headers.get("accept-encoding", "").split(","):
+        name, _, params = item.partition(";")
+        _, _, quality = params.partition("q=")
+        try:
+            if quality and float(quality) == 0:
+                continue
+        except ValueError:
+            continue
+        accepted.add(name.strip().lower())
+    return accepted
+
+
+class _GzipCompressor:
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class _BrotliCompressor:
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class CompressionMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        encodings: tuple[str, ...] = ("br", "gzip"),
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+    ) -> None:
+        self.app = app
+        # Preference order; br is dropped when the brotli package is missing
+        self.encodings = tuple(name for name in encodings if name == "gzip" or (name == "br" and brotli is not None))
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def _compressor(self, encoding: str) -> _GzipCompressor | _BrotliCompressor:
+        if encoding == "br":
+            return _BrotliCompressor(self.brotli_quality)
+        return _GzipCompressor(self.gzip_level)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http":
+            accepted = accepted_encodings(Headers(scope=scope))
+            encoding = next((name for name in self.encodings if name in accepted), None)
+            if encoding is not None:
+                responder = _CompressionResponder(self.app, encoding, self._compressor(encoding), self.minimum_size)
+                await responder(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+
+class _CompressionResponder:
+    def __init__(self, app: ASGIApp, encoding: str, compressor, minimum_size: int) -> None:
+        self.app = app
+        self.encoding = encoding
+        self.compressor = compressor
+        self.minimum_size = minimum_size
+        self.send: Send | None = None
+        self.initial_message: Message = {}
+        self.started = False
+        self.passthrough = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        await self.app(scope, receive, self.send_compressed)
+
+    def _should_skip(self, message: Message) -> bool:
+        headers = Headers(raw=message["headers"])
+        content_type = headers.get("content-type", "")
+        return (
+            "content-encoding" in headers
+            or "content-range" in headers
+            or message["status"] in (204, 206, 304)
+            or "no-transform" in headers.get("cache-control", "")
+            or content_type.startswith(UNCOMPRESSED_TYPES)
+            or not content_type.startswith(COMPRESSIBLE_TYPES)
+        )
+
+    def _encoded_headers(self) -> MutableHeaders:
+        headers = MutableHeaders(raw=self.initial_message["headers"])
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        # A strong validator names the identity bytes, not the encoded ones
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            headers["ETag"] = f"W/{etag}"
+        return headers
+
+    async def send_compressed(self, message: Message) -> None:
+        assert self.send is not None
+        if message["type"] == "http.response.start":
+            # Held back until the first body chunk decides how to encode
+            self.initial_message = message
+            self.passthrough = self._should_skip(message)
+            return
+        if message["type"] != "http.response.body":
+            # e.g. http.response.pathsend from UploadFiles: pass through untouched
+            if not self.started:
+                self.started = True
+                await self.send(self.initial_message)
+            await self.send(message)
+            return
+        if self.passthrough:
+            if not self.started:
+                self.started = True
+                await self.send(self.initial_message)
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if not self.started:
+            self.started = True
+            if len(body) < self.minimum_size and not more_body:
+                await self.send(self.initial_message)
+                await self.send(message)
+                self.passthrough = True
+                return
+            headers = self._encoded_headers()
+            if more_body:
+                del headers["Content-Length"]
+                message["body"] = self.compressor.compress(body) + self.compressor.flush()
+            else:
+                message["body"] = self.compressor.compress(body) + self.compressor.finish()
+                headers["Content-Length"] = str(len(message["body"]))
+            await self.send(self.initial_message)
+            await self.send(message)
+            return
+
+        if more_body:
+            message["body"] = self.compressor.compress(body) + self.compressor.flush()
+        else:
+            message["body"] = self.compressor.compress(body) + self.compressor.finish()
+        await self.send(message)
@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -5,11 +7,97 @@ class Settings(BaseSettings):
     database_url: str
     cors_origins: str = "http://localhost:3000"
 
+    # "sync": psycopg2 Session, each DB call on a threadpool worker.
+    # "async": asyncpg AsyncSession, DB calls awaited on the event loop.
+    database_mode: Literal["sync", "async"] = "sync"
+
+    # Connection pool (PostgreSQL). DB_POOL_RECYCLE is in seconds, -1 disables it.
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    # Per-statement timeout in milliseconds; 0 leaves the server default
+    db_statement_timeout_ms: int = 0
+    # Running behind PgBouncer in transaction mode: no server-side prepared
+    # statements and no startup options, so the timeout is set per transaction
+    db_pgbouncer: bool = False
+
+    # Read cache in front of NoteService: "memory" (per process), "redis" or "none".
+    # NoteService calls the cache synchronously, so with DATABASE_MODE=async the
+    # redis client's round trips block the event loop: prefer memory there
+    note_cache_backend: str = "memory"
+    note_cache_max_entries: int = 1024
+    note_cache_ttl_seconds: int = 30
+    redis_url: str | None = None
+
+    # DELETE behaviour: "hard" removes the subtree at once; "trash" sets deleted_at
+    # and a background worker purges it after TRASH_RETENTION_DAYS, in batches
+    delete_mode: Literal["hard", "trash"] = "hard"
+    trash_retention_days: int = 30
+    trash_purge_interval_seconds: int = 300
+
+    # Autosave write coalescing (PATCH /api/notes/{id}/autosave): a note's buffered
+    # edits are written once it is idle this long, or at most max delay after the
+    # first; the buffer is per process, so 0 (write through) behind several
+    # workers without sticky routing. A note's edit that fails max attempts
+    # writes in a row is dropped (and logged)
+    autosave_idle_ms: int = 750
+    autosave_max_delay_ms: int = 5000
+    autosave_max_pending: int = 500
+    autosave_max_attempts: int = 20
+
+    # Push channel for GET /api/notes/events: "memory" (per process), "postgres"
+    # (LISTEN/NOTIFY, reaches every worker) or "none"
+    note_events_backend: str = "memory"
+
+    # Orphaned upload sweep: how often it runs (0 disables) and how long an
+    # unreferenced blob is kept after its last upload (it may not be saved yet)
+    upload_gc_interval_seconds: int = 3600
+    upload_gc_grace_seconds: int = 86400
+    # The same sweep removes resumable upload sessions (and stray temp files)
+    # nobody has written to for this long
+    upload_session_ttl_seconds: int = 86400
+
+    # How long GET /api/notes/changes can look back; older tokens get 410 and
+    # the client reloads everything (0 keeps the change log forever)
+    change_log_retention_days: int = 30
+
+    # Response compression: encodings in preference order ("" disables), bodies
+    # below the minimum size are sent as-is
+    compression_encodings: str = "br,gzip"
+    compression_minimum_size: int = 1024
+    compression_gzip_level: int = 6
+    compression_brotli_quality: int = 4
+
+    # Worker processes encoding image thumbnails/WebP/AVIF (0 disables derivatives)
+    image_workers: int = 2
+
+    # Sibling ordering: "position" (dense integers) or "rank" (fractional keys,
+    # single-row moves). Run POST /api/notes/ranks/rebuild before switching to rank.
+    ordering_mode: Literal["position", "rank"] = "position"
+
     model_config = SettingsConfigDict(env_file=".env")
 
     @property
     def cors_origins_list(self) -> list[str]:
         return [origin.strip() for origin in self.cors_origins.split(",")]
 
+    @property
+    def compression_encodings_list(self) -> list[str]:
+        return [name.strip() for name in self.compression_encodings.split(",") if name.strip()]
+
+    @property
+    def async_database_url(self) -> str:
+        """DATABASE_URL with its driver swapped for the asyncio one."""
+        for prefix, async_prefix in (
+            ("postgresql+psycopg2://", "postgresql+asyncpg://"),
+            ("postgresql://", "postgresql+asyncpg://"),
+            ("sqlite://", "sqlite+aiosqlite://"),
+        ):
+            if self.database_url.startswith(prefix):
+                return async_prefix + self.database_url[len(prefix):]
+        return self.database_url
+
 
 settings = Settings()
@@ -1,13 +1,69 @@
-from collections.abc import Generator
+from collections.abc import AsyncGenerator, Generator
+from typing import Any
 
-from sqlalchemy import create_engine
+from sqlalchemy import Engine, create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import Session, declarative_base, sessionmaker
 
 from app.config import settings
+from app.pooling import TimedAsyncQueuePool, TimedQueuePool, pool_stats
 
-engine = create_engine(settings.database_url)
+
+def _engine_options(url: str, is_async: bool = False) -> dict[str, Any]:
+    """Pool and connection settings for create_engine / create_async_engine."""
+    if not url.startswith("postgresql"):
+        return {}
+    options: dict[str, Any] = {
+        "poolclass": TimedAsyncQueuePool if is_async else TimedQueuePool,
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+    connect_args: dict[str, Any] = {}
+    if settings.db_pgbouncer:
+        if is_async:
+            # PgBouncer may hand each transaction a different server connection
+            connect_args["statement_cache_size"] = 0
+            connect_args["prepared_statement_cache_size"] = 0
+    elif settings.db_statement_timeout_ms:
+        if is_async:
+            connect_args["server_settings"] = {"statement_timeout": str(settings.db_statement_timeout_ms)}
+        else:
+            connect_args["options"] = f"-c statement_timeout={settings.db_statement_timeout_ms}"
+    if connect_args:
+        options["connect_args"] = connect_args
+    return options
+
+
+def _set_local_statement_timeout(engine: Engine) -> None:
+    """SET LOCAL the timeout at each BEGIN (PgBouncer rejects startup options)."""
+    statement = f"SET LOCAL statement_timeout = {int(settings.db_statement_timeout_ms)}"
+
+    @event.listens_for(engine, "begin")
+    def _on_begin(connection) -> None:
+        connection.exec_driver_sql(statement)
+
+
+engine = create_engine(settings.database_url, **_engine_options(settings.database_url))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Only built in async mode so the asyncpg driver stays optional otherwise
+async_engine = (
+    create_async_engine(settings.async_database_url, **_engine_options(settings.async_database_url, is_async=True))
+    if settings.database_mode == "async"
+    else None
+)
+AsyncSessionLocal = (
+    async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False) if async_engine is not None else None
+)
+
+if settings.db_pgbouncer and settings.db_statement_timeout_ms and engine.dialect.name == "postgresql":
+    _set_local_statement_timeout(engine)
+    if async_engine is not None:
+        _set_local_statement_timeout(async_engine.sync_engine)
+
 Base = declarative_base()
 
 
@@ -17,3 +73,18 @@ def get_db() -> Generator[Session, None, None]:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    if AsyncSessionLocal is None:
+        raise RuntimeError("get_async_db requires DATABASE_MODE=async")
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def get_pool_stats() -> dict[str, Any]:
+    """Checked-out/overflow connections and checkout wait times per engine."""
+    stats = {"sync": pool_stats(engine.pool, max_overflow=settings.db_max_overflow)}
+    if async_engine is not None:
+        stats["async"] = pool_stats(async_engine.pool, max_overflow=settings.db_max_overflow)
+    return stats
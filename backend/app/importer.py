@@ -0,0 +1,111 @@
+"""Bulk-import notes from a nested JSON file or a directory of Markdown files.
+
+    python -m app.importer export.json
+    python -m app.importer ./wiki --parent-id <note-id>
+
+JSON input is a list of {"title", "content", "sidenote", "children": [...]}
+objects (or {"notes": [...]}). In a Markdown directory every `*.md` file is
+a page and every subdirectory is a page whose children are its contents; a
+`<dir>.md` next to it or an `index.md` inside it provides that page's body.
+A leading `# Heading` line becomes the title, otherwise the file name does.
+"""
+import argparse
+import json
+import time
+from pathlib import Path
+
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.schemas.note import NoteImportNode
+from app.services.cache import build_note_cache
+from app.services.events import build_note_events
+from app.services.note_service import NoteService
+
+INDEX_FILES = ("index.md", "README.md")
+
+
+def load_json(path: Path) -> list[NoteImportNode]:
+    data = json.loads(path.read_text(encoding="utf-8"))
+    if isinstance(data, dict):
+        data = data.get("notes", [])
+    return [NoteImportNode.model_validate(item) for item in data]
+
+
+def _parse_markdown(text: str, fallback_title: str) -> tuple[str, str | None]:
+    lines = text.splitlines()
+    for index, line in enumerate(lines):
+        if not line.strip():
+            continue
+        if line.startswith("# "):
+            body = "\n".join(lines[index + 1:]).strip()
+            return line[2:].strip(), body or None
+        break
+    return fallback_title, text.strip() or None
+
+
+def load_markdown_dir(directory: Path, skip: frozenset[str] = frozenset()) -> list[NoteImportNode]:
+    nodes: list[NoteImportNode] = []
+    entries = sorted(directory.iterdir(), key=lambda entry: entry.name.lower())
+    subdirs = {entry.name for entry in entries if entry.is_dir()}
+    for entry in entries:
+        if entry.name.startswith(".") or entry.name in skip:
+            continue
+        if entry.is_dir():
+            sibling = directory / f"{entry.name}.md"
+            index = next((entry / name for name in INDEX_FILES if (entry / name).is_file()), None)
+            body_file = sibling if sibling.is_file() else index
+            title, content = entry.name, None
+            if body_file is not None:
+                title, content = _parse_markdown(body_file.read_text(encoding="utf-8"), entry.name)
+            # An index file used as this page's body is not also a child page
+            inner_skip = frozenset({index.name}) if index is not None and body_file == index else frozenset()
+            nodes.append(NoteImportNode(title=title, content=content, children=load_markdown_dir(entry, inner_skip)))
+        elif entry.suffix.lower() == ".md" and entry.stem not in subdirs:
+            title, content = _parse_markdown(entry.read_text(encoding="utf-8"), entry.stem)
+            nodes.append(NoteImportNode(title=title, content=content))
+    return nodes
+
+
+def _count(nodes: list[NoteImportNode]) -> int:
+    return sum(1 + _count(node.children) for node in nodes)
+
+
+def _note_service(db: Session) -> NoteService:
+    """A NoteService configured like the API's, so ranks, cache keys and events match."""
+    return NoteService(
+        db,
+        cache=build_note_cache(
+            settings.note_cache_backend,
+            max_entries=settings.note_cache_max_entries,
+            ttl=settings.note_cache_ttl_seconds,
+            redis_url=settings.redis_url,
+        ),
+        ordering_mode=settings.ordering_mode,
+        events=build_note_events(settings.note_events_backend, settings.database_url),
+        delete_mode=settings.delete_mode,
+    )
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("source", type=Path, help="JSON file or Markdown directory")
+    parser.add_argument("--parent-id", default=None, help="Import under this note instead of the root")
+    args = parser.parse_args(argv)
+
+    nodes = load_markdown_dir(args.source) if args.source.is_dir() else load_json(args.source)
+    print(f"Parsed {_count(nodes)} notes from {args.source}")
+
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        result = _note_service(db).bulk_import(nodes, parent_id=args.parent_id)
+        elapsed = time.perf_counter() - started
+    finally:
+        db.close()
+    print(f"Imported {result.created} notes in {elapsed:.2f}s ({result.created / max(elapsed, 1e-9):,.0f} notes/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,56 @@
+import asyncio
+from contextlib import asynccontextmanager
 from pathlib import Path
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 
+from app.compression import CompressionMiddleware
 from app.config import settings
+from app.database import get_pool_stats
 from app.routers import notes, uploads
+from app.static_files import UploadFiles
 
 # Ensure uploads directory exists
 UPLOAD_DIR = Path("/app/uploads")
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    gc_task = asyncio.create_task(uploads.upload_gc_loop()) if settings.upload_gc_interval_seconds > 0 else None
+    prune_task = asyncio.create_task(notes.change_log_prune_loop()) if settings.change_log_retention_days > 0 else None
+    purge_task = asyncio.create_task(notes.trash_purge_loop()) if settings.delete_mode == "trash" else None
+    if notes.note_events is not None:
+        await notes.note_events.start()
+    if settings.autosave_idle_ms > 0:
+        await notes.autosave.start()
+    yield
+    # Buffered autosaves are written before anything they depend on goes away
+    await notes.autosave.stop()
+    if notes.note_events is not None:
+        await notes.note_events.stop()
+    for task in (gc_task, prune_task, purge_task):
+        if task is not None:
+            task.cancel()
+    uploads.image_pipeline.shutdown()
+
+
 app = FastAPI(
     title="Notes API",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
+if settings.compression_encodings_list:
+    app.add_middleware(
+        CompressionMiddleware,
+        encodings=tuple(settings.compression_encodings_list),
+        minimum_size=settings.compression_minimum_size,
+        gzip_level=settings.compression_gzip_level,
+        brotli_quality=settings.compression_brotli_quality,
+    )
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.cors_origins_list,
@@ -27,10 +62,16 @@ app.add_middleware(
 app.include_router(notes.router, prefix="/api/notes", tags=["notes"])
 app.include_router(uploads.router, prefix="/api/uploads", tags=["uploads"])
 
-# Serve uploaded files
-app.mount("/uploads", StaticFiles(directory=str(UPLOAD_DIR)), name="uploads")
+# Serve uploaded files (immutable cache headers, ranges, precompressed SVG)
+app.mount("/uploads", UploadFiles(directory=str(UPLOAD_DIR)), name="uploads")
 
 
 @app.get("/health")
 def health_check():
     return {"status": "ok"}
+
+
+@app.get("/health/db-pool")
+def db_pool_health():
+    """Connection pool occupancy and checkout wait times (is get_db queueing?)."""
+    return get_pool_stats()
@@ -1,3 +1,8 @@
+from app.models.change import NoteChange
+from app.models.history import NoteRevision
 from app.models.note import Note
+from app.models.revision import TableRevision
+from app.models.upload import NoteUpload, UploadBlob
+from app.models import search  # noqa: F401  (registers full-text index DDL)
 
-__all__ = ["Note"]
+__all__ = ["Note", "TableRevision", "UploadBlob", "NoteUpload", "NoteChange", "NoteRevision"]
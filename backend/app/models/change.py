@@ -0,0 +1,26 @@
+from datetime import datetime
+
+from sqlalchemy import BigInteger, DateTime, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+from app.models.note import utc_now
+
+
+class NoteChange(Base):
+    """Append-only log of note writes, read by GET /api/notes/changes.
+
+    One row per note touched by a transaction: op "upsert" (created or
+    changed) or "delete" (a tombstone, since deleted rows leave nothing to
+    diff against). `seq` is the change token clients sync from. Rows are
+    written while the transaction holds the notes table_revisions row lock,
+    so seq order is commit order and a token never skips an in-flight write.
+    No foreign key: tombstones outlive their notes.
+    """
+
+    __tablename__ = "note_changes"
+
+    seq: Mapped[int] = mapped_column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    note_id: Mapped[str] = mapped_column(String(36), nullable=False)
+    op: Mapped[str] = mapped_column(String(8), nullable=False)
+    changed_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utc_now)
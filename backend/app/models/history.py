@@ -0,0 +1,24 @@
+from datetime import datetime
+
+from sqlalchemy import DateTime, ForeignKey, Integer, LargeBinary, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+from app.models.note import utc_now
+
+
+class NoteRevision(Base):
+    """One version of a note's title/content/sidenote, read by GET /api/notes/{id}/history.
+
+    `version` matches Note.version at the time of the write. `kind` is
+    "snapshot" (the full fields) or "delta" (changes against version - 1);
+    `data` is zlib-compressed JSON, see app.services.history.
+    """
+
+    __tablename__ = "note_revisions"
+
+    note_id: Mapped[str] = mapped_column(String(36), ForeignKey("notes.id", ondelete="CASCADE"), primary_key=True)
+    version: Mapped[int] = mapped_column(Integer, primary_key=True)
+    kind: Mapped[str] = mapped_column(String(8), nullable=False)
+    data: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utc_now)
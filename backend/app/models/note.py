@@ -20,6 +20,14 @@ class Note(Base):
     sidenote: Mapped[str | None] = mapped_column(Text, nullable=True)
     parent_id: Mapped[str | None] = mapped_column(String(36), ForeignKey("notes.id", ondelete="CASCADE"), nullable=True)
     position: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    # Fractional sort key, used instead of position when ORDERING_MODE=rank
+    rank: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    # Materialized ancestry "/<root id>/.../<own id>/", kept in sync on every move
+    path: Mapped[str] = mapped_column(Text, nullable=False)
+    # Bumped on every title/content/sidenote write; clients send it back for optimistic concurrency
+    version: Mapped[int] = mapped_column(Integer, default=1, nullable=False)
+    # Set when the note (or an ancestor) is moved to the trash; purged later
+    deleted_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utc_now)
     updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utc_now, onupdate=utc_now)
 
@@ -28,6 +36,8 @@ class Note(Base):
         "Note",
         back_populates="parent",
         cascade="all, delete-orphan",
+        # Subtrees are deleted by the database (ON DELETE CASCADE) or by path, never loaded for it
+        passive_deletes=True,
         order_by="Note.position",
     )
     parent: Mapped["Note | None"] = relationship(
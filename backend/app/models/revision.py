@@ -0,0 +1,21 @@
+from datetime import datetime
+
+from sqlalchemy import DateTime, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+from app.models.note import utc_now
+
+
+class TableRevision(Base):
+    """Monotonic per-table write counter used as a cheap change token.
+
+    Bumped in the same transaction as every write to the table, so it also
+    reflects deletes (which leave no updated_at behind).
+    """
+
+    __tablename__ = "table_revisions"
+
+    name: Mapped[str] = mapped_column(String(64), primary_key=True)
+    revision: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utc_now, onupdate=utc_now)
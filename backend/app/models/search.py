@@ -0,0 +1,54 @@
+"""Full-text search index DDL for the notes table.
+
+PostgreSQL: a generated, weighted `search_vector` tsvector column with a GIN
+index (created by Alembic; not mapped on the model so other dialects can
+still create the table). SQLite: an external-content FTS5 table kept in sync
+by triggers, created alongside `notes` so in-memory test databases get it.
+"""
+from sqlalchemy import DDL, event
+
+from app.models.note import Note
+
+SEARCH_CONFIG = "english"
+
+POSTGRES_SEARCH_DDL = [
+    f"""
+    ALTER TABLE notes ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(content, '')), 'B') ||
+        setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(sidenote, '')), 'C')
+    ) STORED
+    """,
+    "CREATE INDEX idx_notes_search_vector ON notes USING GIN (search_vector)",
+]
+
+SQLITE_SEARCH_DDL = [
+    """
+    CREATE VIRTUAL TABLE notes_fts USING fts5(
+        title, content, sidenote, content='notes', content_rowid='rowid'
+    )
+    """,
+    """
+    CREATE TRIGGER notes_fts_insert AFTER INSERT ON notes BEGIN
+        INSERT INTO notes_fts(rowid, title, content, sidenote)
+        VALUES (new.rowid, new.title, new.content, new.sidenote);
+    END
+    """,
+    """
+    CREATE TRIGGER notes_fts_delete AFTER DELETE ON notes BEGIN
+        INSERT INTO notes_fts(notes_fts, rowid, title, content, sidenote)
+        VALUES ('delete', old.rowid, old.title, old.content, old.sidenote);
+    END
+    """,
+    """
+    CREATE TRIGGER notes_fts_update AFTER UPDATE OF title, content, sidenote ON notes BEGIN
+        INSERT INTO notes_fts(notes_fts, rowid, title, content, sidenote)
+        VALUES ('delete', old.rowid, old.title, old.content, old.sidenote);
+        INSERT INTO notes_fts(rowid, title, content, sidenote)
+        VALUES (new.rowid, new.title, new.content, new.sidenote);
+    END
+    """,
+]
+
+for statement in SQLITE_SEARCH_DDL:
+    event.listen(Note.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
@@ -0,0 +1,39 @@
+from datetime import datetime
+
+from sqlalchemy import BigInteger, DateTime, ForeignKey, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+from app.models.note import utc_now
+
+
+class UploadBlob(Base):
+    """One stored file, addressed by the SHA-256 of its bytes.
+
+    The file lives at `<upload dir>/<path>` where path is "ab/cd/<sha256><ext>".
+    Identical uploads share a blob; `last_uploaded_at` restarts the GC grace
+    period each time someone uploads it again.
+    """
+
+    __tablename__ = "upload_blobs"
+
+    sha256: Mapped[str] = mapped_column(String(64), primary_key=True)
+    path: Mapped[str] = mapped_column(String(255), nullable=False)
+    size: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utc_now)
+    last_uploaded_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utc_now)
+
+
+class NoteUpload(Base):
+    """A note's content or sidenote links to a blob (one row per pair).
+
+    The number of rows for a blob is its reference count; blobs with none
+    are garbage-collected once their grace period has passed.
+    """
+
+    __tablename__ = "note_uploads"
+
+    note_id: Mapped[str] = mapped_column(String(36), ForeignKey("notes.id", ondelete="CASCADE"), primary_key=True)
+    sha256: Mapped[str] = mapped_column(
+        String(64), ForeignKey("upload_blobs.sha256", ondelete="CASCADE"), primary_key=True
+    )
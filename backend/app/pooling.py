@@ -0,0 +1,99 @@
+"""Connection pool classes that record how long checkouts wait.
+
+`get_db` blocks in QueuePool when every connection is checked out; these
+subclasses time that wait so /health/db-pool can show when requests are
+queueing for a connection rather than for the database itself.
+"""
+import threading
+import time
+from typing import Any
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+# Checkouts that waited longer than this count as "slow" (pool exhausted)
+SLOW_CHECKOUT_SECONDS = 0.1
+
+
+class PoolMetrics:
+    """Thread-safe counters for connection checkouts."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.checkouts = 0
+            self.slow_checkouts = 0
+            self.timeouts = 0
+            self.wait_total = 0.0
+            self.wait_max = 0.0
+
+    def record(self, waited: float, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+            if waited >= SLOW_CHECKOUT_SECONDS:
+                self.slow_checkouts += 1
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            attempts = self.checkouts + self.timeouts
+            return {
+                "checkouts": self.checkouts,
+                "slow_checkouts": self.slow_checkouts,
+                "timeouts": self.timeouts,
+                "wait_ms_avg": round(self.wait_total / attempts * 1000, 3) if attempts else 0.0,
+                "wait_ms_max": round(self.wait_max * 1000, 3),
+            }
+
+
+class _TimedCheckout:
+    # One PoolMetrics per pool class; kept on the class so it survives
+    # Pool.recreate() (engine.dispose()), which builds a fresh instance.
+    metrics: PoolMetrics
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()  # type: ignore[misc]
+        except exc.TimeoutError:
+            self.metrics.record(time.perf_counter() - started, timed_out=True)
+            raise
+        self.metrics.record(time.perf_counter() - started)
+        return connection
+
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    metrics = PoolMetrics()
+
+
+class TimedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    metrics = PoolMetrics()
+
+
+def pool_stats(pool: Pool, max_overflow: int | None = None) -> dict[str, Any]:
+    """Current occupancy of `pool` plus its checkout wait counters, if timed.
+
+    QueuePool has no public accessor for its overflow limit, so the caller
+    passes the configured one.
+    """
+    stats: dict[str, Any] = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            checked_in=pool.checkedin(),
+            # QueuePool.overflow() counts up from -size; negative means spare capacity
+            overflow=max(pool.overflow(), 0),
+        )
+        if max_overflow is not None:
+            stats["max_overflow"] = max_overflow
+    if isinstance(pool, _TimedCheckout):
+        stats.update(pool.metrics.snapshot())
+    return stats
@@ -1,42 +1,514 @@
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+import logging
+from collections.abc import Callable, Iterator
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from typing import Literal
+
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.database import get_db
-from app.schemas.note import NoteCreate, NoteReorder, NoteResponse, NoteUpdate
-from app.services.note_service import NoteService
+from app.config import settings
+from app.database import SessionLocal, get_async_db, get_db
+from app.schemas.note import (
+    AutosaveAck,
+    NoteAutosave,
+    NoteBulkReorder,
+    NoteChanges,
+    NoteCreate,
+    NoteImport,
+    NoteImportResult,
+    NotePage,
+    NotePatch,
+    NoteReorder,
+    NoteResponse,
+    NoteRevisionContent,
+    NoteRevisionDiff,
+    NoteRevisionInfo,
+    NoteSearchPage,
+    NoteSummary,
+    NoteTreeNode,
+    NoteUpdate,
+    NoteVersion,
+    TrashedNote,
+)
+from app.services.async_note_service import AsyncNoteService
+from app.services.autosave import AutosaveBuffer
+from app.services.cache import build_note_cache
+from app.services.events import RESYNC, build_note_events, format_sse
+from app.services.note_service import ChangesExpired, NoteService, VersionConflict
+
+logger = logging.getLogger(__name__)
+
+# Change-log retention sweep interval
+CHANGE_LOG_PRUNE_INTERVAL_SECONDS = 3600
+
+# Comment line sent on idle event streams so proxies keep them open
+EVENT_HEARTBEAT_SECONDS = 15
+
+# orjson renders the serialized response models several times faster than json.dumps
+router = APIRouter(default_response_class=ORJSONResponse)
+
+note_cache = build_note_cache(
+    settings.note_cache_backend,
+    max_entries=settings.note_cache_max_entries,
+    ttl=settings.note_cache_ttl_seconds,
+    redis_url=settings.redis_url,
+)
+
+note_events = build_note_events(settings.note_events_backend, settings.database_url)
+
+service_options = {
+    "cache": note_cache,
+    "ordering_mode": settings.ordering_mode,
+    "events": note_events,
+    "delete_mode": settings.delete_mode,
+}
+
+
+def _get_sync_note_service(db: Session = Depends(get_db)) -> AsyncNoteService:
+    return AsyncNoteService.for_session(db, **service_options)
+
+
+def _get_async_note_service(db: AsyncSession = Depends(get_async_db)) -> AsyncNoteService:
+    return AsyncNoteService.for_async_session(db, **service_options)
+
+
+# DATABASE_MODE picks the session dependency once, at import
+get_note_service: Callable[..., AsyncNoteService] = (
+    _get_async_note_service if settings.database_mode == "async" else _get_sync_note_service
+)
+
+
+def _save_autosaves(changes: dict[str, dict[str, str | None]]) -> list[str]:
+    db = SessionLocal()
+    try:
+        return NoteService(
+            db,
+            cache=note_cache,
+            ordering_mode=settings.ordering_mode,
+            events=note_events,
+            delete_mode=settings.delete_mode,
+        ).save_batch(changes)
+    finally:
+        db.close()
+
+
+async def write_autosaves(changes: dict[str, dict[str, str | None]]) -> list[str]:
+    return await run_in_threadpool(_save_autosaves, changes)
+
+
+# Started and flushed on shutdown from the app lifespan
+autosave = AutosaveBuffer(
+    write_autosaves,
+    idle_seconds=settings.autosave_idle_ms / 1000,
+    max_delay_seconds=settings.autosave_max_delay_ms / 1000,
+    max_pending=settings.autosave_max_pending,
+    max_attempts=settings.autosave_max_attempts,
+)
+
+
+async def _settle_autosave(note_id: str) -> None:
+    """Write a note's buffered autosave first, so reads include it and later writes win over it."""
+    if not await autosave.settle(note_id):
+        raise HTTPException(status_code=503, detail="Buffered autosave could not be written; retry")
+
+
+def _rebalance_ranks(parent_id: str | None) -> None:
+    db = SessionLocal()
+    try:
+        NoteService(db, cache=note_cache, ordering_mode=settings.ordering_mode).rebalance_ranks(parent_id)
+    finally:
+        db.close()
+
+
+def _schedule_rebalance(service: AsyncNoteService, background_tasks: BackgroundTasks) -> None:
+    """Respace sibling ranks after the response if a write made them too long."""
+    for parent_id in service.rebalance_parents:
+        background_tasks.add_task(_rebalance_ranks, parent_id)
+
+
+def prune_change_log() -> int:
+    """Drop change-log entries older than CHANGE_LOG_RETENTION_DAYS."""
+    db = SessionLocal()
+    try:
+        return NoteService(db).prune_changes(timedelta(days=settings.change_log_retention_days))
+    finally:
+        db.close()
+
+
+async def change_log_prune_loop() -> None:
+    """Periodic change-log retention sweep, started from the app lifespan."""
+    while True:
+        await asyncio.sleep(CHANGE_LOG_PRUNE_INTERVAL_SECONDS)
+        try:
+            await run_in_threadpool(prune_change_log)
+        except Exception:
+            # Retried next interval
+            logger.exception("Change log prune failed")
+
+
+def purge_trash(older_than: timedelta | None = None) -> int:
+    """Hard-delete trashed notes older than TRASH_RETENTION_DAYS (or `older_than`)."""
+    if older_than is None:
+        older_than = timedelta(days=settings.trash_retention_days)
+    db = SessionLocal()
+    try:
+        return NoteService(db).purge_trash(older_than)
+    finally:
+        db.close()
+
+
+async def trash_purge_loop() -> None:
+    """Background purge worker for DELETE_MODE=trash, started from the app lifespan."""
+    while True:
+        await asyncio.sleep(settings.trash_purge_interval_seconds)
+        try:
+            await run_in_threadpool(purge_trash)
+        except Exception:
+            # Retried next interval
+            logger.exception("Trash purge failed")
+
+
+@router.get("/cache/stats")
+def cache_stats():
+    """Hit/miss counters for the note read cache (for sizing it)."""
+    if note_cache is None:
+        return {"backend": "none"}
+    return {"backend": settings.note_cache_backend, **note_cache.stats()}
+
+
+def _validator_headers(etag: str, last_modified: datetime | None) -> dict[str, str]:
+    headers = {"ETag": etag}
+    if last_modified is not None:
+        if last_modified.tzinfo is None:
+            last_modified = last_modified.replace(tzinfo=timezone.utc)
+        headers["Last-Modified"] = format_datetime(last_modified.astimezone(timezone.utc), usegmt=True)
+    return headers
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    # Weak comparison: compression turns our ETags into W/"..." on the wire
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in candidates or etag.removeprefix("W/") in candidates
+
+
+def _conditional(request: Request, response: Response, etag: str, last_modified: datetime | None) -> Response | None:
+    """Return a 304 if the client's copy is current, else set validators on `response`."""
+    headers = _validator_headers(etag, last_modified)
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+
+async def _list_etag(
+    service: AsyncNoteService, request: Request, response: Response, variant: str
+) -> Response | None:
+    revision, last_modified = await service.get_revision()
+    return _conditional(request, response, f'W/"notes-{revision}-{variant}"', last_modified)
+
+
+@router.get("", response_model=list[NoteResponse] | list[NoteSummary])
+async def list_notes(
+    request: Request,
+    response: Response,
+    view: Literal["full", "tree"] = Query("full"),
+    service: AsyncNoteService = Depends(get_note_service),
+):
+    """List all notes.
+
+    `view=tree` returns only id/title/parent_id/position for the sidebar and
+    never loads the content/sidenote columns. Supports If-None-Match.
+    """
+    not_modified = await _list_etag(service, request, response, view)
+    if not_modified:
+        return not_modified
+    if view == "tree":
+        return await service.get_summaries()
+    return await service.get_all()
+
+
+@router.get("/page", response_model=NotePage)
+async def list_notes_page(
+    cursor: str | None = None,
+    limit: int = Query(100, ge=1, le=1000),
+    service: AsyncNoteService = Depends(get_note_service),
+):
+    """Keyset-paginated notes list; pass `next_cursor` back to get the next page."""
+    try:
+        items, next_cursor = await service.get_page(cursor=cursor, limit=limit)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return NotePage(items=items, next_cursor=next_cursor)
+
+
+def _export_ndjson() -> Iterator[str]:
+    # Own session: the request-scoped one is closed before the body is streamed
+    db = SessionLocal()
+    try:
+        for note in NoteService(db, ordering_mode=settings.ordering_mode).iter_all():
+            yield NoteResponse.model_validate(note).model_dump_json() + "\n"
+    finally:
+        db.close()
+
+
+@router.get("/export")
+def export_notes():
+    """Stream every note as newline-delimited JSON in constant memory."""
+    return StreamingResponse(_export_ndjson(), media_type="application/x-ndjson")
+
 
-router = APIRouter()
+@router.get("/changes", response_model=NoteChanges)
+async def list_changes(
+    since: int | None = Query(None, ge=0),
+    limit: int = Query(500, ge=1, le=1000),
+    service: AsyncNoteService = Depends(get_note_service),
+):
+    """Incremental sync: notes created/updated and ids deleted since a token.
 
+    Without `since` only the current token is returned; take it before loading
+    the full list, then poll with `since=<token>` and pass each response's
+    `token` back (repeat at once while `has_more`). Applying a change twice is
+    harmless. In rank mode a move returns only the moved note: re-sort its
+    sibling group by `rank`, as the other siblings' positions are not resent.
+    410 means the token is older than the retained change log and the client
+    has to reload everything.
+    """
+    try:
+        return await service.get_changes(since=since, limit=limit)
+    except ChangesExpired as exc:
+        raise HTTPException(status_code=410, detail=str(exc)) from exc
+
+
+@router.get("/events")
+async def stream_events():
+    """Server-Sent Events: created/updated/moved/deleted/reset as they commit.
+
+    Each event carries the note id, its parent and the change token (also the
+    SSE id). Fetch the data with GET /changes?since=<last token>, including
+    after a reconnect. `resync` means events were missed: call /changes from
+    the last token you have (or reload everything on 410).
+    """
+    if note_events is None:
+        raise HTTPException(status_code=404, detail="Event stream is disabled")
+    subscription = note_events.subscribe()
+
+    async def messages():
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), EVENT_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                if subscription.overflowed:
+                    # Too slow to keep up; the client catches up from /changes instead
+                    yield format_sse(RESYNC)
+                    return
+                yield format_sse(event)
+        finally:
+            note_events.unsubscribe(subscription)
+
+    return StreamingResponse(
+        messages(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/trash", response_model=list[TrashedNote])
+async def list_trash(service: AsyncNoteService = Depends(get_note_service)):
+    """Trashed pages (DELETE_MODE=trash), newest first; restore brings subpages back too."""
+    return await service.get_trash()
 
-def get_note_service(db: Session = Depends(get_db)) -> NoteService:
-    return NoteService(db)
 
+@router.delete("/trash", status_code=202)
+async def empty_trash(background_tasks: BackgroundTasks):
+    """Purge everything in the trash now, in batches, after the response."""
+    background_tasks.add_task(purge_trash, timedelta(0))
+    return Response(status_code=202)
 
-@router.get("", response_model=list[NoteResponse])
-def list_notes(service: NoteService = Depends(get_note_service)):
-    return service.get_all()
+
+@router.get("/search", response_model=NoteSearchPage)
+async def search_notes(
+    q: str = Query(..., max_length=500),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    service: AsyncNoteService = Depends(get_note_service),
+):
+    """Ranked full-text search with highlighted snippets."""
+    return await service.search(q, limit=limit, offset=offset)
+
+
+@router.get("/tree", response_model=list[NoteTreeNode])
+async def get_note_tree(
+    request: Request,
+    response: Response,
+    root_id: str | None = None,
+    max_depth: int | None = Query(None, ge=0),
+    service: AsyncNoteService = Depends(get_note_service),
+):
+    """Return notes as a nested tree, optionally limited to one subtree and depth."""
+    not_modified = await _list_etag(service, request, response, f"tree-{root_id}-{max_depth}")
+    if not_modified:
+        return not_modified
+    tree = await service.get_tree(root_id=root_id, max_depth=max_depth)
+    if tree is None:
+        raise HTTPException(status_code=404, detail="Note not found")
+    return tree
 
 
 @router.get("/{note_id}", response_model=NoteResponse)
-def get_note(note_id: str, service: NoteService = Depends(get_note_service)):
-    note = service.get_by_id(note_id)
+async def get_note(
+    note_id: str,
+    request: Request,
+    response: Response,
+    service: AsyncNoteService = Depends(get_note_service),
+):
+    await _settle_autosave(note_id)
+    # Cheap column-only lookup first so a matching ETag never loads the body
+    validators = await service.get_validators(note_id)
+    if validators is None:
+        raise HTTPException(status_code=404, detail="Note not found")
+    updated_at, position = validators
+    key = f"{note_id}-{updated_at.timestamp():.6f}"
+    if position is not None:
+        # Rank mode: a sibling move shifts this note's position without touching it
+        key += f"-{position}"
+    etag = f'"{key}"'
+    not_modified = _conditional(request, response, etag, updated_at)
+    if not_modified:
+        return not_modified
+
+    note = await service.get_by_id(note_id)
     if not note:
         raise HTTPException(status_code=404, detail="Note not found")
     return note
 
 
+@router.get("/{note_id}/breadcrumbs", response_model=list[NoteSummary])
+async def get_breadcrumbs(note_id: str, service: AsyncNoteService = Depends(get_note_service)):
+    """Ancestors of a note, root first, ending with the note itself."""
+    breadcrumbs = await service.get_breadcrumbs(note_id)
+    if breadcrumbs is None:
+        raise HTTPException(status_code=404, detail="Note not found")
+    return breadcrumbs
+
+
+@router.get("/{note_id}/history", response_model=list[NoteRevisionInfo])
+async def list_history(
+    note_id: str,
+    limit: int = Query(100, ge=1, le=1000),
+    before: int | None = Query(None, ge=1, description="Only versions older than this one (next page)"),
+    service: AsyncNoteService = Depends(get_note_service),
+):
+    """Stored versions of a note's title/content/sidenote, newest first."""
+    await _settle_autosave(note_id)
+    history = await service.get_history(note_id, limit=limit, before_version=before)
+    if history is None:
+        raise HTTPException(status_code=404, detail="Note not found")
+    return history
+
+
+@router.get("/{note_id}/history/diff", response_model=NoteRevisionDiff)
+async def diff_history(
+    note_id: str,
+    from_version: int = Query(..., alias="from", ge=1),
+    to_version: int = Query(..., alias="to", ge=1),
+    service: AsyncNoteService = Depends(get_note_service),
+):
+    """Unified diffs between two versions, per changed field."""
+    await _settle_autosave(note_id)
+    diff = await service.diff_history(note_id, from_version, to_version)
+    if diff is None:
+        raise HTTPException(status_code=404, detail="Version not found")
+    return diff
+
+
+@router.get("/{note_id}/history/{version}", response_model=NoteRevisionContent)
+async def get_history_version(note_id: str, version: int, service: AsyncNoteService = Depends(get_note_service)):
+    await _settle_autosave(note_id)
+    revision = await service.get_history_version(note_id, version)
+    if revision is None:
+        raise HTTPException(status_code=404, detail="Version not found")
+    return revision
+
+
 @router.post("", response_model=NoteResponse, status_code=201)
-def create_note(data: NoteCreate, service: NoteService = Depends(get_note_service)):
+async def create_note(
+    data: NoteCreate,
+    background_tasks: BackgroundTasks,
+    service: AsyncNoteService = Depends(get_note_service),
+):
     try:
-        return service.create(data)
+        note = await service.create(data)
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
+    _schedule_rebalance(service, background_tasks)
+    return note
+
+
+@router.post("/import", response_model=NoteImportResult, status_code=201)
+async def import_notes(
+    data: NoteImport,
+    background_tasks: BackgroundTasks,
+    service: AsyncNoteService = Depends(get_note_service),
+):
+    """Create a whole nested tree of notes in one transaction."""
+    try:
+        result = await service.bulk_import(data.notes, parent_id=data.parent_id)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    _schedule_rebalance(service, background_tasks)
+    return result
 
 
 @router.patch("/{note_id}", response_model=NoteResponse)
-def update_note(note_id: str, data: NoteUpdate, service: NoteService = Depends(get_note_service)):
+async def update_note(
+    note_id: str,
+    data: NoteUpdate,
+    background_tasks: BackgroundTasks,
+    service: AsyncNoteService = Depends(get_note_service),
+):
+    """Update fields; with `version` set, 409 if someone else saved first."""
+    await _settle_autosave(note_id)
+    try:
+        note = await service.update(note_id, data)
+    except VersionConflict as exc:
+        raise _version_conflict(exc) from exc
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    if not note:
+        raise HTTPException(status_code=404, detail="Note not found")
+    _schedule_rebalance(service, background_tasks)
+    return note
+
+
+def _version_conflict(exc: VersionConflict) -> HTTPException:
+    return HTTPException(status_code=409, detail={"message": str(exc), "version": exc.current_version})
+
+
+@router.patch("/{note_id}/content", response_model=NoteVersion)
+async def patch_note_content(note_id: str, data: NotePatch, service: AsyncNoteService = Depends(get_note_service)):
+    """Apply text edits made against `version` instead of resending the whole body.
+
+    Offsets are UTF-16 code units, i.e. JavaScript string indices. Returns
+    only the new version; 409 (with the current version) means the note
+    changed since the client's copy: refetch, rebase the edits, retry.
+    """
+    await _settle_autosave(note_id)
     try:
-        note = service.update(note_id, data)
+        note = await service.patch(note_id, data)
+    except VersionConflict as exc:
+        raise _version_conflict(exc) from exc
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
     if not note:
@@ -44,25 +516,110 @@ def update_note(note_id: str, data: NoteUpdate, service: NoteService = Depends(g
     return note
 
 
+@router.patch("/{note_id}/autosave", response_model=AutosaveAck, status_code=202)
+async def autosave_note(
+    note_id: str,
+    data: NoteAutosave,
+    flush: bool = Query(False, description="Wait until the edit is written"),
+    service: AsyncNoteService = Depends(get_note_service),
+):
+    """Buffered title/content/sidenote update for editor autosave.
+
+    Send the current values as often as the editor likes: bursts are merged
+    per note and written together with other notes' edits once typing pauses
+    (see app.services.autosave). `flushed: false` means accepted but not yet
+    stored; with flush=true (e.g. on blur or page unload) the response waits
+    for the write.
+
+    GET /{id}, its history, history versions and diffs, and the note's
+    PATCH, content PATCH, duplicate and DELETE write buffered edits first, so
+    they include them. Breadcrumbs and collection reads (list, page, export,
+    tree, search, changes) show an edit once it is written, normally within
+    AUTOSAVE_MAX_DELAY_MS.
+    """
+    fields = data.model_dump(exclude_unset=True)
+    if "title" in fields and fields["title"] is None:
+        raise HTTPException(status_code=422, detail="title cannot be null")
+    if await service.get_updated_at(note_id) is None:
+        raise HTTPException(status_code=404, detail="Note not found")
+    await autosave.add(note_id, fields)
+    if flush or settings.autosave_idle_ms == 0:
+        await _settle_autosave(note_id)
+        return AutosaveAck(id=note_id, flushed=True)
+    return AutosaveAck(id=note_id, flushed=False)
+
+
 @router.patch("/{note_id}/reorder", response_model=NoteResponse)
-def reorder_note(note_id: str, data: NoteReorder, service: NoteService = Depends(get_note_service)):
+async def reorder_note(
+    note_id: str,
+    data: NoteReorder,
+    background_tasks: BackgroundTasks,
+    service: AsyncNoteService = Depends(get_note_service),
+):
     """Move a note to a new position, optionally under a new parent."""
     try:
-        note = service.reorder(note_id, data)
+        note = await service.reorder(note_id, data)
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
     if not note:
         raise HTTPException(status_code=404, detail="Note not found")
+    _schedule_rebalance(service, background_tasks)
     return note
 
 
+@router.post("/{note_id}/duplicate", response_model=NoteResponse, status_code=201)
+async def duplicate_note(
+    note_id: str,
+    background_tasks: BackgroundTasks,
+    service: AsyncNoteService = Depends(get_note_service),
+):
+    """Copy a note with all its subpages in one transaction; returns the new root."""
+    await _settle_autosave(note_id)
+    note = await service.duplicate(note_id)
+    if not note:
+        raise HTTPException(status_code=404, detail="Note not found")
+    _schedule_rebalance(service, background_tasks)
+    return note
+
+
+@router.post("/{note_id}/restore", response_model=NoteResponse)
+async def restore_note(
+    note_id: str,
+    background_tasks: BackgroundTasks,
+    service: AsyncNoteService = Depends(get_note_service),
+):
+    """Take a note (and the subpages trashed with it) out of the trash."""
+    note = await service.restore(note_id)
+    if not note:
+        raise HTTPException(status_code=404, detail="Note not in trash")
+    _schedule_rebalance(service, background_tasks)
+    return note
+
+
+@router.post("/reorder", response_model=list[NoteResponse])
+async def bulk_reorder_notes(data: NoteBulkReorder, service: AsyncNoteService = Depends(get_note_service)):
+    """Apply many moves (e.g. a whole drag-and-drop result) in one transaction."""
+    try:
+        return await service.bulk_reorder(data.moves)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+
+@router.post("/ranks/rebuild")
+async def rebuild_ranks(service: AsyncNoteService = Depends(get_note_service)):
+    """Assign fractional ranks from current positions (before enabling rank mode)."""
+    return {"updated": await service.rebuild_ranks()}
+
+
 @router.delete("/{note_id}", status_code=204)
-def delete_note(note_id: str, service: NoteService = Depends(get_note_service)):
-    if not service.delete(note_id):
+async def delete_note(note_id: str, service: AsyncNoteService = Depends(get_note_service)):
+    # Trashed notes keep their last edits
+    await _settle_autosave(note_id)
+    if not await service.delete(note_id):
         raise HTTPException(status_code=404, detail="Note not found")
 
 
 @router.delete("/reset/all", status_code=204)
-def reset_notes(service: NoteService = Depends(get_note_service)):
+async def reset_notes(service: AsyncNoteService = Depends(get_note_service)):
     # TODO: Restrict to admin-only access.
-    service.delete_all_notes()
+    await service.delete_all_notes()
@@ -1,11 +1,34 @@
-import uuid
+import asyncio
+import logging
+from collections.abc import AsyncGenerator
+from datetime import timedelta
 from pathlib import Path
+from typing import Any
 
-from fastapi import APIRouter, HTTPException, UploadFile
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Query, Request
 from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import UploadFile
+from starlette.formparsers import MultiPartException, MultiPartParser
+
+from app.config import settings
+from app.database import SessionLocal
+from app.schemas.upload import UploadSessionCreate, UploadSessionResponse
+from app.services.blob_service import BlobService
+from app.services.image_service import ImagePipeline, describe_variants
+from app.services.upload_service import (
+    CHUNK_SIZE,
+    StoredUpload,
+    UploadOffsetMismatch,
+    UploadStore,
+    UploadTooLarge,
+)
+from app.static_files import PRECOMPRESS_EXTENSIONS, precompress
 
 router = APIRouter()
 
+logger = logging.getLogger(__name__)
+
 # Upload directory - will be created if it doesn't exist
 UPLOAD_DIR = Path("/app/uploads")
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
@@ -16,35 +39,223 @@ IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp", ".svg", ".heic", "
 # Max file size: 10MB
 MAX_FILE_SIZE = 10 * 1024 * 1024
 
+# Max size of a resumable (chunked) upload: 100MB
+MAX_SESSION_FILE_SIZE = 100 * 1024 * 1024
 
-@router.post("")
-async def upload_file(file: UploadFile) -> JSONResponse:
-    """Upload a file and return its URL."""
-    if not file.filename:
-        raise HTTPException(status_code=400, detail="No filename provided")
+# Multipart framing (boundary, part headers) allowed on top of MAX_FILE_SIZE
+MULTIPART_OVERHEAD = 64 * 1024
 
-    # Read file content
-    content = await file.read()
 
-    # Check file size
-    if len(content) > MAX_FILE_SIZE:
-        raise HTTPException(status_code=400, detail="File too large (max 10MB)")
+def _register_blob_sync(sha256: str, path: str, size: int) -> tuple[str, bool]:
+    db = SessionLocal()
+    try:
+        return BlobService(db).register(sha256, path, size)
+    finally:
+        db.close()
 
-    # Generate unique filename to prevent collisions
-    ext = Path(file.filename).suffix.lower()
-    unique_name = f"{uuid.uuid4().hex}{ext}"
-    file_path = UPLOAD_DIR / unique_name
 
-    # Prevent path traversal
-    if not file_path.resolve().is_relative_to(UPLOAD_DIR.resolve()):
-        raise HTTPException(status_code=400, detail="Invalid filename")
+async def _register_blob(sha256: str, path: str, size: int) -> tuple[str, bool]:
+    return await run_in_threadpool(_register_blob_sync, sha256, path, size)
+
+
+upload_store = UploadStore(UPLOAD_DIR, MAX_FILE_SIZE, MAX_SESSION_FILE_SIZE, register=_register_blob)
+
+# Thumbnails / WebP / AVIF / HEIC conversion, encoded in worker processes
+image_pipeline = ImagePipeline(UPLOAD_DIR, settings.image_workers)
+
+
+def _upload_stats() -> dict[str, int]:
+    db = SessionLocal()
+    try:
+        return BlobService(db).stats()
+    finally:
+        db.close()
+
+
+def collect_upload_garbage() -> int:
+    """Delete blobs no note links to anymore (after UPLOAD_GC_GRACE_SECONDS)."""
+    db = SessionLocal()
+    try:
+        return BlobService(db).collect_garbage(UPLOAD_DIR, timedelta(seconds=settings.upload_gc_grace_seconds))
+    finally:
+        db.close()
 
-    # Write file
-    with open(file_path, "wb") as f:
-        f.write(content)
 
+async def upload_gc_loop() -> None:
+    """Periodic orphan sweep (and abandoned upload session expiry), started from the app lifespan."""
+    while True:
+        await asyncio.sleep(settings.upload_gc_interval_seconds)
+        try:
+            await run_in_threadpool(collect_upload_garbage)
+        except Exception:
+            # A failed sweep (e.g. database briefly unavailable) retries next interval
+            logger.exception("Upload garbage collection failed")
+        try:
+            await upload_store.expire_sessions(settings.upload_session_ttl_seconds)
+        except Exception:
+            logger.exception("Upload session expiry failed")
+
+
+async def _upload_response(stored: StoredUpload, background_tasks: BackgroundTasks) -> JSONResponse:
     # Return URL (served via /uploads static mount)
-    return JSONResponse({
-        "url": f"/uploads/{unique_name}",
-        "filename": file.filename,
-    })
+    body: dict[str, Any] = {
+        "url": f"/uploads/{stored.name}",
+        "filename": stored.filename,
+    }
+    if Path(stored.name).suffix.lower() in PRECOMPRESS_EXTENSIONS:
+        background_tasks.add_task(precompress, UPLOAD_DIR / stored.name)
+    # Images also get the srcset their derivatives will have once encoded
+    variants = await run_in_threadpool(image_pipeline.plan, stored.name, "/uploads")
+    if variants is not None:
+        body["variants"] = variants
+        # A duplicate upload usually finds its derivatives already encoded
+        if not (stored.deduplicated and await run_in_threadpool(image_pipeline.has_variants, stored.name)):
+            background_tasks.add_task(image_pipeline.generate, stored.name)
+    return JSONResponse(body)
+
+
+async def _read_chunks(file: UploadFile) -> AsyncGenerator[bytes, None]:
+    while chunk := await file.read(CHUNK_SIZE):
+        yield chunk
+
+
+async def _limited_body(request: Request, limit: int) -> AsyncGenerator[bytes, None]:
+    """The request body off the socket, cut off once more than `limit` bytes have arrived."""
+    received = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+        if received > limit:
+            raise UploadTooLarge(f"File too large (max {MAX_FILE_SIZE // (1024 * 1024)}MB)")
+        yield chunk
+
+
+UPLOAD_FORM_SCHEMA = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "properties": {"file": {"type": "string", "format": "binary"}},
+                    "required": ["file"],
+                }
+            }
+        },
+    }
+}
+
+
+@router.post("", openapi_extra=UPLOAD_FORM_SCHEMA)
+async def upload_file(request: Request, background_tasks: BackgroundTasks) -> JSONResponse:
+    """Upload a file (multipart field "file") and return its URL.
+
+    The form is parsed here rather than by FastAPI, which would spool the
+    whole body to a temp file first: an oversized Content-Length is refused
+    before anything is read, and a body without one is cut off as soon as it
+    passes the limit.
+    """
+    limit = MAX_FILE_SIZE + MULTIPART_OVERHEAD
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > limit:
+        raise HTTPException(status_code=413, detail=f"File too large (max {MAX_FILE_SIZE // (1024 * 1024)}MB)")
+    try:
+        form = await MultiPartParser(request.headers, _limited_body(request, limit), max_files=1, max_fields=10).parse()
+    except UploadTooLarge as exc:
+        raise HTTPException(status_code=413, detail=str(exc)) from exc
+    except (MultiPartException, KeyError) as exc:
+        raise HTTPException(status_code=400, detail="Expected a multipart/form-data body") from exc
+
+    try:
+        file = form.get("file")
+        if not isinstance(file, UploadFile):
+            raise HTTPException(status_code=400, detail="No file provided")
+        if not file.filename:
+            raise HTTPException(status_code=400, detail="No filename provided")
+        # Copied to its content address chunk by chunk
+        try:
+            stored = await upload_store.save_stream(_read_chunks(file), file.filename)
+        except UploadTooLarge as exc:
+            raise HTTPException(status_code=413, detail=str(exc)) from exc
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+    finally:
+        await form.close()
+    return await _upload_response(stored, background_tasks)
+
+
+@router.get("/stats")
+async def upload_stats():
+    """Blob count, total bytes and how many blobs are unreferenced."""
+    return await run_in_threadpool(_upload_stats)
+
+
+@router.post("/gc")
+async def run_upload_gc():
+    """Run the orphaned-blob sweep (and session expiry) now instead of waiting for the next interval."""
+    deleted = await run_in_threadpool(collect_upload_garbage)
+    expired = await upload_store.expire_sessions(settings.upload_session_ttl_seconds)
+    return {"deleted": deleted, "expired_sessions": expired}
+
+
+@router.get("/variants/{blob_name:path}")
+async def get_image_variants(blob_name: str):
+    """srcset of the derivatives generated so far for an uploaded image."""
+    if not (UPLOAD_DIR / blob_name).resolve().is_relative_to(UPLOAD_DIR.resolve()):
+        raise HTTPException(status_code=400, detail="Invalid filename")
+    variants = await run_in_threadpool(describe_variants, UPLOAD_DIR, blob_name, "/uploads")
+    if variants is None:
+        raise HTTPException(status_code=404, detail="No variants for this upload")
+    return variants
+
+
+@router.post("/sessions", response_model=UploadSessionResponse, status_code=201)
+async def create_upload_session(data: UploadSessionCreate):
+    """Start a resumable upload; send the bytes with PUT /sessions/{id}."""
+    try:
+        return await upload_store.create_session(data.filename, data.size)
+    except UploadTooLarge as exc:
+        raise HTTPException(status_code=413, detail=str(exc)) from exc
+
+
+@router.get("/sessions/{session_id}", response_model=UploadSessionResponse)
+async def get_upload_session(session_id: str):
+    """How many bytes have arrived, i.e. where to resume after a dropped connection."""
+    session = await upload_store.get_session(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    return session
+
+
+@router.put("/sessions/{session_id}", response_model=UploadSessionResponse)
+async def upload_chunk(session_id: str, request: Request, offset: int = Query(..., ge=0)):
+    """Append the raw request body at `offset` (must equal the session's `received`).
+
+    The body is read from the socket as it arrives, so a chunk of any size
+    costs CHUNK_SIZE of memory at most.
+    """
+    try:
+        session = await upload_store.write_chunk(session_id, offset, request.stream())
+    except UploadOffsetMismatch as exc:
+        raise HTTPException(status_code=409, detail=str(exc), headers={"Upload-Offset": str(exc.received)}) from exc
+    except UploadTooLarge as exc:
+        raise HTTPException(status_code=413, detail=str(exc)) from exc
+    if session is None:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    return session
+
+
+@router.post("/sessions/{session_id}/complete")
+async def complete_upload_session(session_id: str, background_tasks: BackgroundTasks) -> JSONResponse:
+    try:
+        stored = await upload_store.complete_session(session_id)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    if stored is None:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    return await _upload_response(stored, background_tasks)
+
+
+@router.delete("/sessions/{session_id}", status_code=204)
+async def abort_upload_session(session_id: str):
+    if not await upload_store.abort_session(session_id):
+        raise HTTPException(status_code=404, detail="Upload session not found")
@@ -1,3 +1,54 @@
-from app.schemas.note import NoteCreate, NoteResponse, NoteUpdate
+from app.schemas.note import (
+    AutosaveAck,
+    NoteAutosave,
+    NoteBulkReorder,
+    NoteChanges,
+    NoteCreate,
+    NoteImport,
+    NoteImportNode,
+    NoteImportResult,
+    NoteMove,
+    NotePage,
+    NotePatch,
+    NoteResponse,
+    NoteRevisionContent,
+    NoteRevisionDiff,
+    NoteRevisionInfo,
+    NoteSearchHit,
+    NoteSearchPage,
+    NoteSummary,
+    NoteTreeNode,
+    NoteUpdate,
+    NoteVersion,
+    TextEdit,
+    TrashedNote,
+)
+from app.schemas.upload import UploadSessionCreate, UploadSessionResponse
 
-__all__ = ["NoteCreate", "NoteUpdate", "NoteResponse"]
+__all__ = [
+    "NoteCreate",
+    "NoteUpdate",
+    "NotePatch",
+    "NoteAutosave",
+    "AutosaveAck",
+    "NoteVersion",
+    "TextEdit",
+    "TrashedNote",
+    "NoteRevisionInfo",
+    "NoteRevisionContent",
+    "NoteRevisionDiff",
+    "NoteResponse",
+    "NoteSummary",
+    "NoteTreeNode",
+    "NotePage",
+    "NoteChanges",
+    "NoteMove",
+    "NoteBulkReorder",
+    "NoteImport",
+    "NoteImportNode",
+    "NoteImportResult",
+    "NoteSearchHit",
+    "NoteSearchPage",
+    "UploadSessionCreate",
+    "UploadSessionResponse",
+]
@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class NoteBase(BaseModel):
@@ -20,6 +20,45 @@ class NoteUpdate(BaseModel):
     sidenote: str | None = None
     parent_id: str | None = None
     position: int | None = None
+    # When set, the update is rejected with 409 unless the note is still at this version
+    version: int | None = None
+
+
+class NoteAutosave(BaseModel):
+    """Current field values from an editor; only the fields sent are written"""
+    title: str | None = Field(None, max_length=255)
+    content: str | None = None
+    sidenote: str | None = None
+
+
+class AutosaveAck(BaseModel):
+    """`flushed` is true once the edit is in the database, false while it is buffered"""
+    id: str
+    flushed: bool
+
+
+class TextEdit(BaseModel):
+    """Replace `delete` characters at `pos` with `insert` (UTF-16 code units, as JavaScript string indices)"""
+    pos: int = Field(ge=0)
+    delete: int = Field(0, ge=0)
+    insert: str = ""
+
+
+class NotePatch(BaseModel):
+    """Edits against note `version`, applied in order, each to the result of the previous one"""
+    version: int
+    content: list[TextEdit] | None = None
+    sidenote: list[TextEdit] | None = None
+    title: str | None = None
+
+
+class NoteVersion(BaseModel):
+    """Acknowledgement of a patch: the client already holds the new text"""
+    model_config = ConfigDict(from_attributes=True)
+
+    id: str
+    version: int
+    updated_at: datetime
 
 
 class NoteReorder(BaseModel):
@@ -28,10 +67,121 @@ class NoteReorder(BaseModel):
     position: int  # New position within parent
 
 
+class NoteMove(BaseModel):
+    """One entry of a bulk reorder: same semantics as NoteReorder for note `id`"""
+    id: str
+    parent_id: str | None = None
+    position: int
+
+
+class NoteBulkReorder(BaseModel):
+    """Moves applied in order, validated and committed as one transaction"""
+    moves: list[NoteMove]
+
+
 class NoteResponse(NoteBase):
     model_config = ConfigDict(from_attributes=True)
 
     id: str
     position: int
+    # Fractional sort key in ORDERING_MODE=rank (null otherwise); siblings sort by it
+    rank: str | None = None
+    version: int = 1
     created_at: datetime
     updated_at: datetime
+
+
+class NoteSummary(BaseModel):
+    """Lightweight projection of a note for tree/sidebar rendering (no body text)"""
+    model_config = ConfigDict(from_attributes=True)
+
+    id: str
+    title: str
+    parent_id: str | None = None
+    position: int
+
+
+class NoteTreeNode(NoteSummary):
+    """Nested tree node returned by GET /api/notes/tree"""
+    children: list["NoteTreeNode"] = []
+
+
+class NotePage(BaseModel):
+    """One keyset-paginated page of notes"""
+    items: list[NoteResponse]
+    next_cursor: str | None = None
+
+
+class NoteChanges(BaseModel):
+    """Notes written and ids deleted after a change token; pass `token` back as `since`"""
+    items: list[NoteResponse] = []
+    deleted: list[str] = []
+    token: int
+    has_more: bool = False
+
+
+class NoteRevisionInfo(BaseModel):
+    """One entry of a note's history; `size` is the stored (compressed) bytes"""
+    model_config = ConfigDict(from_attributes=True)
+
+    version: int
+    kind: str
+    size: int
+    created_at: datetime
+
+
+class NoteRevisionContent(BaseModel):
+    version: int
+    title: str
+    content: str | None = None
+    sidenote: str | None = None
+
+
+class NoteRevisionDiff(BaseModel):
+    """Unified line diffs keyed by field; unchanged fields are left out"""
+    from_version: int
+    to_version: int
+    changes: dict[str, str]
+
+
+class TrashedNote(BaseModel):
+    """A trashed subtree root; its descendants come back with it on restore"""
+    model_config = ConfigDict(from_attributes=True)
+
+    id: str
+    title: str
+    parent_id: str | None = None
+    deleted_at: datetime
+
+
+class NoteImportNode(BaseModel):
+    """One page of a bulk import; children become its subpages, in order"""
+    title: str
+    content: str | None = None
+    sidenote: str | None = None
+    children: list["NoteImportNode"] = []
+
+
+class NoteImport(BaseModel):
+    """Bulk import payload: `notes` are appended under `parent_id` (None = root)"""
+    parent_id: str | None = None
+    notes: list[NoteImportNode]
+
+
+class NoteImportResult(BaseModel):
+    created: int
+    root_ids: list[str]
+
+
+class NoteSearchHit(BaseModel):
+    """Ranked search result; `snippet` is escaped HTML with matched terms in <mark></mark>"""
+    id: str
+    title: str
+    parent_id: str | None = None
+    snippet: str | None = None
+    score: float
+
+
+class NoteSearchPage(BaseModel):
+    items: list[NoteSearchHit]
+    next_offset: int | None = None
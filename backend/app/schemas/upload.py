@@ -0,0 +1,16 @@
+from pydantic import BaseModel, ConfigDict, Field
+
+
+class UploadSessionCreate(BaseModel):
+    """Start a resumable upload of `size` bytes"""
+    filename: str = Field(min_length=1)
+    size: int = Field(ge=1)
+
+
+class UploadSessionResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: str
+    filename: str
+    size: int
+    received: int  # Next chunk must start at this offset
@@ -1,3 +1,4 @@
+from app.services.async_note_service import AsyncNoteService
 from app.services.note_service import NoteService
 
-__all__ = ["NoteService"]
+__all__ = ["AsyncNoteService", "NoteService"]
@@ -0,0 +1,167 @@
+from collections.abc import Awaitable, Callable
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.models.note import Note
+from app.schemas.note import (
+    NoteChanges,
+    NoteCreate,
+    NoteImportNode,
+    NoteImportResult,
+    NoteMove,
+    NotePatch,
+    NoteReorder,
+    NoteRevisionContent,
+    NoteRevisionDiff,
+    NoteRevisionInfo,
+    NoteSearchPage,
+    NoteSummary,
+    NoteTreeNode,
+    NoteUpdate,
+    TrashedNote,
+)
+from app.services.cache import NoteCache
+from app.services.events import NoteEvents
+from app.services.note_service import NoteService
+
+Runner = Callable[[Callable[[Session], Any]], Awaitable[Any]]
+
+
+class AsyncNoteService:
+    """Awaitable facade over NoteService used by the route handlers.
+
+    There is one implementation of the note rules (NoteService); this class
+    only decides where it runs:
+      - for_session: a sync Session on a threadpool worker (DATABASE_MODE=sync)
+      - for_async_session: an AsyncSession via run_sync, i.e. asyncpg on the
+        event loop through SQLAlchemy's greenlet bridge (DATABASE_MODE=async)
+
+    Only database I/O is awaited in async mode: NoteCache calls stay
+    synchronous, so a redis cache blocks the loop for each round trip.
+    """
+
+    def __init__(
+        self,
+        runner: Runner,
+        cache: NoteCache | None = None,
+        ordering_mode: str = "position",
+        events: NoteEvents | None = None,
+        delete_mode: str = "hard",
+    ):
+        self._runner = runner
+        self.cache = cache
+        self.ordering_mode = ordering_mode
+        self.events = events
+        self.delete_mode = delete_mode
+        self.rebalance_parents: set[str | None] = set()
+
+    @classmethod
+    def for_session(cls, db: Session, **kwargs: Any) -> "AsyncNoteService":
+        return cls(lambda fn: run_in_threadpool(fn, db), **kwargs)
+
+    @classmethod
+    def for_async_session(cls, db: AsyncSession, **kwargs: Any) -> "AsyncNoteService":
+        return cls(db.run_sync, **kwargs)
+
+    async def _call(self, method: str, *args: Any, **kwargs: Any) -> Any:
+        def call(session: Session) -> Any:
+            service = NoteService(
+                session,
+                cache=self.cache,
+                ordering_mode=self.ordering_mode,
+                events=self.events,
+                delete_mode=self.delete_mode,
+            )
+            try:
+                return getattr(service, method)(*args, **kwargs)
+            finally:
+                self.rebalance_parents |= service.rebalance_parents
+
+        return await self._runner(call)
+
+    async def get_all(self) -> list[Note]:
+        return await self._call("get_all")
+
+    async def get_page(self, cursor: str | None = None, limit: int = 100) -> tuple[list[Note], str | None]:
+        return await self._call("get_page", cursor=cursor, limit=limit)
+
+    async def get_summaries(self) -> list[NoteSummary]:
+        return await self._call("get_summaries")
+
+    async def get_tree(self, root_id: str | None = None, max_depth: int | None = None) -> list[NoteTreeNode] | None:
+        return await self._call("get_tree", root_id=root_id, max_depth=max_depth)
+
+    async def search(self, query: str, limit: int = 20, offset: int = 0) -> NoteSearchPage:
+        return await self._call("search", query, limit=limit, offset=offset)
+
+    async def get_by_id(self, note_id: str) -> Note | None:
+        return await self._call("get_by_id", note_id)
+
+    async def get_children(self, parent_id: str | None) -> list[Note]:
+        return await self._call("get_children", parent_id)
+
+    async def get_breadcrumbs(self, note_id: str) -> list[NoteSummary] | None:
+        return await self._call("get_breadcrumbs", note_id)
+
+    async def get_revision(self) -> tuple[int, datetime | None]:
+        return await self._call("get_revision")
+
+    async def get_changes(self, since: int | None = None, limit: int = 500) -> NoteChanges:
+        return await self._call("get_changes", since=since, limit=limit)
+
+    async def get_history(
+        self, note_id: str, limit: int = 100, before_version: int | None = None
+    ) -> list[NoteRevisionInfo] | None:
+        return await self._call("get_history", note_id, limit=limit, before_version=before_version)
+
+    async def get_history_version(self, note_id: str, version: int) -> NoteRevisionContent | None:
+        return await self._call("get_history_version", note_id, version)
+
+    async def diff_history(self, note_id: str, from_version: int, to_version: int) -> NoteRevisionDiff | None:
+        return await self._call("diff_history", note_id, from_version, to_version)
+
+    async def get_updated_at(self, note_id: str) -> datetime | None:
+        return await self._call("get_updated_at", note_id)
+
+    async def get_validators(self, note_id: str) -> tuple[datetime, int | None] | None:
+        return await self._call("get_validators", note_id)
+
+    async def create(self, data: NoteCreate) -> Note:
+        return await self._call("create", data)
+
+    async def update(self, note_id: str, data: NoteUpdate) -> Note | None:
+        return await self._call("update", note_id, data)
+
+    async def patch(self, note_id: str, data: NotePatch) -> Note | None:
+        return await self._call("patch", note_id, data)
+
+    async def reorder(self, note_id: str, data: NoteReorder) -> Note | None:
+        return await self._call("reorder", note_id, data)
+
+    async def duplicate(self, note_id: str) -> Note | None:
+        return await self._call("duplicate", note_id)
+
+    async def bulk_reorder(self, moves: list[NoteMove]) -> list[Note]:
+        return await self._call("bulk_reorder", moves)
+
+    async def bulk_import(self, nodes: list[NoteImportNode], parent_id: str | None = None) -> NoteImportResult:
+        return await self._call("bulk_import", nodes, parent_id=parent_id)
+
+    async def rebuild_ranks(self) -> int:
+        return await self._call("rebuild_ranks")
+
+    async def delete(self, note_id: str) -> bool:
+        return await self._call("delete", note_id)
+
+    async def delete_all_notes(self) -> None:
+        await self._call("delete_all_notes")
+
+    async def get_trash(self) -> list[TrashedNote]:
+        return await self._call("get_trash")
+
+    async def restore(self, note_id: str) -> Note | None:
+        return await self._call("restore", note_id)
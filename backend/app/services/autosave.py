@@ -0,0 +1,176 @@
+"""Write coalescing for autosave (PATCH /api/notes/{id}/autosave).
+
+Editors send the current title/content/sidenote on every pause in typing, and
+each of those would otherwise be a transaction of its own (row lock, version
+bump, history row, change-log entry, cache invalidation, event). The buffer
+keeps only the latest value of each field per note and writes the notes that
+have settled together, in one transaction:
+
+- a note is written once it has been idle for `idle_seconds`, or at most
+  `max_delay_seconds` after its first buffered edit, so continuous typing
+  still reaches the database;
+- `max_pending` buffered notes force an immediate flush;
+- reads and explicit writes of a note settle it first: they wait for a write
+  of that note already in flight and flush what is left, so no one sees an
+  older note than was accepted and a buffered value never overwrites a later
+  PATCH;
+- a failed batch is retried note by note, and whatever still fails stays
+  buffered (beneath any newer edits) for the next tick, up to `max_attempts`
+  failed writes, after which the edit is dropped and logged;
+- `stop()`, called from the app lifespan, flushes everything on shutdown.
+
+An accepted edit lives only in this process until it is written, so a crash
+loses at most the last `max_delay_seconds`; clients that need a durable write
+pass flush=true. The buffer is per process, so behind several workers either
+route a note's autosaves to one worker or set AUTOSAVE_IDLE_MS=0 (write
+through).
+"""
+import asyncio
+import logging
+import time
+from collections.abc import Awaitable, Callable, Iterable
+from dataclasses import dataclass
+from typing import Any
+
+Fields = dict[str, str | None]
+
+# Writes {note_id: fields} in one transaction; notes that are gone are skipped
+Writer = Callable[[dict[str, Fields]], Awaitable[Any]]
+
+logger = logging.getLogger(__name__)
+
+# Shortest interval between due-checks of the background loop
+MIN_TICK_SECONDS = 0.05
+
+
+@dataclass
+class _Pending:
+    fields: Fields
+    first_at: float
+    last_at: float
+    attempts: int = 0
+
+
+class AutosaveBuffer:
+    def __init__(
+        self,
+        write: Writer,
+        idle_seconds: float = 0.75,
+        max_delay_seconds: float = 5.0,
+        max_pending: int = 500,
+        max_attempts: int = 20,
+    ):
+        self._write = write
+        self.idle_seconds = idle_seconds
+        self.max_delay_seconds = max(max_delay_seconds, idle_seconds)
+        self.max_pending = max_pending
+        self.max_attempts = max_attempts
+        self._pending: dict[str, _Pending] = {}
+        # Popped from _pending and being written by the flush holding the lock
+        self._in_flight: set[str] = set()
+        # One flush at a time: a note's writes reach the database in order
+        self._lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    def has_pending(self, note_id: str) -> bool:
+        """True while the note has edits buffered or being written."""
+        return note_id in self._pending or note_id in self._in_flight
+
+    async def add(self, note_id: str, fields: Fields) -> None:
+        """Merge an edit into the note's buffered fields (later values win)."""
+        now = time.monotonic()
+        entry = self._pending.get(note_id)
+        if entry is None:
+            self._pending[note_id] = _Pending(dict(fields), now, now)
+        else:
+            entry.fields.update(fields)
+            entry.last_at = now
+        if len(self._pending) >= self.max_pending:
+            await self.flush()
+
+    def _due(self, now: float) -> list[str]:
+        return [
+            note_id
+            for note_id, entry in self._pending.items()
+            if now - entry.last_at >= self.idle_seconds or now - entry.first_at >= self.max_delay_seconds
+        ]
+
+    async def flush(self, note_ids: Iterable[str] | None = None) -> set[str]:
+        """Write the given notes' buffered edits (all if None); returns the ids that failed.
+
+        Failed edits stay buffered until they have failed `max_attempts` times.
+        """
+        async with self._lock:
+            ids = list(self._pending) if note_ids is None else [i for i in note_ids if i in self._pending]
+            if not ids:
+                return set()
+            batch = {note_id: self._pending.pop(note_id) for note_id in ids}
+            self._in_flight.update(batch)
+            try:
+                return set(await self._write_batch(batch))
+            finally:
+                self._in_flight.difference_update(batch)
+
+    async def _write_batch(self, batch: dict[str, _Pending]) -> dict[str, _Pending]:
+        try:
+            await self._write({note_id: entry.fields for note_id, entry in batch.items()})
+            return {}
+        except Exception:
+            if len(batch) == 1:
+                self._requeue(batch)
+                return batch
+        # Isolate the note(s) that broke the batch
+        failed = {}
+        for note_id, entry in batch.items():
+            try:
+                await self._write({note_id: entry.fields})
+            except Exception:
+                failed[note_id] = entry
+        self._requeue(failed)
+        return failed
+
+    def _requeue(self, failed: dict[str, _Pending]) -> None:
+        # Runs under the lock, so a settle() waiting on the note sees the entry
+        # and retries it before its explicit write goes ahead
+        for note_id, entry in failed.items():
+            entry.attempts += 1
+            if entry.attempts >= self.max_attempts:
+                # Edits accepted while the write was in flight stay buffered
+                logger.error("Dropping buffered autosave of note %s after %d failed writes", note_id, entry.attempts)
+                continue
+            newer = self._pending.get(note_id)
+            if newer is not None:
+                # Edits accepted while the write was in flight take precedence
+                entry.fields.update(newer.fields)
+                entry.last_at = newer.last_at
+            self._pending[note_id] = entry
+
+    async def settle(self, note_id: str) -> bool:
+        """Wait for any write of the note in flight, then flush it; False if its edits could not be written."""
+        if not self.has_pending(note_id):
+            return True
+        return note_id not in await self.flush([note_id])
+
+    async def _run(self) -> None:
+        tick = max(min(self.idle_seconds, self.max_delay_seconds) / 2, MIN_TICK_SECONDS)
+        while True:
+            await asyncio.sleep(tick)
+            due = self._due(time.monotonic())
+            if due:
+                # Failures stay buffered and are retried next tick
+                await self.flush(due)
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> set[str]:
+        """Stop the flush loop and write everything still buffered."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        return await self.flush()
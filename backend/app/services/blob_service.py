@@ -0,0 +1,136 @@
+"""Reference tracking and garbage collection for content-addressed uploads.
+
+Blobs are registered when uploaded; NoteService records which blobs each
+note's content/sidenote links to (note_uploads). A blob with no links whose
+last upload is older than the grace period is an orphan and gets deleted,
+file and row, by `collect_garbage`.
+"""
+import re
+from collections.abc import Iterable
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import delete, exists, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.note import Note, utc_now
+from app.models.upload import NoteUpload, UploadBlob
+
+# Matches the sharded blob URLs handed out by /api/uploads
+BLOB_URL_PATTERN = re.compile(r"/uploads/[0-9a-f]{2}/[0-9a-f]{2}/([0-9a-f]{64})")
+
+# Orphans deleted per GC transaction
+GC_BATCH_SIZE = 500
+
+
+def extract_blob_hashes(*texts: str | None) -> set[str]:
+    hashes: set[str] = set()
+    for text in texts:
+        if text and "/uploads/" in text:
+            hashes.update(BLOB_URL_PATTERN.findall(text))
+    return hashes
+
+
+class BlobService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def register(self, sha256: str, path: str, size: int) -> tuple[str, bool]:
+        """Record an uploaded blob and commit; returns (stored path, already existed).
+
+        On a hash hit the existing row's grace period is restarted. The UPDATE
+        waits on a concurrent GC sweep holding the row, so a blob is never
+        handed out just as it is being deleted.
+        """
+        touched = self.db.execute(
+            update(UploadBlob).where(UploadBlob.sha256 == sha256).values(last_uploaded_at=utc_now())
+        )
+        if touched.rowcount:
+            self.db.commit()
+            return self.db.scalars(select(UploadBlob.path).where(UploadBlob.sha256 == sha256)).one(), True
+        try:
+            self.db.execute(insert(UploadBlob).values(sha256=sha256, path=path, size=size))
+            self.db.commit()
+        except IntegrityError:
+            # Same bytes uploaded concurrently: the other request's row wins
+            self.db.rollback()
+            return self.db.scalars(select(UploadBlob.path).where(UploadBlob.sha256 == sha256)).one(), True
+        return path, False
+
+    def _existing(self, hashes: Iterable[str]) -> set[str]:
+        hashes = list(hashes)
+        if not hashes:
+            return set()
+        return set(self.db.scalars(select(UploadBlob.sha256).where(UploadBlob.sha256.in_(hashes))))
+
+    def sync_note_refs(self, note_id: str, *texts: str | None, is_new: bool = False) -> None:
+        """Make note_uploads for `note_id` match the blob URLs in `texts` (no commit)."""
+        wanted = self._existing(extract_blob_hashes(*texts))
+        current: set[str] = set()
+        if not is_new:
+            current = set(self.db.scalars(select(NoteUpload.sha256).where(NoteUpload.note_id == note_id)))
+        if current - wanted:
+            self.db.execute(
+                delete(NoteUpload).where(NoteUpload.note_id == note_id, NoteUpload.sha256.in_(current - wanted))
+            )
+        if wanted - current:
+            self.db.execute(insert(NoteUpload), [{"note_id": note_id, "sha256": sha} for sha in wanted - current])
+
+    def add_refs(self, refs: dict[str, set[str]]) -> None:
+        """Link many new notes at once ({note_id: hashes}, no commit)."""
+        existing = self._existing(set().union(*refs.values()) if refs else ())
+        rows = [{"note_id": note_id, "sha256": sha} for note_id, hashes in refs.items() for sha in hashes & existing]
+        if rows:
+            self.db.execute(insert(NoteUpload), rows)
+
+    def ref_count(self, sha256: str) -> int:
+        return self.db.execute(
+            select(func.count())
+            .select_from(NoteUpload)
+            .join(Note, Note.id == NoteUpload.note_id)
+            .where(NoteUpload.sha256 == sha256)
+        ).scalar_one()
+
+    def _referenced(self):
+        # Joined to notes so links left behind by a delete without FK
+        # enforcement (SQLite) do not keep a blob alive
+        return exists(
+            select(1)
+            .select_from(NoteUpload)
+            .join(Note, Note.id == NoteUpload.note_id)
+            .where(NoteUpload.sha256 == UploadBlob.sha256)
+        )
+
+    def stats(self) -> dict[str, int]:
+        total, size = self.db.execute(select(func.count(), func.coalesce(func.sum(UploadBlob.size), 0))).one()
+        orphaned = self.db.scalar(select(func.count()).select_from(UploadBlob).where(~self._referenced()))
+        return {"blobs": total, "bytes": int(size), "orphaned": orphaned}
+
+    def collect_garbage(self, root: Path, grace: timedelta, batch_size: int = GC_BATCH_SIZE) -> int:
+        """Delete unreferenced blobs last uploaded before now - grace; returns the count."""
+        cutoff: datetime = utc_now() - grace
+        deleted = 0
+        while True:
+            orphans = self.db.execute(
+                select(UploadBlob.sha256, UploadBlob.path)
+                .where(UploadBlob.last_uploaded_at < cutoff, ~self._referenced())
+                .order_by(UploadBlob.last_uploaded_at)
+                .limit(batch_size)
+                .with_for_update(skip_locked=True)
+            ).all()
+            if not orphans:
+                return deleted
+            hashes = [row.sha256 for row in orphans]
+            self.db.execute(delete(NoteUpload).where(NoteUpload.sha256.in_(hashes)))
+            self.db.execute(delete(UploadBlob).where(UploadBlob.sha256.in_(hashes)))
+            for row in orphans:
+                blob = root / row.path
+                blob.unlink(missing_ok=True)
+                # Derivatives ("<sha>.w640.webp", "<sha>.svg.br", ...) go with their blob
+                for derivative in blob.parent.glob(f"{row.sha256}.*"):
+                    derivative.unlink(missing_ok=True)
+            self.db.commit()
+            deleted += len(orphans)
+            if len(orphans) < batch_size:
+                return deleted
@@ -0,0 +1,52 @@
+import io
+from typing import Any
+
+from sqlalchemy import Table, insert
+from sqlalchemy.orm import Session
+
+# Below this many rows a multi-row INSERT is as fast as COPY
+COPY_THRESHOLD = 500
+
+# Rows per INSERT statement on the executemany path
+INSERT_BATCH_SIZE = 1000
+
+
+def _copy_value(value: Any) -> str:
+    """Format one value for PostgreSQL COPY text format."""
+    if value is None:
+        return "\\N"
+    if hasattr(value, "isoformat"):
+        value = value.isoformat()
+    text = str(value)
+    return text.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+def _supports_copy(db: Session) -> bool:
+    bind = db.get_bind()
+    return bind.dialect.name == "postgresql" and bind.dialect.driver == "psycopg2"
+
+
+def insert_rows(db: Session, table: Table, rows: list[dict[str, Any]]) -> None:
+    """Insert many rows inside the session's transaction as fast as the backend allows.
+
+    Uses PostgreSQL COPY (psycopg2) for large batches and batched executemany
+    INSERTs otherwise. Rows must already be in FK-safe order (parents first)
+    and all share the same keys.
+    """
+    if not rows:
+        return
+    columns = list(rows[0])
+    if len(rows) >= COPY_THRESHOLD and _supports_copy(db):
+        buffer = io.StringIO()
+        for row in rows:
+            buffer.write("\t".join(_copy_value(row[column]) for column in columns))
+            buffer.write("\n")
+        buffer.seek(0)
+        cursor = db.connection().connection.cursor()
+        try:
+            cursor.copy_expert(f"COPY {table.name} ({', '.join(columns)}) FROM STDIN", buffer)
+        finally:
+            cursor.close()
+        return
+    for start in range(0, len(rows), INSERT_BATCH_SIZE):
+        db.execute(insert(table), rows[start:start + INSERT_BATCH_SIZE])
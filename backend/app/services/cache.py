@@ -0,0 +1,146 @@
+import fnmatch
+import json
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Iterable, Iterator
+from typing import Any, Protocol
+
+
+class CacheBackend(Protocol):
+    """Subset of the redis-py client API used by NoteCache.
+
+    A `redis.Redis` instance satisfies this directly; InMemoryCache is the
+    default single-process implementation and doubles as the test fake.
+    """
+
+    def get(self, name: str) -> bytes | None: ...
+
+    def set(self, name: str, value: bytes | str, ex: int | None = None) -> Any: ...
+
+    def delete(self, *names: str) -> int: ...
+
+    def scan_iter(self, match: str | None = None) -> Iterator[Any]: ...
+
+
+class InMemoryCache:
+    """Bounded LRU cache with per-key TTL, safe to share across request threads."""
+
+    def __init__(self, max_entries: int = 1024, default_ttl: int | None = None):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._data: OrderedDict[str, tuple[bytes, float | None]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> bytes | None:
+        with self._lock:
+            entry = self._data.get(name)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[name]
+                return None
+            self._data.move_to_end(name)
+            return value
+
+    def set(self, name: str, value: bytes | str, ex: int | None = None) -> bool:
+        if isinstance(value, str):
+            value = value.encode()
+        ttl = ex if ex is not None else self.default_ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._data[name] = (value, expires_at)
+            self._data.move_to_end(name)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+        return True
+
+    def delete(self, *names: str) -> int:
+        with self._lock:
+            return sum(1 for name in names if self._data.pop(name, None) is not None)
+
+    def scan_iter(self, match: str | None = None) -> Iterator[str]:
+        with self._lock:
+            keys = list(self._data)
+        return iter(key for key in keys if match is None or fnmatch.fnmatchcase(key, match))
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class NoteCache:
+    """Namespaced JSON cache for note reads with hit/miss counters.
+
+    Keys:
+      notes:note:<id>         single note
+      notes:children:<parent> ordered children of a parent ("root" for None)
+      notes:all               full ordered list
+    """
+
+    prefix = "notes:"
+
+    def __init__(self, backend: CacheBackend, ttl: int | None = None):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def note_key(note_id: str) -> str:
+        return f"{NoteCache.prefix}note:{note_id}"
+
+    @staticmethod
+    def children_key(parent_id: str | None) -> str:
+        return f"{NoteCache.prefix}children:{parent_id or 'root'}"
+
+    @staticmethod
+    def all_key() -> str:
+        return f"{NoteCache.prefix}all"
+
+    def get(self, key: str) -> Any | None:
+        raw = self.backend.get(key)
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(raw)
+
+    def set(self, key: str, value: Any) -> None:
+        self.backend.set(key, json.dumps(value), ex=self.ttl)
+
+    def invalidate(self, note_ids: Iterable[str], parent_ids: Iterable[str | None]) -> None:
+        keys = [self.note_key(note_id) for note_id in note_ids]
+        keys += [self.children_key(parent_id) for parent_id in parent_ids]
+        keys.append(self.all_key())
+        self.backend.delete(*keys)
+
+    def clear(self) -> None:
+        keys = list(self.backend.scan_iter(match=f"{self.prefix}*"))
+        if keys:
+            self.backend.delete(*keys)
+
+    def stats(self) -> dict[str, int | float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def build_note_cache(backend: str, max_entries: int, ttl: int | None, redis_url: str | None = None) -> NoteCache | None:
+    """Create the process-wide note cache from settings ("memory", "redis" or "none")."""
+    if backend == "none":
+        return None
+    if backend == "memory":
+        return NoteCache(InMemoryCache(max_entries=max_entries), ttl=ttl)
+    if backend == "redis":
+        if not redis_url:
+            raise ValueError("NOTE_CACHE_BACKEND=redis requires REDIS_URL")
+        try:
+            import redis  # type: ignore[import-not-found]
+        except ImportError as exc:
+            raise RuntimeError("NOTE_CACHE_BACKEND=redis requires the 'redis' package") from exc
+        return NoteCache(redis.Redis.from_url(redis_url), ttl=ttl)
+    raise ValueError(f"Unknown note cache backend: {backend}")
@@ -0,0 +1,198 @@
+"""Push notifications for note writes (GET /api/notes/events).
+
+NoteService records one small event per write (created, updated, moved,
+deleted, reset) with the note id, its parent and the change-log token of the
+transaction. Events are hints, not data: clients fetch the notes themselves
+with GET /api/notes/changes?since=<token>, so a missed event only delays a
+refresh. A broker fans events out to subscribers (open SSE streams):
+
+- NoteEvents: in-process, published after commit; fine for a single worker.
+- PostgresNoteEvents: events go out with pg_notify inside the write
+  transaction, so PostgreSQL delivers them on commit and drops them on
+  rollback; every worker LISTENs on one asyncpg connection and fans out to
+  its own subscribers.
+"""
+import asyncio
+import json
+import logging
+import threading
+from typing import Any
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "note_events"
+
+# pg_notify payloads are capped at 8000 bytes
+NOTIFY_PAYLOAD_LIMIT = 7500
+
+# Events buffered per subscriber before it is told to resync instead
+SUBSCRIBER_QUEUE_SIZE = 256
+
+LISTEN_RECONNECT_SECONDS = 2.0
+
+RESYNC = {"type": "resync"}
+
+
+def format_sse(event: dict[str, Any]) -> str:
+    """One Server-Sent Events message; the change token doubles as the event id."""
+    lines = []
+    if event.get("token") is not None:
+        lines.append(f"id: {event['token']}")
+    lines.append(f"event: {event['type']}")
+    lines.append(f"data: {json.dumps(event, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
+
+
+def chunk_payloads(events: list[dict[str, Any]], limit: int = NOTIFY_PAYLOAD_LIMIT) -> list[str]:
+    """Pack events into JSON arrays that each fit in one NOTIFY payload."""
+    payloads: list[str] = []
+    batch: list[str] = []
+    size = 2
+    for event in events:
+        encoded = json.dumps(event, separators=(",", ":"))
+        if batch and size + len(encoded) + 1 > limit:
+            payloads.append(f"[{','.join(batch)}]")
+            batch, size = [], 2
+        batch.append(encoded)
+        size += len(encoded) + 1
+    if batch:
+        payloads.append(f"[{','.join(batch)}]")
+    return payloads
+
+
+class Subscription:
+    """One listener's queue, bound to the event loop it reads from."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue(SUBSCRIBER_QUEUE_SIZE)
+        # Set when events were dropped because the reader fell behind
+        self.overflowed = False
+
+    def put_many(self, events: list[dict[str, Any]]) -> None:
+        for event in events:
+            try:
+                self.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                self.overflowed = True
+                return
+
+
+class NoteEvents:
+    """In-process broker; `publish` may be called from any thread."""
+
+    def __init__(self) -> None:
+        self._subscribers: set[Subscription] = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self) -> Subscription:
+        subscription = Subscription(asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def stage(self, db: Session, events: list[dict[str, Any]]) -> None:
+        """Called inside the write transaction, before commit."""
+
+    def publish(self, events: list[dict[str, Any]]) -> None:
+        """Called after the write transaction committed."""
+        self._deliver(events)
+
+    def _deliver(self, events: list[dict[str, Any]]) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put_many, events)
+            except RuntimeError:
+                # Its event loop is closed; the stream is gone
+                self.unsubscribe(subscription)
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+
+class PostgresNoteEvents(NoteEvents):
+    """Cross-worker broker on PostgreSQL LISTEN/NOTIFY."""
+
+    def __init__(self, dsn: str) -> None:
+        super().__init__()
+        self.dsn = dsn
+        self._task: asyncio.Task | None = None
+
+    def stage(self, db: Session, events: list[dict[str, Any]]) -> None:
+        for payload in chunk_payloads(events):
+            db.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": CHANNEL, "payload": payload})
+
+    def publish(self, events: list[dict[str, Any]]) -> None:
+        # Delivered through LISTEN, to this worker as well
+        pass
+
+    def _on_notify(self, connection: Any, pid: int, channel: str, payload: str) -> None:
+        self._deliver(json.loads(payload))
+
+    async def _listen(self) -> None:
+        import asyncpg  # type: ignore[import-untyped, import-not-found]
+
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(self.dsn)
+                closed = asyncio.Event()
+                connection.add_termination_listener(lambda _: closed.set())
+                await connection.add_listener(CHANNEL, self._on_notify)
+                await closed.wait()
+            except asyncio.CancelledError:
+                if connection is not None:
+                    await connection.close()
+                raise
+            except Exception:
+                logger.exception("Note events listener disconnected")
+            # Anything sent while disconnected was missed
+            self._deliver([RESYNC])
+            await asyncio.sleep(LISTEN_RECONNECT_SECONDS)
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+def _asyncpg_dsn(database_url: str) -> str:
+    scheme, _, rest = database_url.partition("://")
+    return f"postgresql://{rest}" if scheme.startswith("postgresql") else database_url
+
+
+def build_note_events(backend: str, database_url: str) -> NoteEvents | None:
+    """Create the process-wide event broker from settings ("memory", "postgres" or "none")."""
+    if backend == "none":
+        return None
+    if backend == "memory":
+        return NoteEvents()
+    if backend == "postgres":
+        if not database_url.startswith("postgresql"):
+            raise ValueError("NOTE_EVENTS_BACKEND=postgres requires a PostgreSQL DATABASE_URL")
+        try:
+            import asyncpg  # type: ignore[import-untyped, import-not-found]  # noqa: F401
+        except ImportError as exc:
+            raise RuntimeError("NOTE_EVENTS_BACKEND=postgres requires the 'asyncpg' package") from exc
+        return PostgresNoteEvents(_asyncpg_dsn(database_url))
+    raise ValueError(f"Unknown note events backend: {backend}")
@@ -0,0 +1,143 @@
+"""Note revision history stored as compressed deltas with periodic snapshots.
+
+Every title/content/sidenote write of a note (one note version) adds a
+note_revisions row. Most rows are deltas against the previous version: per
+changed field, the length of the unchanged prefix and suffix plus the text in
+between, which for autosave-sized edits is a few bytes however long the note
+is. Every SNAPSHOT_INTERVAL versions (and whenever the previous version is
+missing, e.g. notes that predate history) a full snapshot is stored instead,
+so rebuilding any version reads one snapshot and at most SNAPSHOT_INTERVAL - 1
+deltas. Payloads are zlib-compressed JSON.
+"""
+import difflib
+import json
+import zlib
+from os.path import commonprefix
+from typing import Any
+
+from sqlalchemy import Row, func, select
+from sqlalchemy.orm import Session
+
+from app.models.history import NoteRevision
+
+SNAPSHOT_INTERVAL = 16
+
+FIELDS = ("title", "content", "sidenote")
+
+State = dict[str, str | None]
+
+
+def _pack(payload: dict[str, Any]) -> bytes:
+    return zlib.compress(json.dumps(payload, separators=(",", ":")).encode(), 6)
+
+
+def _unpack(data: bytes) -> dict[str, Any]:
+    return json.loads(zlib.decompress(data))
+
+
+def make_delta(before: State, after: State) -> dict[str, Any]:
+    """Per changed field: [prefix length, suffix length, replacement] or {"set": value} for None."""
+    delta: dict[str, Any] = {}
+    for field in FIELDS:
+        old, new = before.get(field), after.get(field)
+        if old == new:
+            continue
+        if old is None or new is None:
+            delta[field] = {"set": new}
+            continue
+        prefix = len(commonprefix([old, new]))
+        # The suffix may not overlap the prefix in either string
+        limit = min(len(old), len(new)) - prefix
+        suffix = len(commonprefix([old[::-1][:limit], new[::-1][:limit]]))
+        delta[field] = [prefix, suffix, new[prefix:len(new) - suffix]]
+    return delta
+
+
+def apply_delta(state: State, delta: dict[str, Any]) -> State:
+    result = dict(state)
+    for field, change in delta.items():
+        if isinstance(change, dict):
+            result[field] = change["set"]
+        else:
+            prefix, suffix, text = change
+            old = result[field] or ""
+            result[field] = old[:prefix] + text + old[len(old) - suffix:]
+    return result
+
+
+class HistoryService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def _exists(self, note_id: str, version: int) -> bool:
+        return self.db.get(NoteRevision, (note_id, version)) is not None
+
+    def _add(self, note_id: str, version: int, kind: str, payload: dict[str, Any]) -> None:
+        self.db.add(NoteRevision(note_id=note_id, version=version, kind=kind, data=_pack(payload)))
+
+    def record(self, note_id: str, version: int, before: State | None, after: State) -> None:
+        """Store `after` as `version` (no commit); `before` is the state at version - 1."""
+        if before is None or version <= 1:
+            # First version: there is nothing to diff against
+            self._add(note_id, version, "snapshot", after)
+            return
+        if not self._exists(note_id, version - 1):
+            # First edit with history enabled: keep the base version too
+            self._add(note_id, version - 1, "snapshot", before)
+        if (version - 1) % SNAPSHOT_INTERVAL == 0:
+            self._add(note_id, version, "snapshot", after)
+        else:
+            self._add(note_id, version, "delta", make_delta(before, after))
+
+    def list(self, note_id: str, limit: int = 100, before_version: int | None = None) -> list[Row]:
+        """Revision metadata (version, kind, stored size, created_at), newest first; payloads stay unread."""
+        query = select(
+            NoteRevision.version,
+            NoteRevision.kind,
+            func.length(NoteRevision.data).label("size"),
+            NoteRevision.created_at,
+        ).where(NoteRevision.note_id == note_id)
+        if before_version is not None:
+            query = query.where(NoteRevision.version < before_version)
+        return list(self.db.execute(query.order_by(NoteRevision.version.desc()).limit(limit)))
+
+    def get(self, note_id: str, version: int) -> State | None:
+        """Rebuild one version from the nearest snapshot at or below it."""
+        base = self.db.scalar(
+            select(func.max(NoteRevision.version)).where(
+                NoteRevision.note_id == note_id, NoteRevision.version <= version, NoteRevision.kind == "snapshot"
+            )
+        )
+        if base is None:
+            return None
+        rows = self.db.scalars(
+            select(NoteRevision)
+            .where(NoteRevision.note_id == note_id, NoteRevision.version >= base, NoteRevision.version <= version)
+            .order_by(NoteRevision.version)
+        ).all()
+        if not rows or rows[-1].version != version:
+            return None
+        state: State = _unpack(rows[0].data)
+        for row in rows[1:]:
+            state = apply_delta(state, _unpack(row.data))
+        return state
+
+    def diff(self, note_id: str, from_version: int, to_version: int) -> dict[str, str] | None:
+        """Unified line diff per changed field between two versions."""
+        old, new = self.get(note_id, from_version), self.get(note_id, to_version)
+        if old is None or new is None:
+            return None
+        diffs = {}
+        for field in FIELDS:
+            if old[field] == new[field]:
+                continue
+            # Lines without their endings, so a last line lacking "\n" can't run into the next
+            lines = difflib.unified_diff(
+                (old[field] or "").splitlines(),
+                (new[field] or "").splitlines(),
+                fromfile=f"v{from_version}",
+                tofile=f"v{to_version}",
+                lineterm="",
+            )
+            diffs[field] = "".join(f"{line}\n" for line in lines)
+        return diffs
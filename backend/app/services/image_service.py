@@ -0,0 +1,203 @@
+"""Responsive derivatives for uploaded images.
+
+For every raster upload the pipeline writes resized copies next to the blob,
+named "<blob stem>.w<width>.<format>", in WebP and (when Pillow was built with
+libavif) AVIF. HEIC/HEIF originals, which browsers cannot display, also get
+JPEG (or PNG, if they have alpha) copies that serve as the `src`.
+
+Encoding is CPU-bound, so it runs in a process pool after the response has
+been sent; the upload response already lists the URLs the pipeline is going
+to produce, and GET /api/uploads/variants/... reports what exists on disk.
+Requires Pillow; pillow-heif is optional and adds HEIC/HEIF decoding.
+"""
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:  # Pillow not installed: uploads are served as-is
+    Image = None  # type: ignore[assignment]
+
+try:
+    import pillow_heif  # type: ignore[import-not-found, import-untyped]
+
+    pillow_heif.register_heif_opener()
+except ImportError:  # No HEIC/HEIF decoding
+    pillow_heif = None
+
+# srcset widths; the original width (capped at MAX_WIDTH) is always added
+DERIVATIVE_WIDTHS = (320, 640, 1280)
+MAX_WIDTH = 2048
+
+RASTER_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".heic", ".heif"}
+# Browsers cannot render these, so they also get a JPEG/PNG `src`
+FALLBACK_EXTENSIONS = {".heic", ".heif"}
+
+QUALITY = {"webp": 80, "avif": 60, "jpeg": 85}
+ORIENTATION_TAG = 0x0112
+
+MIME_TYPES = {"avif": "image/avif", "webp": "image/webp", "jpeg": "image/jpeg", "png": "image/png"}
+
+
+def modern_formats() -> list[str]:
+    """Smallest first, which is also the order <picture> sources should be listed."""
+    if Image is None:
+        return []
+    return (["avif"] if features.check("avif") else []) + ["webp"]
+
+
+def can_process(blob_name: str) -> bool:
+    suffix = Path(blob_name).suffix.lower()
+    if Image is None or suffix not in RASTER_EXTENSIONS:
+        return False
+    return suffix not in FALLBACK_EXTENSIONS or pillow_heif is not None
+
+
+def plan_widths(width: int) -> list[int]:
+    top = min(width, MAX_WIDTH)
+    return sorted({w for w in DERIVATIVE_WIDTHS if w < top} | {top})
+
+
+def variant_name(blob_name: str, width: int, fmt: str) -> str:
+    path = Path(blob_name)
+    return str(path.with_name(f"{path.stem}.w{width}.{fmt}"))
+
+
+def planned_variants(blob_name: str, width: int, fallback: str | None) -> list[str]:
+    """Names of every derivative generate_variants() writes for an image this wide."""
+    formats = modern_formats() + ([fallback] if fallback else [])
+    return [variant_name(blob_name, w, fmt) for w in plan_widths(width) for fmt in formats]
+
+
+def _fallback_format(image: Any) -> str:
+    return "png" if image.mode in ("RGBA", "LA", "P") else "jpeg"
+
+
+def image_info(root: Path, blob_name: str) -> dict[str, Any] | None:
+    """Dimensions and planned formats, from the header only (no decode)."""
+    if not can_process(blob_name):
+        return None
+    try:
+        with Image.open(root / blob_name) as image:
+            width, height = image.size
+            # EXIF orientations 5-8 are rotated by 90 degrees
+            if image.getexif().get(ORIENTATION_TAG, 1) in (5, 6, 7, 8):
+                width, height = height, width
+            fallback = _fallback_format(image) if Path(blob_name).suffix.lower() in FALLBACK_EXTENSIONS else None
+    except Exception:
+        return None
+    return {"width": width, "height": height, "fallback": fallback}
+
+
+def generate_variants(root: str, blob_name: str) -> list[str]:
+    """Write every missing derivative of one blob (runs in a worker process)."""
+    source = Path(root) / blob_name
+    formats = modern_formats()
+    written: list[str] = []
+    try:
+        with Image.open(source) as original:
+            fallback = _fallback_format(original) if source.suffix.lower() in FALLBACK_EXTENSIONS else None
+            image = ImageOps.exif_transpose(original)
+            for width in plan_widths(image.width):
+                resized = image.copy()
+                resized.thumbnail((width, image.height), Image.Resampling.LANCZOS)
+                for fmt in formats + ([fallback] if fallback else []):
+                    name = variant_name(blob_name, width, fmt)
+                    target = Path(root) / name
+                    if target.exists():
+                        continue
+                    frame = resized if fmt != "jpeg" or resized.mode == "RGB" else resized.convert("RGB")
+                    tmp = target.with_name(f".{target.name}.tmp")
+                    frame.save(tmp, format=fmt.upper(), quality=QUALITY.get(fmt, 85))
+                    tmp.replace(target)
+                    written.append(name)
+    except Exception:
+        # Corrupt or hostile input (e.g. decompression bomb): serve the original only
+        return written
+    return written
+
+
+def _sources(url_prefix: str, blob_name: str, widths_by_format: dict[str, list[int]]) -> list[dict[str, str]]:
+    return [
+        {
+            "type": MIME_TYPES[fmt],
+            "srcset": ", ".join(f"{url_prefix}/{variant_name(blob_name, w, fmt)} {w}w" for w in sorted(widths)),
+        }
+        for fmt, widths in widths_by_format.items()
+    ]
+
+
+def srcset(url_prefix: str, blob_name: str, widths: list[int], formats: list[str], fallback: str | None) -> dict:
+    """<picture>-ready description: one source per format plus a `src`."""
+    src = f"{url_prefix}/{blob_name}"
+    if fallback and widths:
+        src = f"{url_prefix}/{variant_name(blob_name, max(widths), fallback)}"
+    return {"src": src, "sources": _sources(url_prefix, blob_name, {fmt: widths for fmt in formats})}
+
+
+def describe_variants(root: Path, blob_name: str, url_prefix: str) -> dict | None:
+    """Like srcset(), but for the derivatives that currently exist on disk."""
+    path = root / blob_name
+    found: dict[str, list[int]] = {}
+    for candidate in path.parent.glob(f"{path.stem}.w*.*"):
+        width, _, fmt = candidate.name[len(path.stem) + 2:].partition(".")
+        if width.isdigit() and fmt in MIME_TYPES:
+            found.setdefault(fmt, []).append(int(width))
+    if not found:
+        return None
+    src = f"{url_prefix}/{blob_name}"
+    fallback = next((fmt for fmt in ("jpeg", "png") if fmt in found), None)
+    if fallback:
+        src = f"{url_prefix}/{variant_name(blob_name, max(found[fallback]), fallback)}"
+    modern: dict[str, list[int]] = {fmt: found[fmt] for fmt in ("avif", "webp") if fmt in found}
+    return {"src": src, "sources": _sources(url_prefix, blob_name, modern)}
+
+
+class ImagePipeline:
+    """Runs generate_variants in a lazily started process pool."""
+
+    def __init__(self, root: Path, workers: int):
+        self.root = root
+        self.workers = workers
+        self._pool: ProcessPoolExecutor | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.workers > 0 and Image is not None
+
+    def plan(self, blob_name: str, url_prefix: str) -> dict | None:
+        """URLs the pipeline will produce for a blob (for the upload response)."""
+        if not self.enabled:
+            return None
+        info = image_info(self.root, blob_name)
+        if info is None:
+            return None
+        widths = plan_widths(info["width"])
+        return {
+            "width": info["width"],
+            "height": info["height"],
+            **srcset(url_prefix, blob_name, widths, modern_formats(), info["fallback"]),
+        }
+
+    def has_variants(self, blob_name: str) -> bool:
+        """Whether every planned derivative is already on disk (header read only)."""
+        info = image_info(self.root, blob_name)
+        if info is None:
+            return False
+        names = planned_variants(blob_name, info["width"], info["fallback"])
+        return all((self.root / name).exists() for name in names)
+
+    async def generate(self, blob_name: str) -> list[str]:
+        if not self.enabled or not can_process(blob_name):
+            return []
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool, generate_variants, str(self.root), blob_name)
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
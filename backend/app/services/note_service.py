@@ -1,58 +1,561 @@
+import base64
+import html
+import json
 import uuid
+from collections.abc import Iterator
+from datetime import datetime, timedelta
 
-from sqlalchemy import func, text
-from sqlalchemy.orm import Session
+from sqlalchemy import ColumnElement, DateTime, Text, and_, delete, func, insert, literal, or_, select, text, update
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy.orm.attributes import set_committed_value
 
-from app.models.note import Note
-from app.schemas.note import NoteCreate, NoteUpdate, NoteReorder
+from app.models.change import NoteChange
+from app.models.note import Note, utc_now
+from app.models.revision import TableRevision
+from app.models.search import SEARCH_CONFIG
+from app.schemas.note import (
+    NoteChanges,
+    NoteCreate,
+    NoteImportNode,
+    NoteImportResult,
+    NoteMove,
+    NotePatch,
+    NoteReorder,
+    NoteResponse,
+    NoteRevisionContent,
+    NoteRevisionDiff,
+    NoteRevisionInfo,
+    NoteSearchHit,
+    NoteSearchPage,
+    NoteSummary,
+    NoteTreeNode,
+    NoteUpdate,
+    TextEdit,
+    TrashedNote,
+)
+from app.services.blob_service import BlobService, extract_blob_hashes
+from app.services.bulk import insert_rows
+from app.services.cache import NoteCache
+from app.services.events import NoteEvents
+from app.services.history import HistoryService
+from app.services.ranking import REBALANCE_LENGTH, rank_between, spread_ranks
+
+
+class ChangesExpired(ValueError):
+    """The change token is older than the retained log (or from another database)."""
+
+
+class VersionConflict(ValueError):
+    """The client edited an older version of the note than the stored one."""
+
+    def __init__(self, current_version: int):
+        super().__init__(f"Note has changed (now at version {current_version})")
+        self.current_version = current_version
+
+
+# Notes not in the trash; every read and sibling computation filters on it
+LIVE = Note.deleted_at.is_(None)
+
+# Trashed rows hard-deleted per purge transaction
+PURGE_BATCH_SIZE = 500
+
+# Writing any of these makes a new note version
+VERSIONED_FIELDS = ("title", "content", "sidenote")
+
+# Appended to a duplicated note's title, which is cut short to keep it in the column
+COPY_SUFFIX = " (copy)"
+TITLE_MAX_LENGTH = Note.__table__.c.title.type.length
+
+# Private-use characters the database wraps matches in; the snippet is
+# HTML-escaped before they become <mark> tags, so note markup stays inert
+HIGHLIGHT_START = "\ue000"
+HIGHLIGHT_STOP = "\ue001"
+
+
+def apply_text_edits(text: str, edits: list[TextEdit]) -> str:
+    """Apply splice edits in order; raises ValueError if one falls outside the text.
+
+    Offsets count UTF-16 code units, like JavaScript string indices, so the
+    text is spliced as UTF-16 (two bytes per unit). An edit that leaves half
+    of a surrogate pair behind is rejected.
+    """
+    units = text.encode("utf-16-le")
+    for edit in edits:
+        start, end = edit.pos * 2, (edit.pos + edit.delete) * 2
+        if end > len(units):
+            raise ValueError(f"Edit at {edit.pos} (+{edit.delete}) is past the end of the text ({len(units) // 2})")
+        units = units[:start] + edit.insert.encode("utf-16-le") + units[end:]
+    try:
+        return units.decode("utf-16-le")
+    except UnicodeDecodeError:
+        raise ValueError("Edits split a surrogate pair (an emoji or other non-BMP character)") from None
+
+
+def _highlight(snippet: str | None) -> str | None:
+    """Escape a raw search snippet and turn the match delimiters into <mark> tags."""
+    if snippet is None:
+        return None
+    return html.escape(snippet).replace(HIGHLIGHT_START, "<mark>").replace(HIGHLIGHT_STOP, "</mark>")
+
+
+def _versioned_state(note: Note) -> dict[str, str | None]:
+    return {field: getattr(note, field) for field in VERSIONED_FIELDS}
+
+
+def encode_cursor(note: Note, sort_attr: str = "position") -> str:
+    """Encode the sort key of the last note on a page as an opaque cursor."""
+    key = [note.parent_id, getattr(note, sort_attr), note.created_at.isoformat(), note.id]
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[str | None, int | str, datetime, str]:
+    try:
+        parent_id, sort_value, created_at, note_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not isinstance(sort_value, (int, str)):
+            raise TypeError(sort_value)
+        return parent_id, sort_value, datetime.fromisoformat(created_at), str(note_id)
+    except (ValueError, TypeError) as exc:
+        raise ValueError("Invalid cursor") from exc
+
+
+def _to_cache(note: Note) -> dict:
+    return NoteResponse.model_validate(note).model_dump(mode="json")
+
+
+def _from_cache(data: dict) -> Note:
+    """Rebuild a detached (read-only) Note from its cached JSON form."""
+    return Note(**NoteResponse.model_validate(data).model_dump())
 
 
 class NoteService:
-    def __init__(self, db: Session):
+    def __init__(
+        self,
+        db: Session,
+        cache: NoteCache | None = None,
+        ordering_mode: str = "position",
+        events: NoteEvents | None = None,
+        delete_mode: str = "hard",
+    ):
         self.db = db
+        self.cache = cache
+        self.events = events
+        # "trash": delete() sets deleted_at and purge_trash() removes the rows later
+        self.soft_delete = delete_mode == "trash"
+        # "position": dense integer positions, renormalized on every move.
+        # "rank": fractional string ranks; a move writes only the moved row and
+        # positions in responses are derived from rank order on read.
+        self.rank_mode = ordering_mode == "rank"
+        # Sibling groups whose ranks grew long enough to need a rebalance
+        self.rebalance_parents: set[str | None] = set()
+        # Keys touched by the current transaction, invalidated after commit
+        self._stale_ids: set[str] = set()
+        self._stale_parents: set[str | None] = set()
+        # Change-log entries for the current transaction: note id -> "upsert" / "delete"
+        self._changes: dict[str, str] = {}
+        # Rank mode: sibling groups whose derived positions shifted
+        self._shifted_parents: set[str | None] = set()
+        # Push notifications for the current transaction, sent on commit
+        self._events: list[dict] = []
+
+    @property
+    def _sort_attr(self) -> str:
+        return "rank" if self.rank_mode else "position"
+
+    def _derive_positions(self, notes: list[Note]) -> list[Note]:
+        """In rank mode, report each note's index within its (already sorted) parent group."""
+        if self.rank_mode:
+            counters: dict[str | None, int] = {}
+            for note in notes:
+                index = counters.get(note.parent_id, 0)
+                counters[note.parent_id] = index + 1
+                # Not a change to persist, so bypass dirty tracking
+                set_committed_value(note, "position", index)
+        return notes
 
     def get_all(self) -> list[Note]:
         """Get all notes ordered by position within their parent groups."""
-        return self.db.query(Note).order_by(Note.parent_id.nullsfirst(), Note.position, Note.created_at.desc()).all()
+        if self.cache is not None:
+            cached = self.cache.get(NoteCache.all_key())
+            if cached is not None:
+                return [_from_cache(item) for item in cached]
+        sort_key = getattr(Note, self._sort_attr)
+        notes = (
+            self.db.query(Note)
+            .filter(LIVE)
+            .order_by(Note.parent_id.nullsfirst(), sort_key, Note.created_at.desc())
+            .all()
+        )
+        self._derive_positions(notes)
+        if self.cache is not None:
+            self.cache.set(NoteCache.all_key(), [_to_cache(note) for note in notes])
+        return notes
+
+    def get_page(self, cursor: str | None = None, limit: int = 100) -> tuple[list[Note], str | None]:
+        """Keyset-paginate notes in get_all() order (id breaks ties).
+
+        Returns the page and a cursor for the next one (None on the last page).
+        Each page is a single indexed range scan, independent of how deep it is.
+        """
+        sort_key = getattr(Note, self._sort_attr)
+        query = self.db.query(Note).filter(LIVE)
+        if cursor is not None:
+            parent_id, sort_value, created_at, note_id = decode_cursor(cursor)
+            same_parent = Note.parent_id.is_(None) if parent_id is None else Note.parent_id == parent_id
+            # NULL parents sort first, so any non-NULL parent comes after a root cursor
+            later_parent = Note.parent_id.isnot(None) if parent_id is None else Note.parent_id > parent_id
+            query = query.filter(
+                or_(
+                    later_parent,
+                    and_(
+                        same_parent,
+                        or_(
+                            sort_key > sort_value,
+                            and_(
+                                sort_key == sort_value,
+                                or_(
+                                    Note.created_at < created_at,
+                                    and_(Note.created_at == created_at, Note.id > note_id),
+                                ),
+                            ),
+                        ),
+                    ),
+                )
+            )
+        notes = (
+            query.order_by(Note.parent_id.nullsfirst(), sort_key, Note.created_at.desc(), Note.id)
+            .limit(limit + 1)
+            .all()
+        )
+        cursor_note = notes[limit - 1] if len(notes) > limit else None
+        notes = notes[:limit]
+        self._derive_page_positions(notes)
+        if cursor_note is not None:
+            return notes, encode_cursor(cursor_note, self._sort_attr)
+        return notes, None
+
+    def _derive_page_positions(self, notes: list[Note]) -> None:
+        """Rank mode: like _derive_positions, but the first group may start mid-way on a page."""
+        if not self.rank_mode or not notes:
+            return
+        first = notes[0]
+        offset = 0
+        if first.rank is not None:
+            offset = self.db.query(func.count(Note.id)).filter(
+                Note.parent_id == first.parent_id, Note.rank < first.rank, LIVE
+            ).scalar() or 0
+        counters: dict[str | None, int] = {first.parent_id: offset}
+        for note in notes:
+            index = counters.get(note.parent_id, 0)
+            counters[note.parent_id] = index + 1
+            set_committed_value(note, "position", index)
+
+    def iter_all(self, batch_size: int = 500) -> Iterator[Note]:
+        """Stream every note in get_all() order without materializing the table.
+
+        Uses a server-side cursor on PostgreSQL; rows are fetched `batch_size`
+        at a time and expunged so the session doesn't accumulate them.
+        """
+        sort_key = getattr(Note, self._sort_attr)
+        query = (
+            self.db.query(Note)
+            .filter(LIVE)
+            .order_by(Note.parent_id.nullsfirst(), sort_key, Note.created_at.desc(), Note.id)
+            .execution_options(stream_results=True)
+            .yield_per(batch_size)
+        )
+        counters: dict[str | None, int] = {}
+        for note in query:
+            if self.rank_mode:
+                index = counters.get(note.parent_id, 0)
+                counters[note.parent_id] = index + 1
+                set_committed_value(note, "position", index)
+            yield note
+            self.db.expunge(note)
+
+    def get_summaries(self, path_prefix: str | None = None) -> list[NoteSummary]:
+        """Get id/title/parent_id/position for all notes, in the same order as get_all().
+
+        Column-only query: the large content/sidenote Text columns are never loaded.
+        `path_prefix` restricts it to one subtree via the materialized path index.
+        """
+        query = self.db.query(Note.id, Note.title, Note.parent_id, Note.position).filter(LIVE)
+        if path_prefix is not None:
+            query = query.filter(Note.path.startswith(path_prefix, autoescape=True))
+        rows = (
+            query.order_by(Note.parent_id.nullsfirst(), getattr(Note, self._sort_attr), Note.created_at.desc())
+            .all()
+        )
+        summaries = [NoteSummary.model_validate(row) for row in rows]
+        if self.rank_mode:
+            counters: dict[str | None, int] = {}
+            for summary in summaries:
+                summary.position = counters.get(summary.parent_id, 0)
+                counters[summary.parent_id] = summary.position + 1
+        return summaries
+
+    def get_tree(self, root_id: str | None = None, max_depth: int | None = None) -> list[NoteTreeNode] | None:
+        """Build the nested page tree from a single summary query in O(n).
+
+        Returns the root-level pages, or just the subtree under `root_id`
+        (None if that note does not exist). `max_depth` limits how many levels
+        of children are attached below the returned nodes (0 = no children).
+        """
+        path_prefix = None
+        if root_id is not None:
+            path_prefix = self.db.query(Note.path).filter(Note.id == root_id, LIVE).scalar()
+            if path_prefix is None:
+                return None
+        rows = self.get_summaries(path_prefix)
+        children_by_parent: dict[str | None, list[NoteSummary]] = {}
+        rows_by_id: dict[str, NoteSummary] = {}
+        for row in rows:
+            children_by_parent.setdefault(row.parent_id, []).append(row)
+            rows_by_id[row.id] = row
+
+        if root_id is not None:
+            top_rows = [rows_by_id[root_id]]
+        else:
+            top_rows = children_by_parent.get(None, [])
+
+        roots = [NoteTreeNode(**row.model_dump()) for row in top_rows]
+        # Iterative walk so deep trees don't hit the recursion limit
+        stack = [(node, 0) for node in roots]
+        while stack:
+            node, depth = stack.pop()
+            if max_depth is not None and depth >= max_depth:
+                continue
+            node.children = [NoteTreeNode(**row.model_dump()) for row in children_by_parent.get(node.id, [])]
+            stack.extend((child, depth + 1) for child in node.children)
+        return roots
+
+    def search(self, query: str, limit: int = 20, offset: int = 0) -> NoteSearchPage:
+        """Ranked full-text search over title, content and sidenote.
+
+        PostgreSQL uses the GIN-indexed search_vector column; SQLite uses the
+        notes_fts FTS5 table. Snippets are only built for the returned page,
+        and are HTML-escaped with matches wrapped in <mark>.
+        """
+        if not query.strip():
+            return NoteSearchPage(items=[])
+        if self.db.get_bind().dialect.name == "postgresql":
+            sql = text(
+                f"""
+                WITH q AS (SELECT websearch_to_tsquery('{SEARCH_CONFIG}', :query) AS query),
+                hits AS (
+                    SELECT n.id, n.title, n.parent_id, n.content, n.sidenote,
+                           ts_rank(n.search_vector, q.query) AS score
+                    FROM notes n, q
+                    WHERE n.search_vector @@ q.query AND n.deleted_at IS NULL
+                    ORDER BY score DESC, n.id
+                    LIMIT :limit OFFSET :offset
+                )
+                SELECT hits.id, hits.title, hits.parent_id, hits.score,
+                       ts_headline('{SEARCH_CONFIG}', concat_ws(' ', hits.title, hits.content, hits.sidenote),
+                                   q.query, :headline_options) AS snippet
+                FROM hits, q
+                ORDER BY hits.score DESC, hits.id
+                """
+            )
+            params = {
+                "query": query,
+                "limit": limit + 1,
+                "offset": offset,
+                "headline_options": f"StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_STOP}, MaxFragments=2",
+            }
+        else:
+            # Quote each term so user input can't hit FTS5 query syntax errors
+            match = " ".join('"' + term.replace('"', '""') + '"' for term in query.split())
+            sql = text(
+                """
+                SELECT n.id, n.title, n.parent_id,
+                       -bm25(notes_fts, 10.0, 4.0, 1.0) AS score,
+                       snippet(notes_fts, -1, :start, :stop, '…', 16) AS snippet
+                FROM notes_fts JOIN notes n ON n.rowid = notes_fts.rowid
+                WHERE notes_fts MATCH :match AND n.deleted_at IS NULL
+                ORDER BY score DESC, n.id
+                LIMIT :limit OFFSET :offset
+                """
+            )
+            params = {
+                "match": match,
+                "limit": limit + 1,
+                "offset": offset,
+                "start": HIGHLIGHT_START,
+                "stop": HIGHLIGHT_STOP,
+            }
+        rows = self.db.execute(sql, params).all()
+        items = [
+            NoteSearchHit.model_validate({**row._mapping, "snippet": _highlight(row.snippet)}) for row in rows[:limit]
+        ]
+        return NoteSearchPage(items=items, next_offset=offset + limit if len(rows) > limit else None)
 
     def get_by_id(self, note_id: str) -> Note | None:
-        return self.db.query(Note).filter(Note.id == note_id).first()
+        """Get a note for reading; served from the cache when one is configured.
+
+        Cached results are detached copies, so write paths use _load() instead.
+        """
+        if self.cache is None:
+            return self._load(note_id)
+        key = NoteCache.note_key(note_id)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return _from_cache(cached)
+        note = self._load(note_id)
+        if note is not None:
+            self.cache.set(key, _to_cache(note))
+        return note
+
+    def _load(self, note_id: str, for_update: bool = False) -> Note | None:
+        query = self.db.query(Note).filter(Note.id == note_id, LIVE)
+        if for_update:
+            # Writers of versioned fields serialize on the row, so the state
+            # read here is exactly the previous version for the history delta
+            query = query.with_for_update().populate_existing()
+        note = query.first()
+        if note is not None:
+            self._derive_position(note)
+        return note
+
+    def _derive_position(self, note: Note) -> None:
+        """In rank mode, report a single note's index among its siblings."""
+        if self.rank_mode and note.rank is not None:
+            index = self.db.query(func.count(Note.id)).filter(
+                Note.parent_id == note.parent_id, Note.rank < note.rank, LIVE
+            ).scalar()
+            set_committed_value(note, "position", index or 0)
 
     def get_children(self, parent_id: str | None) -> list[Note]:
         """Get direct children of a parent (or root notes if parent_id is None)."""
-        query = self.db.query(Note).filter(Note.parent_id == parent_id)
-        return query.order_by(Note.position).all()
+        key = NoteCache.children_key(parent_id)
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return [_from_cache(item) for item in cached]
+        query = self.db.query(Note).filter(Note.parent_id == parent_id, LIVE)
+        notes = self._derive_positions(query.order_by(getattr(Note, self._sort_attr)).all())
+        if self.cache is not None:
+            self.cache.set(key, [_to_cache(note) for note in notes])
+        return notes
+
+    def get_revision(self) -> tuple[int, datetime | None]:
+        """Return the notes table change counter and when it last moved."""
+        row = self.db.query(TableRevision.revision, TableRevision.updated_at).filter(
+            TableRevision.name == Note.__tablename__
+        ).first()
+        if row is None:
+            return 0, None
+        return row.revision, row.updated_at
+
+    def get_updated_at(self, note_id: str) -> datetime | None:
+        """Return a note's updated_at without loading its body columns."""
+        return self.db.query(Note.updated_at).filter(Note.id == note_id, LIVE).scalar()
+
+    def get_validators(self, note_id: str) -> tuple[datetime, int | None] | None:
+        """updated_at plus, in rank mode, the derived position (which sibling moves change, not updated_at)."""
+        row = self.db.query(Note.updated_at, Note.parent_id, Note.rank).filter(Note.id == note_id, LIVE).first()
+        if row is None:
+            return None
+        if not self.rank_mode or row.rank is None:
+            return row.updated_at, None
+        position = self.db.query(func.count(Note.id)).filter(
+            Note.parent_id == row.parent_id, Note.rank < row.rank, LIVE
+        ).scalar()
+        return row.updated_at, position or 0
+
+    def _bump_revision(self) -> None:
+        """Advance the notes change counter inside the current transaction."""
+        result = self.db.execute(
+            update(TableRevision)
+            .where(TableRevision.name == Note.__tablename__)
+            .values(revision=TableRevision.revision + 1, updated_at=utc_now())
+        )
+        if result.rowcount == 0:
+            self.db.add(TableRevision(name=Note.__tablename__, revision=1))
+            self.db.flush()
+
+    def _mark_stale(self, note_id: str | None = None, parent_id: str | None = None) -> None:
+        if note_id is not None:
+            self._stale_ids.add(note_id)
+            self._changes.setdefault(note_id, "upsert")
+        self._stale_parents.add(parent_id)
+
+    def _record_changes(self) -> None:
+        """Append the transaction's writes to the change log.
+
+        Runs after _bump_revision, whose row lock serializes note writers, so
+        sequence numbers are handed out in commit order.
+        """
+        now = utc_now()
+        insert_rows(
+            self.db,
+            NoteChange.__table__,
+            [{"note_id": note_id, "op": op, "changed_at": now} for note_id, op in self._changes.items()],
+        )
+        # Rank mode logs only the notes written, not the siblings whose derived
+        # positions shifted: clients re-sort a group by the rank each note carries
+        self._changes.clear()
+
+    def _shifted_siblings(self) -> ColumnElement[bool]:
+        """Filter matching every note in the _shifted_parents sibling groups."""
+        return or_(*(Note.parent_id.is_(None) if p is None else Note.parent_id == p for p in self._shifted_parents))
+
+    def _emit(self, event_type: str, note_id: str | None = None, parent_id: str | None = None) -> None:
+        self._events.append({"type": event_type, "id": note_id, "parent_id": parent_id})
+
+    def _commit(self) -> None:
+        """Bump the change counter, log changes, commit, then drop cache keys and push events."""
+        self._bump_revision()
+        if self.cache is not None and self._shifted_parents:
+            # Rank mode: the siblings' derived positions moved; drop their cached bodies
+            self._stale_ids.update(self.db.scalars(select(Note.id).where(self._shifted_siblings(), LIVE)))
+        self._record_changes()
+        self._shifted_parents.clear()
+        events: list[dict] = []
+        if self.events is not None and self._events:
+            # Still under the revision lock, so the newest entry is this transaction's
+            token = self.db.query(func.max(NoteChange.seq)).scalar()
+            events = [{**event, "token": token} for event in self._events]
+            self.events.stage(self.db, events)
+        self._events.clear()
+        self.db.commit()
+        if self.cache is not None:
+            self.cache.invalidate(self._stale_ids, self._stale_parents)
+        self._stale_ids.clear()
+        self._stale_parents.clear()
+        if self.events is not None and events:
+            self.events.publish(events)
 
     def _parent_exists(self, parent_id: str | None) -> bool:
         if parent_id is None:
             return True
-        return self.db.query(Note.id).filter(Note.id == parent_id).first() is not None
+        return self.db.query(Note.id).filter(Note.id == parent_id, LIVE).first() is not None
 
     def _get_next_position(self, parent_id: str | None) -> int:
         """Get the next available position for a given parent (0-indexed)."""
         count = self.db.query(func.count(Note.id)).filter(
-            Note.parent_id == parent_id
+            Note.parent_id == parent_id, LIVE
         ).scalar()
         return count or 0
 
     def _normalize_positions(self, parent_id: str | None) -> None:
         notes = (
             self.db.query(Note)
-            .filter(Note.parent_id == parent_id)
+            .filter(Note.parent_id == parent_id, LIVE)
             .order_by(Note.position, Note.created_at, Note.id)
             .all()
         )
         for index, note in enumerate(notes):
             if note.position != index:
                 note.position = index
+                self._mark_stale(note.id, parent_id)
         self.db.flush()
 
     def create(self, data: NoteCreate) -> Note:
         note_id = str(uuid.uuid4())
         if data.parent_id == note_id:
             raise ValueError("Note cannot be its own parent")
-        if not self._parent_exists(data.parent_id):
-            raise ValueError("Parent note does not exist")
+        # Raises if the parent does not exist
+        parent_path = self._path_of(data.parent_id)
 
         # Auto-assign position at the end of the list
         position = self._get_next_position(data.parent_id)
@@ -64,26 +567,37 @@ class NoteService:
             sidenote=data.sidenote,
             parent_id=data.parent_id,
             position=position,
+            rank=self._append_rank(data.parent_id) if self.rank_mode else None,
+            path=f"{parent_path}{note_id}/",
         )
         self.db.add(note)
         self.db.flush()
+        BlobService(self.db).sync_note_refs(note.id, data.content, data.sidenote, is_new=True)
+        HistoryService(self.db).record(note.id, note.version, None, _versioned_state(note))
+        self._mark_stale(note.id, data.parent_id)
+        self._emit("created", note.id, data.parent_id)
 
         # Normalize to ensure clean 0-indexed positions
-        self._normalize_positions(data.parent_id)
+        if not self.rank_mode:
+            self._normalize_positions(data.parent_id)
 
-        self.db.commit()
-        self.db.refresh(note)
+        self._commit()
+        self._refresh(note)
         return note
 
     def update(self, note_id: str, data: NoteUpdate) -> Note | None:
-        note = self.get_by_id(note_id)
+        note = self._load(note_id, for_update=True)
         if not note:
             return None
+        before = _versioned_state(note)
 
         # Track old parent_id to normalize positions after parent change
         old_parent_id = note.parent_id
 
         update_data = data.model_dump(exclude_unset=True)
+        expected_version = update_data.pop("version", None)
+        if expected_version is not None and expected_version != note.version:
+            raise VersionConflict(note.version)
         if "parent_id" in update_data:
             new_parent_id = update_data["parent_id"]
             if new_parent_id == note_id:
@@ -92,19 +606,127 @@ class NoteService:
                 raise ValueError("Parent note does not exist")
             if new_parent_id and self._is_descendant(new_parent_id, note_id):
                 raise ValueError("Cannot move note under its own descendant")
+            if new_parent_id != old_parent_id:
+                self._move_subtree(note, new_parent_id)
         for field, value in update_data.items():
             setattr(note, field, value)
-
-        self.db.commit()
+        if any(field in update_data for field in VERSIONED_FIELDS):
+            if expected_version is not None:
+                self._claim_version(note, expected_version)
+            else:
+                note.version += 1
+            HistoryService(self.db).record(note_id, note.version, before, _versioned_state(note))
+        if "content" in update_data or "sidenote" in update_data:
+            BlobService(self.db).sync_note_refs(note_id, note.content, note.sidenote)
+        self._mark_stale(note_id, old_parent_id)
+        self._mark_stale(parent_id=note.parent_id)
+        self._emit("moved" if note.parent_id != old_parent_id else "updated", note_id, note.parent_id)
 
         # Normalize positions if parent changed
         if "parent_id" in update_data and update_data["parent_id"] != old_parent_id:
-            self._normalize_positions(old_parent_id)
-            self._normalize_positions(update_data["parent_id"])
+            if self.rank_mode:
+                note.rank = self._append_rank(note.parent_id)
+                self._shifted_parents.add(old_parent_id)
+            else:
+                self.db.flush()
+                self._normalize_positions(old_parent_id)
+                self._normalize_positions(update_data["parent_id"])
 
-        self.db.refresh(note)
+        self._commit()
+        self._refresh(note)
+        return note
+
+    def _claim_version(self, note: Note, expected_version: int) -> None:
+        """Compare-and-set the version in SQL, so a write that committed since we read loses the race."""
+        claimed = self.db.execute(
+            update(Note)
+            .where(Note.id == note.id, Note.version == expected_version)
+            .values(version=expected_version + 1)
+            .execution_options(synchronize_session=False)
+        )
+        if claimed.rowcount == 0:
+            self.db.rollback()
+            current = self.db.query(Note.version).filter(Note.id == note.id).scalar()
+            raise VersionConflict(current or 0)
+        set_committed_value(note, "version", expected_version + 1)
+
+    def patch(self, note_id: str, data: NotePatch) -> Note | None:
+        """Apply text edits made against `data.version` (optimistic concurrency).
+
+        Only the edits cross the wire; they are applied to the stored text
+        here, and the write goes through only if the note is still at the
+        client's version, otherwise VersionConflict.
+        """
+        note = self._load(note_id, for_update=True)
+        if not note:
+            return None
+        if note.version != data.version:
+            raise VersionConflict(note.version)
+        before = _versioned_state(note)
+
+        changes: dict[str, str] = {}
+        for field in ("content", "sidenote"):
+            edits = getattr(data, field)
+            if edits:
+                changes[field] = apply_text_edits(getattr(note, field) or "", edits)
+        if data.title is not None:
+            changes["title"] = data.title
+        if not changes:
+            return note
+
+        self._claim_version(note, data.version)
+        for field, value in changes.items():
+            setattr(note, field, value)
+        HistoryService(self.db).record(note_id, note.version, before, _versioned_state(note))
+        if "content" in changes or "sidenote" in changes:
+            BlobService(self.db).sync_note_refs(note_id, note.content, note.sidenote)
+        self._mark_stale(note_id, note.parent_id)
+        self._emit("updated", note_id, note.parent_id)
+        self._commit()
+        self._refresh(note)
         return note
 
+    def save_batch(self, changes: dict[str, dict[str, str | None]]) -> list[str]:
+        """Write coalesced title/content/sidenote values for many notes in one transaction.
+
+        Each note whose fields change gets one new version. Notes deleted in
+        the meantime are skipped. Returns the ids written.
+        """
+        if not changes:
+            return []
+        # Locked in id order so concurrent batches cannot deadlock
+        notes = (
+            self.db.query(Note)
+            .filter(Note.id.in_(list(changes)), LIVE)
+            .order_by(Note.id)
+            .with_for_update()
+            .populate_existing()
+            .all()
+        )
+        history = HistoryService(self.db)
+        blobs = BlobService(self.db)
+        written = []
+        for note in notes:
+            fields = {field: value for field, value in changes[note.id].items() if field in VERSIONED_FIELDS}
+            before = _versioned_state(note)
+            for field, value in fields.items():
+                setattr(note, field, value)
+            after = _versioned_state(note)
+            if after == before:
+                continue
+            note.version += 1
+            history.record(note.id, note.version, before, after)
+            if after["content"] != before["content"] or after["sidenote"] != before["sidenote"]:
+                blobs.sync_note_refs(note.id, note.content, note.sidenote)
+            self._mark_stale(note.id, note.parent_id)
+            self._emit("updated", note.id, note.parent_id)
+            written.append(note.id)
+        if written:
+            self._commit()
+        else:
+            self.db.rollback()
+        return written
+
     def reorder(self, note_id: str, data: NoteReorder) -> Note | None:
         """Move a note to a new position, optionally under a new parent.
 
@@ -112,7 +734,7 @@ class NoteService:
         We update sibling positions minimally to ensure correct sort order, then
         normalize to clean up gaps and ensure sequential 0-indexed positions.
         """
-        note = self.get_by_id(note_id)
+        note = self._load(note_id)
         if not note:
             return None
 
@@ -131,10 +753,13 @@ class NoteService:
             if self._is_descendant(new_parent_id, note_id):
                 raise ValueError("Cannot move note under its own descendant")
 
+        if self.rank_mode:
+            return self._reorder_by_rank(note, new_parent_id, new_position)
+
         # Get current siblings in the target parent (excluding the moved note)
         siblings = (
             self.db.query(Note)
-            .filter(Note.parent_id == new_parent_id, Note.id != note_id)
+            .filter(Note.parent_id == new_parent_id, Note.id != note_id, LIVE)
             .order_by(Note.position, Note.created_at)
             .all()
         )
@@ -154,6 +779,9 @@ class NoteService:
                 # Already in the correct position, no reorder needed
                 return note
 
+        if new_parent_id != old_parent_id:
+            self._move_subtree(note, new_parent_id)
+
         # Temporarily set position to a large value to avoid conflicts during update
         note.position = 999999
         note.parent_id = new_parent_id
@@ -162,64 +790,680 @@ class NoteService:
         # Insert the note at the desired position
         # Shift siblings to make room: those at or after new_position move down
         for i, sibling in enumerate(siblings):
-            if i >= new_position:
-                sibling.position = i + 1
-            else:
-                sibling.position = i
+            target = i + 1 if i >= new_position else i
+            if sibling.position != target:
+                sibling.position = target
+                self._mark_stale(sibling.id, new_parent_id)
 
         # Set the moved note's final position
         note.position = new_position
         self.db.flush()
+        self._mark_stale(note_id, old_parent_id)
+        self._mark_stale(parent_id=new_parent_id)
+        self._emit("moved", note_id, new_parent_id)
 
         # Normalize both parents to ensure clean sequential positions
         self._normalize_positions(old_parent_id)
         if new_parent_id != old_parent_id:
             self._normalize_positions(new_parent_id)
 
-        self.db.commit()
-        self.db.refresh(note)
+        self._commit()
+        self._refresh(note)
         return note
 
+    def _reorder_by_rank(self, note: Note, new_parent_id: str | None, new_position: int) -> Note:
+        """Rank-mode move: pick a rank between the new neighbours and write only this row."""
+        old_parent_id = note.parent_id
+        neighbours = [
+            rank
+            for (rank,) in self.db.query(Note.rank)
+            .filter(Note.parent_id == new_parent_id, Note.id != note.id, LIVE)
+            .order_by(Note.rank)
+            .offset(max(new_position - 1, 0))
+            .limit(2)
+        ]
+        if new_position == 0:
+            before, after = None, neighbours[0] if neighbours else None
+        else:
+            before = neighbours[0] if neighbours else None
+            after = neighbours[1] if len(neighbours) > 1 else None
+        if before is None and after is None and new_position > 0:
+            # Position past the end of the list: append
+            before = self._last_rank(new_parent_id, exclude_id=note.id)
+
+        current = note.rank
+        if (
+            old_parent_id == new_parent_id
+            and current is not None
+            and (before is None or before < current)
+            and (after is None or current < after)
+        ):
+            # Already between the requested neighbours, no reorder needed
+            return note
+
+        if new_parent_id != old_parent_id:
+            self._move_subtree(note, new_parent_id)
+        note.parent_id = new_parent_id
+        note.rank = rank_between(before, after)
+        note.position = new_position
+        self.db.flush()
+        if len(note.rank) > REBALANCE_LENGTH:
+            self.rebalance_parents.add(new_parent_id)
+
+        self._mark_stale(note.id, old_parent_id)
+        self._mark_stale(parent_id=new_parent_id)
+        self._shifted_parents.update((old_parent_id, new_parent_id))
+        self._emit("moved", note.id, new_parent_id)
+        self._commit()
+        self._refresh(note)
+        return note
+
+    def _last_rank(self, parent_id: str | None, exclude_id: str | None = None) -> str | None:
+        query = self.db.query(func.max(Note.rank)).filter(Note.parent_id == parent_id, LIVE)
+        if exclude_id is not None:
+            query = query.filter(Note.id != exclude_id)
+        return query.scalar()
+
+    def _append_rank(self, parent_id: str | None, exclude_id: str | None = None) -> str:
+        rank = rank_between(self._last_rank(parent_id, exclude_id=exclude_id), None)
+        if len(rank) > REBALANCE_LENGTH:
+            self.rebalance_parents.add(parent_id)
+        return rank
+
+    def _refresh(self, note: Note) -> None:
+        self.db.refresh(note)
+        self._derive_position(note)
+
+    def rebalance_ranks(self, parent_id: str | None) -> int:
+        """Respace one sibling group's ranks evenly (and resync stored positions).
+
+        Run in the background when a rank grows past REBALANCE_LENGTH; this is
+        the only rank-mode operation that rewrites every sibling.
+        """
+        ids = [
+            note_id
+            for (note_id,) in self.db.query(Note.id)
+            .filter(Note.parent_id == parent_id, LIVE)
+            .order_by(Note.rank, Note.position, Note.created_at, Note.id)
+        ]
+        if not ids:
+            return 0
+        self.db.execute(
+            update(Note),
+            [
+                {"id": note_id, "rank": rank, "position": index}
+                for index, (note_id, rank) in enumerate(zip(ids, spread_ranks(len(ids))))
+            ],
+        )
+        self._stale_ids.update(ids)
+        self._mark_stale(parent_id=parent_id)
+        self._commit()
+        return len(ids)
+
+    def rebuild_ranks(self) -> int:
+        """Assign ranks for every note from the current integer positions.
+
+        Run once before switching ORDERING_MODE from position to rank.
+        """
+        parent_ids = [parent_id for (parent_id,) in self.db.query(Note.parent_id).filter(LIVE).distinct()]
+        total = 0
+        for parent_id in parent_ids:
+            ids = [
+                note_id
+                for (note_id,) in self.db.query(Note.id)
+                .filter(Note.parent_id == parent_id, LIVE)
+                .order_by(Note.position, Note.created_at, Note.id)
+            ]
+            self.db.execute(update(Note), [{"id": i, "rank": r} for i, r in zip(ids, spread_ranks(len(ids)))])
+            self._mark_stale(parent_id=parent_id)
+            self._stale_ids.update(ids)
+            total += len(ids)
+        self._commit()
+        return total
+
+    def bulk_import(self, nodes: list[NoteImportNode], parent_id: str | None = None) -> NoteImportResult:
+        """Insert a nested tree of new notes in one transaction.
+
+        Ids, positions and ranks are assigned in memory (children are new, so
+        they need no lookups), then every row goes in with one COPY or batched
+        executemany. Top-level nodes are appended after `parent_id`'s children.
+        """
+        # Raises if the parent does not exist
+        parent_path = self._path_of(parent_id)
+
+        now = utc_now()
+        start = self._get_next_position(parent_id)
+        top_ranks: list[str | None] = [None] * len(nodes)
+        if self.rank_mode:
+            # Spread over the space after the last sibling; repeated appends would grow each key
+            top_ranks = list(spread_ranks(len(nodes), after=self._last_rank(parent_id)))
+            if top_ranks and len(top_ranks[-1] or "") > REBALANCE_LENGTH:
+                self.rebalance_parents.add(parent_id)
+
+        rows: list[dict] = []
+        root_ids: list[str] = []
+        # Pre-order walk keeps every parent row ahead of its children for the FK
+        stack = [(nodes[i], parent_id, parent_path, start + i, top_ranks[i]) for i in range(len(nodes) - 1, -1, -1)]
+        while stack:
+            node, node_parent_id, node_parent_path, position, rank = stack.pop()
+            note_id = str(uuid.uuid4())
+            path = f"{node_parent_path}{note_id}/"
+            if node_parent_id == parent_id:
+                root_ids.append(note_id)
+            rows.append({
+                "id": note_id,
+                "title": node.title,
+                "content": node.content,
+                "sidenote": node.sidenote,
+                "parent_id": node_parent_id,
+                "position": position,
+                "rank": rank,
+                "path": path,
+                "version": 1,
+                "created_at": now,
+                "updated_at": now,
+            })
+            child_ranks = spread_ranks(len(node.children)) if self.rank_mode else [None] * len(node.children)
+            for index in range(len(node.children) - 1, -1, -1):
+                stack.append((node.children[index], note_id, path, index, child_ranks[index]))
+
+        insert_rows(self.db, Note.__table__, rows)
+        self._changes.update((row["id"], "upsert") for row in rows)
+        for root_id in root_ids:
+            self._emit("created", root_id, parent_id)
+        blob_refs = {row["id"]: extract_blob_hashes(row["content"], row["sidenote"]) for row in rows}
+        BlobService(self.db).add_refs({note_id: hashes for note_id, hashes in blob_refs.items() if hashes})
+        self._mark_stale(parent_id=parent_id)
+        self._commit()
+        return NoteImportResult(created=len(rows), root_ids=root_ids)
+
+    def duplicate(self, note_id: str) -> Note | None:
+        """Copy a note and its whole subtree; the copy lands right after the original.
+
+        The subtree is read once (one path-prefix query), ids and paths are
+        remapped in memory and every row goes in with insert_rows, so the cost
+        is one transaction however large the section is. Children keep their
+        relative order; only the copy's root gets a new sibling slot.
+        """
+        original = self._load(note_id)
+        if not original:
+            return None
+
+        subtree = (
+            self.db.query(
+                Note.id, Note.title, Note.content, Note.sidenote, Note.parent_id, Note.position, Note.rank, Note.path
+            )
+            .filter(Note.path.startswith(original.path, autoescape=True), LIVE)
+            .all()
+        )
+        # Shallowest first keeps every parent row ahead of its children for the FK
+        subtree.sort(key=lambda row: row.path.count("/"))
+
+        parent_id = original.parent_id
+        if self.rank_mode:
+            next_rank = (
+                self.db.query(func.min(Note.rank))
+                .filter(Note.parent_id == parent_id, Note.rank > original.rank, LIVE)
+                .scalar()
+            )
+            root_rank = rank_between(original.rank, next_rank)
+            if len(root_rank) > REBALANCE_LENGTH:
+                self.rebalance_parents.add(parent_id)
+            self._shifted_parents.add(parent_id)
+        else:
+            root_rank = None
+            # Open the slot after the original in one statement
+            later = self.db.query(Note.id).filter(Note.parent_id == parent_id, Note.position > original.position, LIVE)
+            for (sibling_id,) in later:
+                self._mark_stale(sibling_id, parent_id)
+            self.db.execute(
+                update(Note)
+                .where(Note.parent_id == parent_id, Note.position > original.position, LIVE)
+                .values(position=Note.position + 1)
+            )
+
+        now = utc_now()
+        new_ids = {row.id: str(uuid.uuid4()) for row in subtree}
+        new_paths: dict[str, str] = {}
+        rows: list[dict] = []
+        for row in subtree:
+            is_root = row.id == note_id
+            new_parent_id = parent_id if is_root else new_ids[row.parent_id]
+            parent_path = self._path_of(parent_id) if is_root else new_paths[row.parent_id]
+            new_paths[row.id] = f"{parent_path}{new_ids[row.id]}/"
+            rows.append({
+                "id": new_ids[row.id],
+                "title": row.title[: TITLE_MAX_LENGTH - len(COPY_SUFFIX)] + COPY_SUFFIX if is_root else row.title,
+                "content": row.content,
+                "sidenote": row.sidenote,
+                "parent_id": new_parent_id,
+                "position": original.position + 1 if is_root else row.position,
+                "rank": root_rank if is_root else row.rank,
+                "path": new_paths[row.id],
+                "version": 1,
+                "created_at": now,
+                "updated_at": now,
+            })
+
+        insert_rows(self.db, Note.__table__, rows)
+        blob_refs = {row["id"]: extract_blob_hashes(row["content"], row["sidenote"]) for row in rows}
+        BlobService(self.db).add_refs({new_id: hashes for new_id, hashes in blob_refs.items() if hashes})
+        self._changes.update((row["id"], "upsert") for row in rows)
+        self._mark_stale(new_ids[note_id], parent_id)
+        self._emit("created", new_ids[note_id], parent_id)
+        self._commit()
+        return self._load(new_ids[note_id])
+
+    def bulk_reorder(self, moves: list[NoteMove]) -> list[Note]:
+        """Apply a list of moves (NoteReorder semantics, in order) in one transaction.
+
+        The tree is loaded once as a column-only parent map, moves are applied
+        to in-memory sibling lists, cycles are checked once against the final
+        map, and each affected parent is renumbered once and written with a
+        single executemany UPDATE of just the rows that changed.
+        """
+        if not moves:
+            return []
+
+        sort_key = getattr(Note, self._sort_attr)
+        rows = (
+            self.db.query(Note.id, Note.parent_id, Note.position)
+            .filter(LIVE)
+            .order_by(Note.parent_id.nullsfirst(), sort_key, Note.created_at, Note.id)
+            .all()
+        )
+        parent_of: dict[str, str | None] = {row.id: row.parent_id for row in rows}
+        original = {row.id: (row.parent_id, row.position) for row in rows}
+        siblings: dict[str | None, list[str]] = {}
+        for row in rows:
+            siblings.setdefault(row.parent_id, []).append(row.id)
+
+        affected: set[str | None] = set()
+        for move in moves:
+            if move.id not in parent_of:
+                raise ValueError(f"Note {move.id} does not exist")
+            if move.parent_id == move.id:
+                raise ValueError("Note cannot be its own parent")
+            if move.parent_id is not None and move.parent_id not in parent_of:
+                raise ValueError("Parent note does not exist")
+            old_parent_id = parent_of[move.id]
+            siblings[old_parent_id].remove(move.id)
+            target = siblings.setdefault(move.parent_id, [])
+            target.insert(min(max(move.position, 0), len(target)), move.id)
+            parent_of[move.id] = move.parent_id
+            affected.update((old_parent_id, move.parent_id))
+
+        self._check_acyclic(parent_of, [move.id for move in moves])
+
+        now = utc_now()
+        changes = []
+        for parent_id in affected:
+            ids = siblings.get(parent_id, [])
+            ranks = spread_ranks(len(ids)) if self.rank_mode else None
+            for index, note_id in enumerate(ids):
+                if ranks is None and original[note_id] == (parent_id, index):
+                    continue
+                values = {"id": note_id, "parent_id": parent_id, "position": index, "updated_at": now}
+                if ranks is not None:
+                    values["rank"] = ranks[index]
+                changes.append(values)
+                self._mark_stale(note_id, original[note_id][0])
+            self._mark_stale(parent_id=parent_id)
+
+        if changes:
+            self.db.execute(update(Note), changes)
+        for note_id in dict.fromkeys(move.id for move in moves):
+            self._emit("moved", note_id, parent_of[note_id])
+
+        # Re-root moved subtrees, shallowest first so nested moves see final prefixes
+        final_paths: dict[str | None, str] = {None: "/"}
+
+        def final_path(note_id: str) -> str:
+            chain: list[str] = []
+            current: str | None = note_id
+            while current not in final_paths:
+                # None (the root) is always in final_paths
+                assert current is not None
+                chain.append(current)
+                current = parent_of[current]
+            for node_id in reversed(chain):
+                final_paths[node_id] = f"{final_paths[parent_of[node_id]]}{node_id}/"
+            return final_paths[note_id]
+
+        reparented = [note_id for note_id in dict.fromkeys(m.id for m in moves) if parent_of[note_id] != original[note_id][0]]
+        for note_id in sorted(reparented, key=lambda note_id: final_path(note_id).count("/")):
+            current_path = self.db.query(Note.path).filter(Note.id == note_id).scalar()
+            self._rewrite_subtree_paths(current_path, final_path(note_id))
+        self._commit()
+
+        moved_ids = list(dict.fromkeys(move.id for move in moves))
+        query = self.db.query(Note).filter(Note.id.in_(moved_ids)).populate_existing()
+        notes = {note.id: note for note in query}
+        return [notes[note_id] for note_id in moved_ids]
+
+    @staticmethod
+    def _check_acyclic(parent_of: dict[str, str | None], start_ids: list[str]) -> None:
+        """Walk each start note up to the root once; any revisit is a cycle."""
+        reaches_root: set[str] = set()
+        for start_id in start_ids:
+            seen: set[str] = set()
+            node: str | None = start_id
+            while node is not None and node not in reaches_root:
+                if node in seen:
+                    raise ValueError("Cannot move note under its own descendant")
+                seen.add(node)
+                node = parent_of.get(node)
+            reaches_root |= seen
+
+    def _path_of(self, note_id: str | None) -> str:
+        """Materialized path of a note ("/" for the virtual root)."""
+        if note_id is None:
+            return "/"
+        path = self.db.query(Note.path).filter(Note.id == note_id, LIVE).scalar()
+        if path is None:
+            raise ValueError("Parent note does not exist")
+        return path
+
     def _is_descendant(self, potential_descendant_id: str, ancestor_id: str) -> bool:
         """Check if potential_descendant_id is a descendant of ancestor_id.
 
-        Uses recursive CTE with depth limit to prevent infinite loops.
+        One primary-key lookup: the ancestor's id appears in the descendant's path.
         """
-        query = text(
-            """
-            WITH RECURSIVE descendants AS (
-                SELECT id, 1 AS depth FROM notes WHERE parent_id = :ancestor_id
-                UNION ALL
-                SELECT n.id, d.depth + 1 FROM notes n
-                JOIN descendants d ON n.parent_id = d.id
-                WHERE d.depth < 100
-            )
-            SELECT 1 FROM descendants WHERE id = :descendant_id LIMIT 1
-            """
+        if potential_descendant_id == ancestor_id:
+            return False
+        path = self.db.query(Note.path).filter(Note.id == potential_descendant_id).scalar()
+        return path is not None and f"/{ancestor_id}/" in path
+
+    def _rewrite_subtree_paths(self, old_prefix: str, new_prefix: str) -> None:
+        """Re-root every path under old_prefix (the moved note included) in one UPDATE."""
+        if old_prefix == new_prefix:
+            return
+        self.db.execute(
+            update(Note)
+            .where(Note.path.startswith(old_prefix, autoescape=True))
+            .values(path=literal(new_prefix, Text) + func.substr(Note.path, len(old_prefix) + 1, type_=Text))
+            .execution_options(synchronize_session=False)
         )
-        result = self.db.execute(
-            query,
-            {"ancestor_id": ancestor_id, "descendant_id": potential_descendant_id},
-        ).first()
-        return result is not None
+
+    def _move_subtree(self, note: Note, new_parent_id: str | None) -> None:
+        # Read the stored path: bulk path rewrites bypass the identity map
+        new_path = f"{self._path_of(new_parent_id)}{note.id}/"
+        self._rewrite_subtree_paths(self._path_of(note.id), new_path)
+        set_committed_value(note, "path", new_path)
+
+    def get_breadcrumbs(self, note_id: str) -> list[NoteSummary] | None:
+        """Ancestors of a note from the root down, ending with the note itself."""
+        path = self.db.query(Note.path).filter(Note.id == note_id, LIVE).scalar()
+        if path is None:
+            return None
+        ids = path.strip("/").split("/")
+        if self.rank_mode:
+            # Each ancestor's index among its live siblings, as get_summaries reports it
+            sibling = aliased(Note)
+            position: ColumnElement[int] = (
+                select(func.count(sibling.id))
+                .where(
+                    sibling.parent_id.is_not_distinct_from(Note.parent_id),
+                    sibling.rank < Note.rank,
+                    sibling.deleted_at.is_(None),
+                )
+                .scalar_subquery()
+                .label("position")
+            )
+        else:
+            position = Note.position.expression
+        rows = self.db.query(Note.id, Note.title, Note.parent_id, position).filter(Note.id.in_(ids))
+        by_id = {row.id: NoteSummary.model_validate(row) for row in rows}
+        return [by_id[ancestor_id] for ancestor_id in ids if ancestor_id in by_id]
 
     def delete(self, note_id: str) -> bool:
-        note = self.get_by_id(note_id)
-        if not note:
+        """Delete a note and its subtree with one set-based statement.
+
+        In trash mode the statement is an UPDATE setting deleted_at (the rows
+        are purged later by purge_trash); otherwise a DELETE. The subtree is
+        matched by path prefix, so nothing is loaded into the session. Its ids
+        are selected first for tombstones and cache invalidation: with FK
+        enforcement, rows removed by ON DELETE CASCADE are missing from a
+        DELETE's RETURNING. The parent's siblings are then renumbered once.
+        """
+        row = self.db.query(Note.parent_id, Note.path).filter(Note.id == note_id, LIVE).first()
+        if row is None:
             return False
+        parent_id = row.parent_id
 
-        parent_id = note.parent_id
+        subtree = Note.path.startswith(row.path, autoescape=True)
+        removed_ids = self.db.scalars(select(Note.id).where(subtree, LIVE)).all()
+        if self.soft_delete:
+            self.db.execute(
+                update(Note)
+                .where(subtree, LIVE)
+                .values(deleted_at=utc_now())
+                .execution_options(synchronize_session="fetch")
+            )
+        else:
+            self.db.execute(delete(Note).where(subtree).execution_options(synchronize_session="fetch"))
 
-        # Delete the note (cascade will handle children)
-        self.db.delete(note)
-        self.db.flush()
+        self._mark_stale(note_id, parent_id)
+        # Descendants vanish too; their own and child-list keys go stale
+        for removed_id in removed_ids:
+            self._mark_stale(removed_id, removed_id)
+        # Removed rows leave nothing to diff against, so tombstone every id explicitly
+        self._changes.update(dict.fromkeys(removed_ids, "delete"))
+        # One event for the subtree root; clients drop its descendants with it
+        self._emit("deleted", note_id, parent_id)
 
-        # Normalize positions in the parent to close the gap
-        self._normalize_positions(parent_id)
-        self.db.commit()
+        # Normalize positions in the parent to close the gap (ranks have no gaps)
+        if self.rank_mode:
+            self._shifted_parents.add(parent_id)
+        else:
+            self._normalize_positions(parent_id)
+        self._commit()
 
         return True
 
     def delete_all_notes(self) -> None:
-        self.db.execute(text("TRUNCATE TABLE notes RESTART IDENTITY CASCADE"))
+        # Take the revision lock before the tombstones get their sequence numbers
+        self._bump_revision()
+        self.db.execute(
+            insert(NoteChange).from_select(
+                ["note_id", "op", "changed_at"],
+                select(Note.id, literal("delete"), literal(utc_now(), DateTime(timezone=True))).where(LIVE),
+            )
+        )
+        if self.soft_delete:
+            # Row locks only; the purge worker removes them in batches
+            self.db.execute(
+                update(Note).where(LIVE).values(deleted_at=utc_now()).execution_options(synchronize_session=False)
+            )
+            self.db.expunge_all()
+        elif self.db.get_bind().dialect.name == "postgresql":
+            self.db.execute(text("TRUNCATE TABLE notes RESTART IDENTITY CASCADE"))
+        else:
+            self.db.execute(delete(Note).execution_options(synchronize_session=False))
+            self.db.expunge_all()
+        self._emit("reset")
+        self._commit()
+        if self.cache is not None:
+            self.cache.clear()
+
+    def get_trash(self) -> list[TrashedNote]:
+        """Trashed subtree roots, most recently deleted first."""
+        parent = aliased(Note)
+        rows = (
+            self.db.query(Note.id, Note.title, Note.parent_id, Note.deleted_at)
+            .outerjoin(parent, parent.id == Note.parent_id)
+            .filter(
+                Note.deleted_at.isnot(None),
+                # Descendants trashed along with their parent share its deleted_at
+                or_(parent.id.is_(None), parent.deleted_at.is_(None), parent.deleted_at != Note.deleted_at),
+            )
+            .order_by(Note.deleted_at.desc(), Note.id)
+        )
+        return [TrashedNote.model_validate(row) for row in rows]
+
+    def restore(self, note_id: str) -> Note | None:
+        """Bring a trashed note back with the descendants that were trashed with it.
+
+        It is appended to its old parent, or to the root level if that parent
+        is itself gone. Returns None if the note is not in the trash.
+        """
+        row = (
+            self.db.query(Note.parent_id, Note.path, Note.deleted_at)
+            .filter(Note.id == note_id, Note.deleted_at.isnot(None))
+            .first()
+        )
+        if row is None:
+            return None
+        parent_id = row.parent_id if self._parent_exists(row.parent_id) else None
+
+        restored_ids = self.db.scalars(
+            update(Note)
+            .where(Note.path.startswith(row.path, autoescape=True), Note.deleted_at == row.deleted_at)
+            .values(deleted_at=None)
+            .returning(Note.id)
+            .execution_options(synchronize_session="fetch")
+        ).all()
+        note = self.db.query(Note).filter(Note.id == note_id).populate_existing().one()
+        if parent_id != note.parent_id:
+            self._move_subtree(note, parent_id)
+            note.parent_id = parent_id
+        # Back at the end of its sibling list
+        if self.rank_mode:
+            note.rank = self._append_rank(parent_id, exclude_id=note.id)
+        else:
+            note.position = self._get_next_position(parent_id)
+            self.db.flush()
+            self._normalize_positions(parent_id)
+
+        for restored_id in restored_ids:
+            self._mark_stale(restored_id, restored_id)
+        self._mark_stale(note_id, parent_id)
+        self._emit("restored", note_id, parent_id)
+        self._commit()
+        self._refresh(note)
+        return note
+
+    def purge_trash(self, older_than: timedelta, batch_size: int = PURGE_BATCH_SIZE) -> int:
+        """Hard-delete notes trashed before now - older_than; returns the count.
+
+        Deepest rows go first, batch_size per transaction, so no single
+        statement cascades through a large subtree and concurrent purgers
+        skip each other's locked rows. The trash is already invisible to
+        reads and tombstoned in the change log, so nothing else changes.
+        """
+        cutoff = utc_now() - older_than
+        purged = 0
+        while True:
+            ids = self.db.scalars(
+                select(Note.id)
+                .where(Note.deleted_at.isnot(None), Note.deleted_at <= cutoff)
+                .order_by(func.length(Note.path).desc())
+                .limit(batch_size)
+                .with_for_update(skip_locked=True)
+            ).all()
+            if not ids:
+                return purged
+            self.db.execute(delete(Note).where(Note.id.in_(ids)).execution_options(synchronize_session=False))
+            self.db.commit()
+            purged += len(ids)
+            if len(ids) < batch_size:
+                return purged
+
+    def _is_live(self, note_id: str) -> bool:
+        return self.db.query(Note.id).filter(Note.id == note_id, LIVE).first() is not None
+
+    def get_history(
+        self, note_id: str, limit: int = 100, before_version: int | None = None
+    ) -> list[NoteRevisionInfo] | None:
+        """Stored versions of a note, newest first; None if the note does not exist."""
+        if not self._is_live(note_id):
+            return None
+        rows = HistoryService(self.db).list(note_id, limit, before_version)
+        return [NoteRevisionInfo.model_validate(row) for row in rows]
+
+    def get_history_version(self, note_id: str, version: int) -> NoteRevisionContent | None:
+        """Title, content and sidenote as of `version`; None if the note or version is unknown."""
+        if not self._is_live(note_id):
+            return None
+        state = HistoryService(self.db).get(note_id, version)
+        if state is None:
+            return None
+        return NoteRevisionContent(version=version, **state)
+
+    def diff_history(self, note_id: str, from_version: int, to_version: int) -> NoteRevisionDiff | None:
+        if not self._is_live(note_id):
+            return None
+        changes = HistoryService(self.db).diff(note_id, from_version, to_version)
+        if changes is None:
+            return None
+        return NoteRevisionDiff(from_version=from_version, to_version=to_version, changes=changes)
+
+    def get_changes(self, since: int | None = None, limit: int = 500) -> NoteChanges:
+        """Notes written and ids deleted after change token `since`, oldest change first.
+
+        Without `since`, returns only the current token. A note changed several
+        times in the window is reported once, in its current state. In rank
+        mode a move reports only the moved note; its rank and parent_id place
+        it among siblings the client already holds. Raises ChangesExpired when
+        the token predates the retained log.
+        """
+        latest = self.db.query(func.max(NoteChange.seq)).scalar() or 0
+        if since is None:
+            return NoteChanges(token=latest)
+        oldest = self.db.query(func.min(NoteChange.seq)).scalar()
+        if since > latest or (oldest is not None and since < oldest - 1):
+            raise ChangesExpired("Change token expired; reload all notes")
+
+        rows = (
+            self.db.query(NoteChange.seq, NoteChange.note_id, NoteChange.op)
+            .filter(NoteChange.seq > since)
+            .order_by(NoteChange.seq)
+            .limit(limit + 1)
+            .all()
+        )
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        last_op: dict[str, str] = {}
+        for row in rows:
+            # Re-insert so each note sorts by its latest change
+            last_op.pop(row.note_id, None)
+            last_op[row.note_id] = row.op
+
+        upsert_ids = [note_id for note_id, op in last_op.items() if op == "upsert"]
+        notes = {}
+        if upsert_ids:
+            notes = {note.id: note for note in self.db.query(Note).filter(Note.id.in_(upsert_ids), LIVE)}
+        self._derive_group_positions(list(notes.values()))
+        # Upserted then deleted in a later, not yet returned, entry
+        deleted = [note_id for note_id, op in last_op.items() if op == "delete" or note_id not in notes]
+        return NoteChanges(
+            items=[NoteResponse.model_validate(notes[note_id]) for note_id in upsert_ids if note_id in notes],
+            deleted=deleted,
+            token=rows[-1].seq if rows else since,
+            has_more=has_more,
+        )
+
+    def _derive_group_positions(self, notes: list[Note]) -> None:
+        """Rank mode: report positions for notes from scattered sibling groups."""
+        if not self.rank_mode or not notes:
+            return
+        index: dict[str, int] = {}
+        for parent_id in {note.parent_id for note in notes}:
+            ids = self.db.query(Note.id).filter(Note.parent_id == parent_id, LIVE).order_by(Note.rank)
+            index.update((note_id, i) for i, (note_id,) in enumerate(ids))
+        for note in notes:
+            set_committed_value(note, "position", index.get(note.id, 0))
+
+    def prune_changes(self, max_age: timedelta) -> int:
+        """Drop change-log entries older than max_age; tokens before them expire.
+
+        The newest entry is always kept: it carries the current token.
+        """
+        latest = self.db.query(func.max(NoteChange.seq)).scalar()
+        if latest is None:
+            return 0
+        result = self.db.execute(
+            delete(NoteChange).where(NoteChange.changed_at < utc_now() - max_age, NoteChange.seq < latest)
+        )
         self.db.commit()
+        return result.rowcount
@@ -0,0 +1,89 @@
+"""Fractional (LexoRank-style) ordering keys for sibling notes.
+
+A rank is a base-36 fraction written as a string of digits after an implied
+"0.", e.g. "i" = 18/36. Ranks compare correctly as plain strings, so a move
+only needs a key strictly between its new neighbours and touches one row.
+
+Only 0-9a-z are used: those sort the same under bytewise and PostgreSQL
+locale collations. Ranks never end in "0", so there is always room between
+two distinct ranks.
+"""
+
+DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+BASE = len(DIGITS)
+
+# Ranks longer than this trigger a rebalance of their sibling group
+REBALANCE_LENGTH = 24
+
+
+def _midpoint(lower: str, upper: str | None) -> str:
+    """Shortest digit string strictly between lower and upper (None = 1.0)."""
+    if upper is not None:
+        # Skip the shared prefix; lower is implicitly padded with zeros
+        n = 0
+        while n < len(upper) and (lower[n] if n < len(lower) else "0") == upper[n]:
+            n += 1
+        if n > 0:
+            return upper[:n] + _midpoint(lower[n:], upper[n:])
+
+    low_digit = DIGITS.index(lower[0]) if lower else 0
+    high_digit = DIGITS.index(upper[0]) if upper is not None else BASE
+    if high_digit - low_digit > 1:
+        return DIGITS[(low_digit + high_digit) // 2]
+    if upper is not None and len(upper) > 1:
+        return upper[0]
+    # Adjacent digits: keep lower's digit and recurse into the next place
+    return DIGITS[low_digit] + _midpoint(lower[1:], None)
+
+
+def _increment(rank: str) -> str:
+    """Next short rank after `rank` (appends grow keys far slower than midpoints)."""
+    for i in range(len(rank) - 1, -1, -1):
+        digit = DIGITS.index(rank[i])
+        if digit < BASE - 1:
+            return rank[:i] + DIGITS[digit + 1]
+    return rank + DIGITS[BASE // 2]
+
+
+def rank_between(before: str | None, after: str | None) -> str:
+    """Return a rank that sorts after `before` and before `after`.
+
+    Either side may be None for "start of list" / "end of list".
+    """
+    if before is not None and after is not None and before >= after:
+        raise ValueError(f"Invalid rank bounds: {before!r} >= {after!r}")
+    if before is not None and after is None:
+        return _increment(before)
+    return _midpoint(before or "", after)
+
+
+def spread_ranks(count: int, after: str | None = None) -> list[str]:
+    """Return `count` evenly spaced, increasing ranks (used to rebalance).
+
+    With `after`, they all sort after that rank (used to append many at once).
+    """
+    lower = after or ""
+    width = max(len(lower), 1)
+    while True:
+        start = _to_int(lower, width)
+        step = (BASE**width - start) // (count + 1)
+        if step >= 1:
+            break
+        width += 1
+    ranks = []
+    for i in range(1, count + 1):
+        value = start + i * step
+        digits = []
+        for _ in range(width):
+            value, digit = divmod(value, BASE)
+            digits.append(DIGITS[digit])
+        ranks.append("".join(reversed(digits)).rstrip("0"))
+    return ranks
+
+
+def _to_int(rank: str, width: int) -> int:
+    """The rank's digits as an integer, zero-padded to `width` places."""
+    value = 0
+    for char in rank.ljust(width, "0"):
+        value = value * BASE + DIGITS.index(char)
+    return value
@@ -0,0 +1,296 @@
+"""Content-addressed disk storage for uploads, streamed in fixed-size chunks.
+
+Nothing here holds a whole file in memory: bodies are copied chunk by chunk
+into a temp file with aiofiles (so the event loop never blocks on disk I/O)
+and the copy stops as soon as the size limit is passed. The bytes are hashed
+on the way through and the file is published at "ab/cd/<sha256><ext>", so
+identical uploads share one file and one URL.
+
+Large files can also be sent as a resumable session: create it with the
+total size, PUT byte ranges at the current offset (a dropped connection
+resumes from `received`), then complete it to publish the file. Requests on
+one session are serialized by a per-session lock (within this process), and
+sessions nobody touches for a while are removed by expire_sessions().
+"""
+import asyncio
+import hashlib
+import json
+import re
+import time
+import uuid
+from collections.abc import AsyncIterator, Awaitable, Callable
+from dataclasses import dataclass
+from pathlib import Path
+
+import aiofiles
+import aiofiles.os
+
+# Bytes read from the request / written to disk per step
+CHUNK_SIZE = 1024 * 1024
+
+# Extensions kept on blob names (for Content-Type); anything else is dropped
+EXTENSION_PATTERN = re.compile(r"^\.[a-z0-9]{1,10}$")
+
+# (sha256, proposed relative path, size) -> (path to use, already stored)
+Registrar = Callable[[str, str, int], Awaitable[tuple[str, bool]]]
+
+
+def blob_path(sha256: str, filename: str) -> str:
+    """Sharded relative path for a blob: "ab/cd/<sha256><ext>"."""
+    ext = Path(filename).suffix.lower()
+    if not EXTENSION_PATTERN.match(ext):
+        ext = ""
+    return f"{sha256[:2]}/{sha256[2:4]}/{sha256}{ext}"
+
+
+class UploadTooLarge(ValueError):
+    pass
+
+
+class UploadOffsetMismatch(ValueError):
+    def __init__(self, received: int):
+        super().__init__(f"Expected offset {received}")
+        self.received = received
+
+
+@dataclass
+class StoredUpload:
+    name: str  # Path relative to the upload root
+    filename: str
+    size: int
+    sha256: str
+    deduplicated: bool = False
+
+
+@dataclass
+class UploadSession:
+    id: str
+    filename: str
+    size: int
+    received: int
+
+
+async def _register_nothing(sha256: str, path: str, size: int) -> tuple[str, bool]:
+    return path, False
+
+
+class UploadStore:
+    """Upload files under `root`.
+
+    `register` records each blob (e.g. in the database) and may answer with
+    an existing path for the same hash; by default the file system alone
+    decides whether the content is already stored.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        max_size: int,
+        max_session_size: int | None = None,
+        register: Registrar = _register_nothing,
+    ):
+        self.root = root
+        self.register = register
+        self.max_size = max_size
+        self.max_session_size = max_session_size or max_size
+        self.tmp_dir = root / ".tmp"
+        self.session_dir = root / ".sessions"
+        self._session_locks: dict[str, asyncio.Lock] = {}
+
+    async def _ensure_dirs(self) -> None:
+        for directory in (self.root, self.tmp_dir, self.session_dir):
+            await aiofiles.os.makedirs(directory, exist_ok=True)
+
+    async def _remove(self, path: Path) -> None:
+        try:
+            await aiofiles.os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    async def _publish(self, tmp_path: Path, sha256: str, filename: str, size: int) -> StoredUpload:
+        """Move a fully written temp file to its content address (or drop it on a hit)."""
+        name, deduplicated = await self.register(sha256, blob_path(sha256, filename), size)
+        final_path = self.root / name
+        if await aiofiles.os.path.exists(final_path):
+            await self._remove(tmp_path)
+            deduplicated = True
+        else:
+            await aiofiles.os.makedirs(final_path.parent, exist_ok=True)
+            await aiofiles.os.replace(tmp_path, final_path)
+        return StoredUpload(name=name, filename=filename, size=size, sha256=sha256, deduplicated=deduplicated)
+
+    async def save_stream(self, chunks: AsyncIterator[bytes], filename: str) -> StoredUpload:
+        """Copy `chunks` to a new file, aborting once more than max_size bytes arrive."""
+        await self._ensure_dirs()
+        tmp_path = self.tmp_dir / uuid.uuid4().hex
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            async with aiofiles.open(tmp_path, "wb") as out:
+                async for chunk in chunks:
+                    size += len(chunk)
+                    if size > self.max_size:
+                        raise UploadTooLarge(f"File too large (max {self.max_size // (1024 * 1024)}MB)")
+                    digest.update(chunk)
+                    await out.write(chunk)
+            return await self._publish(tmp_path, digest.hexdigest(), filename, size)
+        except BaseException:
+            await self._remove(tmp_path)
+            raise
+
+    # Resumable sessions
+
+    def _session_key(self, session_id: str) -> str:
+        try:
+            return uuid.UUID(hex=session_id).hex
+        except ValueError:
+            raise KeyError(session_id) from None
+
+    def _session_paths(self, session_id: str) -> tuple[Path, Path]:
+        session_id = self._session_key(session_id)
+        return self.session_dir / f"{session_id}.json", self.session_dir / f"{session_id}.part"
+
+    def _session_lock(self, session_id: str) -> asyncio.Lock:
+        """Held while a request reads or changes the session's files."""
+        try:
+            key = self._session_key(session_id)
+        except KeyError:
+            # Not a session id at all; get_session() answers None under any lock
+            return asyncio.Lock()
+        return self._session_locks.setdefault(key, asyncio.Lock())
+
+    def _drop_session_lock(self, session_id: str) -> None:
+        """Forget a lock once its session is gone (or never existed), so probed ids don't pile up."""
+        try:
+            self._session_locks.pop(self._session_key(session_id), None)
+        except KeyError:
+            pass
+
+    async def create_session(self, filename: str, size: int) -> UploadSession:
+        if size > self.max_session_size:
+            raise UploadTooLarge(f"File too large (max {self.max_session_size // (1024 * 1024)}MB)")
+        await self._ensure_dirs()
+        session_id = uuid.uuid4().hex
+        meta_path, part_path = self._session_paths(session_id)
+        async with aiofiles.open(part_path, "wb"):
+            pass
+        async with aiofiles.open(meta_path, "w") as meta:
+            await meta.write(json.dumps({"filename": filename, "size": size}))
+        return UploadSession(id=session_id, filename=filename, size=size, received=0)
+
+    async def get_session(self, session_id: str) -> UploadSession | None:
+        try:
+            meta_path, part_path = self._session_paths(session_id)
+            async with aiofiles.open(meta_path) as meta:
+                data = json.loads(await meta.read())
+            received = (await aiofiles.os.stat(part_path)).st_size
+        except (KeyError, FileNotFoundError):
+            return None
+        return UploadSession(id=session_id, filename=data["filename"], size=data["size"], received=received)
+
+    async def write_chunk(self, session_id: str, offset: int, chunks: AsyncIterator[bytes]) -> UploadSession | None:
+        """Append a byte range at `offset`; a failed or oversized range is rolled back.
+
+        Concurrent ranges for one session are applied one after the other, so
+        the second sees the first's bytes and gets UploadOffsetMismatch.
+        """
+        async with self._session_lock(session_id):
+            session = await self._write_chunk(session_id, offset, chunks)
+        if session is None:
+            self._drop_session_lock(session_id)
+        return session
+
+    async def _write_chunk(self, session_id: str, offset: int, chunks: AsyncIterator[bytes]) -> UploadSession | None:
+        session = await self.get_session(session_id)
+        if session is None:
+            return None
+        if offset != session.received:
+            raise UploadOffsetMismatch(session.received)
+        _, part_path = self._session_paths(session_id)
+        received = offset
+        async with aiofiles.open(part_path, "r+b") as out:
+            await out.seek(offset)
+            try:
+                async for chunk in chunks:
+                    received += len(chunk)
+                    if received > session.size:
+                        raise UploadTooLarge(f"Upload exceeds declared size of {session.size} bytes")
+                    await out.write(chunk)
+            except BaseException:
+                await out.truncate(offset)
+                raise
+        session.received = received
+        return session
+
+    async def complete_session(self, session_id: str) -> StoredUpload | None:
+        async with self._session_lock(session_id):
+            stored = await self._complete_session(session_id)
+        self._drop_session_lock(session_id)
+        return stored
+
+    async def _complete_session(self, session_id: str) -> StoredUpload | None:
+        session = await self.get_session(session_id)
+        if session is None:
+            return None
+        if session.received != session.size:
+            raise ValueError(f"Upload incomplete ({session.received} of {session.size} bytes)")
+        meta_path, part_path = self._session_paths(session_id)
+        # Ranges may have arrived over several requests, so hash the assembled file
+        digest = hashlib.sha256()
+        async with aiofiles.open(part_path, "rb") as part:
+            while chunk := await part.read(CHUNK_SIZE):
+                digest.update(chunk)
+        stored = await self._publish(part_path, digest.hexdigest(), session.filename, session.size)
+        await self._remove(meta_path)
+        return stored
+
+    async def abort_session(self, session_id: str) -> bool:
+        async with self._session_lock(session_id):
+            found = await self.get_session(session_id) is not None
+            if found:
+                for path in self._session_paths(session_id):
+                    await self._remove(path)
+        self._drop_session_lock(session_id)
+        return found
+
+    async def _mtime(self, path: Path) -> float | None:
+        try:
+            return (await aiofiles.os.stat(path)).st_mtime
+        except FileNotFoundError:
+            return None
+
+    async def expire_sessions(self, max_age_seconds: float) -> int:
+        """Remove sessions untouched for `max_age_seconds` and stray temp files; returns sessions removed.
+
+        A session's age counts from its last written range (the .part mtime),
+        so slow uploads that keep sending survive.
+        """
+        cutoff = time.time() - max_age_seconds
+        try:
+            names = await aiofiles.os.listdir(self.session_dir)
+        except FileNotFoundError:
+            names = []
+        removed = 0
+        for session_id in {name.split(".")[0] for name in names if name.endswith((".json", ".part"))}:
+            try:
+                paths = self._session_paths(session_id)
+            except KeyError:
+                continue
+            async with self._session_lock(session_id):
+                mtimes = [mtime for mtime in [await self._mtime(path) for path in paths] if mtime is not None]
+                if not mtimes or max(mtimes) >= cutoff:
+                    continue
+                for path in paths:
+                    await self._remove(path)
+            self._drop_session_lock(session_id)
+            removed += 1
+        # Left behind by a process that died mid save_stream()
+        try:
+            tmp_names = await aiofiles.os.listdir(self.tmp_dir)
+        except FileNotFoundError:
+            tmp_names = []
+        for name in tmp_names:
+            mtime = await self._mtime(self.tmp_dir / name)
+            if mtime is not None and mtime < cutoff:
+                await self._remove(self.tmp_dir / name)
+        return removed
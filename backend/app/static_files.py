@@ -0,0 +1,132 @@
+"""Serving for /uploads: immutable caching, strong ETags, ranges, precompressed SVG.
+
+Every upload URL names fixed content (a sha256 or a never-reused uuid), so
+responses are cacheable forever and the file name doubles as a strong ETag.
+Range requests (video, large images, resumed downloads) are answered by
+Starlette's FileResponse; when the ASGI server offers the pathsend extension
+the whole-file case is handed to it so the body can go out via sendfile().
+
+SVGs are text and compress well; `precompress` writes .br/.gz siblings at
+upload time and UploadFiles serves the best one the client accepts.
+"""
+import gzip
+import os
+from pathlib import Path, PurePosixPath
+
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Receive, Scope, Send
+
+from app.compression import accepted_encodings, brotli
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+PRECOMPRESS_EXTENSIONS = {".svg"}
+
+# Preference order when the client accepts several
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+def precompress(path: Path) -> list[Path]:
+    """Write .gz (and .br, if brotli is installed) next to `path`; returns the new files."""
+    if path.suffix.lower() not in PRECOMPRESS_EXTENSIONS:
+        return []
+    data = path.read_bytes()
+    variants = [(path.with_name(path.name + ".gz"), lambda: gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append((path.with_name(path.name + ".br"), lambda: brotli.compress(data, quality=11)))
+    written = []
+    for target, compress in variants:
+        if target.exists():
+            continue
+        compressed = compress()
+        # Not worth a second representation if it barely shrinks
+        if len(compressed) >= len(data) * 0.9:
+            continue
+        tmp = target.with_name(f".{target.name}.tmp")
+        tmp.write_bytes(compressed)
+        tmp.replace(target)
+        written.append(target)
+    return written
+
+
+class ImmutableFileResponse(FileResponse):
+    """FileResponse whose ETag comes from the caller (not mtime) and that uses pathsend."""
+
+    def _resolve_if_range(self, scope: Scope) -> Scope:
+        """Settle If-Range against our validators up front; Starlette only knows its mtime-based ETag.
+
+        A match keeps the Range (If-Range is dropped), anything else gets the
+        whole file (Range is dropped).
+        """
+        headers = Headers(scope=scope)
+        if_range = headers.get("if-range")
+        if if_range is None or "range" not in headers:
+            return scope
+        matches = if_range in (self.headers.get("etag"), self.headers.get("last-modified"))
+        dropped = b"if-range" if matches else b"range"
+        return {**scope, "headers": [(name, value) for name, value in scope["headers"] if name.lower() != dropped]}
+
+    def _can_pathsend(self, scope: Scope) -> bool:
+        """Whole-file GET with known stat headers on a server offering pathsend."""
+        return (
+            "http.response.pathsend" in (scope.get("extensions") or {})
+            and scope["method"].upper() == "GET"
+            and "range" not in Headers(scope=scope)
+            and self.stat_result is not None
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        scope = self._resolve_if_range(scope)
+        if not self._can_pathsend(scope):
+            await super().__call__(scope, receive, send)
+            return
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        await send({"type": "http.response.pathsend", "path": str(self.path)})
+        if self.background is not None:
+            await self.background()
+
+
+class UploadFiles(StaticFiles):
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        # Staging areas (.tmp, .sessions) and temp files are never public
+        if any(part.startswith(".") for part in PurePosixPath(path).parts):
+            raise HTTPException(status_code=404)
+        return await super().get_response(path, scope)
+
+    def file_response(
+        self,
+        full_path,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        request_headers = Headers(scope=scope)
+        path = Path(full_path)
+        # Strong validator: the name identifies the bytes
+        etag = path.name
+        headers = {"cache-control": IMMUTABLE_CACHE_CONTROL}
+        media_type = None
+
+        if path.suffix.lower() in PRECOMPRESS_EXTENSIONS:
+            headers["vary"] = "Accept-Encoding"
+            accepted = accepted_encodings(request_headers)
+            for encoding, suffix in ENCODINGS:
+                candidate = path.with_name(path.name + suffix)
+                if encoding in accepted and candidate.is_file():
+                    headers["content-encoding"] = encoding
+                    media_type = "image/svg+xml"
+                    etag = candidate.name
+                    full_path, stat_result = candidate, candidate.stat()
+                    break
+
+        headers["etag"] = f'"{etag}"'
+        response = ImmutableFileResponse(
+            full_path, status_code=status_code, stat_result=stat_result, headers=headers, media_type=media_type
+        )
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
@@ -0,0 +1,99 @@
+"""Encode time and bytes on the wire for a large GET /api/notes response.
+
+    python scripts/bench_serialization.py --notes 10000 --content-bytes 2000
+
+Runs the same steps as the route (response-model validation + serialization,
+then rendering) with the stdlib JSONResponse and with ORJSONResponse, and
+reports the body size raw and after gzip/brotli at the middleware's default
+levels. No database is needed.
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+import uuid
+import zlib
+from datetime import datetime, timezone
+from pathlib import Path
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import TypeAdapter
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from app.schemas.note import NoteResponse  # noqa: E402
+
+try:
+    import brotli  # type: ignore[import-untyped]
+except ImportError:
+    brotli = None
+
+WORDS = "the quick brown fox jumps over lazy dog notes markdown list heading link image code block".split()
+
+
+def make_notes(count: int, content_bytes: int) -> list[dict]:
+    rng = random.Random(42)
+    now = datetime.now(timezone.utc)
+    notes = []
+    for index in range(count):
+        words: list[str] = []
+        while sum(len(word) + 1 for word in words) < content_bytes:
+            words.append(rng.choice(WORDS))
+        notes.append({
+            "id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "title": f"Note {index}",
+            "content": f"# Note {index}\n\n" + " ".join(words),
+            "sidenote": None,
+            "parent_id": None,
+            "position": index,
+            "created_at": now,
+            "updated_at": now,
+        })
+    return notes
+
+
+def timed(fn, repeat: int) -> tuple[float, object]:
+    timings = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings), result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--notes", type=int, default=10_000)
+    parser.add_argument("--content-bytes", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    notes = make_notes(args.notes, args.content_bytes)
+    adapter = TypeAdapter(list[NoteResponse])
+
+    def serialize():
+        return adapter.dump_python(adapter.validate_python(notes), mode="json")
+
+    serialize_time, content = timed(serialize, args.repeat)
+    print(f"{args.notes} notes, ~{args.content_bytes} content bytes each")
+    print(f"  response model validate + serialize: {serialize_time * 1000:8.1f} ms")
+
+    body = b""
+    for response_class in (JSONResponse, ORJSONResponse):
+        render_time, body = timed(lambda: response_class(content).body, args.repeat)
+        total = (serialize_time + render_time) * 1000
+        print(f"  {response_class.__name__:<15} render: {render_time * 1000:8.1f} ms   (total {total:.1f} ms)")
+
+    print(f"\nbytes on the wire: identity {len(body):>12,}")
+    compressors = [("gzip -6", lambda: zlib.compress(body, 6))]
+    if brotli is not None:
+        compressors.append(("br -q4", lambda: brotli.compress(body, quality=4)))
+    for name, compress in compressors:
+        compress_time, compressed = timed(compress, args.repeat)
+        ratio = len(body) / len(compressed)
+        print(f"  {name:<8} {len(compressed):>12,} bytes  ({ratio:.1f}x smaller, {compress_time * 1000:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
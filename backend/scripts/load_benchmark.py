@@ -0,0 +1,96 @@
+"""Concurrent load benchmark for the notes API.
+
+Run it against a server once with DATABASE_MODE=sync and once with
+DATABASE_MODE=async, then compare the numbers:
+
+    python scripts/load_benchmark.py --url http://localhost:8000 --concurrency 200 --requests 5000
+
+Each worker repeatedly requests one of the read endpoints (or creates and
+deletes a note with --writes) and the script reports throughput plus
+p50/p95/p99 latency. Requires httpx.
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+import httpx
+
+
+async def _worker(
+    client: httpx.AsyncClient,
+    queue: asyncio.Queue,
+    latencies: list[float],
+    errors: list[str],
+    paths: list[str],
+    writes: bool,
+) -> None:
+    while True:
+        try:
+            queue.get_nowait()
+        except asyncio.QueueEmpty:
+            return
+        started = time.perf_counter()
+        try:
+            if writes:
+                response = await client.post("/api/notes", json={"title": "benchmark"})
+                response.raise_for_status()
+                response = await client.delete(f"/api/notes/{response.json()['id']}")
+            else:
+                response = await client.get(random.choice(paths))
+            response.raise_for_status()
+        except httpx.HTTPError as exc:
+            errors.append(str(exc))
+        else:
+            latencies.append(time.perf_counter() - started)
+
+
+def _percentile(sorted_values: list[float], fraction: float) -> float:
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def run(url: str, concurrency: int, total: int, writes: bool) -> None:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30.0) as client:
+        notes = (await client.get("/api/notes", params={"view": "tree"})).json()
+        paths = ["/api/notes?view=tree", "/api/notes/tree"]
+        paths += [f"/api/notes/{note['id']}" for note in notes[:100]]
+
+        queue: asyncio.Queue = asyncio.Queue()
+        for _ in range(total):
+            queue.put_nowait(None)
+        latencies: list[float] = []
+        errors: list[str] = []
+
+        started = time.perf_counter()
+        await asyncio.gather(*(_worker(client, queue, latencies, errors, paths, writes) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    print(f"{len(latencies)} ok, {len(errors)} failed in {elapsed:.2f}s at concurrency {concurrency}")
+    print(f"throughput: {len(latencies) / elapsed:,.0f} req/s")
+    if latencies:
+        print(
+            f"latency ms: mean {statistics.mean(latencies) * 1000:.1f}"
+            f"  p50 {_percentile(latencies, 0.50) * 1000:.1f}"
+            f"  p95 {_percentile(latencies, 0.95) * 1000:.1f}"
+            f"  p99 {_percentile(latencies, 0.99) * 1000:.1f}"
+        )
+    if errors:
+        print(f"first error: {errors[0]}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--writes", action="store_true", help="Create+delete notes instead of reading")
+    args = parser.parse_args()
+    asyncio.run(run(args.url, args.concurrency, args.requests, args.writes))
+
+
+if __name__ == "__main__":
+    main()
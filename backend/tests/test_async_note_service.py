@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app import database
+from app.config import Settings
+from app.database import Base, get_async_db
+from app.schemas.note import NoteCreate, NoteReorder, NoteUpdate
+from app.services.async_note_service import AsyncNoteService
+
+
+def make_async_sessionmaker():
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+
+    async def create_all():
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+
+    return engine, create_all, async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+
+
+def test_async_session_facade_runs_the_note_rules():
+    async def scenario():
+        engine, create_all, sessions = make_async_sessionmaker()
+        await create_all()
+        async with sessions() as db:
+            service = AsyncNoteService.for_async_session(db, ordering_mode="rank")
+            parent = await service.create(NoteCreate(title="Parent"))
+            first = await service.create(NoteCreate(title="First", parent_id=parent.id))
+            second = await service.create(NoteCreate(title="Second", parent_id=parent.id))
+
+            await service.reorder(second.id, NoteReorder(parent_id=parent.id, position=0))
+            children = await service.get_children(parent.id)
+            assert [(c.title, c.position) for c in children] == [("Second", 0), ("First", 1)]
+
+            updated = await service.update(first.id, NoteUpdate(content="body"))
+            assert updated.version == 2
+            assert (await service.get_by_id(first.id)).content == "body"
+            assert [s.title for s in await service.get_breadcrumbs(first.id)] == ["Parent", "First"]
+
+            assert await service.delete(parent.id)
+            assert await service.get_by_id(first.id) is None
+            assert len((await service.get_changes(since=0)).deleted) == 3
+        await engine.dispose()
+
+    asyncio.run(scenario())
+
+
+def test_get_async_db_yields_a_session_and_requires_async_mode(monkeypatch):
+    async def scenario():
+        engine, create_all, sessions = make_async_sessionmaker()
+        await create_all()
+        monkeypatch.setattr(database, "AsyncSessionLocal", sessions)
+        async for db in get_async_db():
+            service = AsyncNoteService.for_async_session(db)
+            note = await service.create(NoteCreate(title="Via dependency"))
+        async with sessions() as db:
+            assert (await AsyncNoteService.for_async_session(db).get_by_id(note.id)).title == "Via dependency"
+        await engine.dispose()
+
+        monkeypatch.setattr(database, "AsyncSessionLocal", None)
+        with pytest.raises(RuntimeError):
+            async for _ in get_async_db():
+                pass
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.parametrize(
+    ("url", "expected"),
+    [
+        ("postgresql://u:p@db:5432/notes", "postgresql+asyncpg://u:p@db:5432/notes"),
+        ("postgresql+psycopg2://u:p@db/notes", "postgresql+asyncpg://u:p@db/notes"),
+        ("postgresql+asyncpg://u:p@db/notes", "postgresql+asyncpg://u:p@db/notes"),
+        ("sqlite:///./notes.db", "sqlite+aiosqlite:///./notes.db"),
+        ("sqlite://", "sqlite+aiosqlite://"),
+        ("mysql://u@db/notes", "mysql://u@db/notes"),
+    ],
+)
+def test_async_database_url_swaps_in_the_asyncio_driver(url, expected):
+    assert Settings(database_url=url).async_database_url == expected
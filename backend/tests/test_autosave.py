@@ -0,0 +1,179 @@
+import asyncio
+import logging
+
+import pytest
+from pydantic import ValidationError
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.schemas.note import NoteAutosave, NoteCreate, NoteUpdate
+from app.services.autosave import AutosaveBuffer
+from app.services.note_service import NoteService
+
+
+def make_session():
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine, expire_on_commit=False)(), engine
+
+
+class RecordingWriter:
+    def __init__(self, fail_for: set[str] = frozenset()):
+        self.batches: list[dict] = []
+        self.fail_for = set(fail_for)
+
+    async def __call__(self, changes):
+        if self.fail_for & set(changes):
+            raise RuntimeError("write failed")
+        self.batches.append({note_id: dict(fields) for note_id, fields in changes.items()})
+
+
+def test_bursts_are_merged_and_written_in_one_batch():
+    async def scenario():
+        writer = RecordingWriter()
+        buffer = AutosaveBuffer(writer, idle_seconds=60)
+        await buffer.add("a", {"content": "h"})
+        await buffer.add("a", {"content": "he", "title": "Hi"})
+        await buffer.add("b", {"sidenote": "x"})
+        await buffer.add("a", {"content": "hello"})
+        assert writer.batches == []
+        assert await buffer.flush() == set()
+        assert writer.batches == [{"a": {"content": "hello", "title": "Hi"}, "b": {"sidenote": "x"}}]
+        assert buffer.pending_count == 0
+
+    asyncio.run(scenario())
+
+
+def test_idle_notes_are_flushed_by_the_loop_and_the_rest_on_stop():
+    async def scenario():
+        writer = RecordingWriter()
+        buffer = AutosaveBuffer(writer, idle_seconds=0.05, max_delay_seconds=10)
+        await buffer.start()
+        await buffer.add("a", {"content": "settled"})
+        await asyncio.sleep(0.2)
+        assert writer.batches == [{"a": {"content": "settled"}}]
+
+        buffer.idle_seconds = 60
+        await buffer.add("b", {"content": "typing"})
+        await asyncio.sleep(0.1)
+        assert len(writer.batches) == 1
+        await buffer.stop()
+        assert writer.batches[-1] == {"b": {"content": "typing"}}
+
+    asyncio.run(scenario())
+
+
+def test_max_pending_forces_a_flush():
+    async def scenario():
+        writer = RecordingWriter()
+        buffer = AutosaveBuffer(writer, idle_seconds=60, max_pending=3)
+        for note_id in ("a", "b", "c"):
+            await buffer.add(note_id, {"content": note_id})
+        assert len(writer.batches) == 1 and buffer.pending_count == 0
+
+    asyncio.run(scenario())
+
+
+def test_failed_note_stays_buffered_without_blocking_the_others():
+    async def scenario():
+        writer = RecordingWriter(fail_for={"bad"})
+        buffer = AutosaveBuffer(writer, idle_seconds=60)
+        await buffer.add("good", {"content": "ok"})
+        await buffer.add("bad", {"content": "v1", "title": "T"})
+        assert await buffer.flush() == {"bad"}
+        assert writer.batches == [{"good": {"content": "ok"}}]
+        assert buffer.has_pending("bad")
+
+        await buffer.add("bad", {"content": "v2"})
+        writer.fail_for.clear()
+        await buffer.flush(["bad"])
+        assert writer.batches[-1] == {"bad": {"content": "v2", "title": "T"}}
+
+    asyncio.run(scenario())
+
+
+def test_explicit_write_waits_for_a_flush_in_flight():
+    async def scenario():
+        db, _ = make_session()
+        service = NoteService(db)
+        note = service.create(NoteCreate(title="Note", content="original"))
+        gate = asyncio.Event()
+        failures = [RuntimeError("database unavailable")]
+
+        async def write(changes):
+            await gate.wait()
+            if failures:
+                raise failures.pop()
+            service.save_batch(changes)
+
+        buffer = AutosaveBuffer(write, idle_seconds=60)
+        await buffer.add(note.id, {"content": "autosaved"})
+        flushing = asyncio.create_task(buffer.flush())
+        await asyncio.sleep(0)
+        assert buffer.has_pending(note.id)
+
+        async def patch():
+            # What the PATCH route does before its own write
+            assert await buffer.settle(note.id)
+            service.update(note.id, NoteUpdate(content="explicit"))
+
+        patching = asyncio.create_task(patch())
+        await asyncio.sleep(0.05)
+        assert not patching.done()
+
+        # The in-flight write fails and is requeued; the settle retries it first
+        gate.set()
+        assert await flushing == {note.id}
+        await patching
+        assert not buffer.has_pending(note.id)
+        assert await buffer.flush() == set()
+        db.expire_all()
+        assert service.get_by_id(note.id).content == "explicit"
+        assert service.get_history_version(note.id, 2).content == "autosaved"
+
+    asyncio.run(scenario())
+
+
+def test_edit_is_dropped_and_logged_after_max_attempts(caplog):
+    async def scenario():
+        writer = RecordingWriter(fail_for={"bad"})
+        buffer = AutosaveBuffer(writer, idle_seconds=60, max_attempts=2)
+        await buffer.add("bad", {"content": "v1"})
+        assert await buffer.flush() == {"bad"}
+        assert buffer.has_pending("bad")
+        await buffer.add("bad", {"content": "v2"})
+        with caplog.at_level(logging.ERROR, logger="app.services.autosave"):
+            assert await buffer.flush() == {"bad"}
+        assert not buffer.has_pending("bad")
+        assert "after 2 failed writes" in caplog.text
+
+    asyncio.run(scenario())
+
+
+def test_autosave_title_is_limited_like_the_column():
+    assert NoteAutosave(title="t" * 255).title == "t" * 255
+    with pytest.raises(ValidationError):
+        NoteAutosave(title="t" * 256)
+
+
+def test_save_batch_writes_many_notes_in_one_transaction():
+    db, _ = make_session()
+    service = NoteService(db)
+    first = service.create(NoteCreate(title="One", content="a"))
+    second = service.create(NoteCreate(title="Two", content="b"))
+    unchanged = service.create(NoteCreate(title="Three", content="c"))
+    revision = service.get_revision()[0]
+
+    written = service.save_batch({
+        first.id: {"content": "a!", "title": "One!"},
+        second.id: {"sidenote": "note"},
+        unchanged.id: {"content": "c"},
+        "deleted-meanwhile": {"content": "lost"},
+    })
+    assert sorted(written) == sorted([first.id, second.id])
+    assert service.get_revision()[0] == revision + 1
+    assert service.get_by_id(first.id).title == "One!"
+    assert service.get_by_id(second.id).version == 2
+    assert service.get_by_id(unchanged.id).version == 1
+    assert service.get_history_version(first.id, 2).content == "a!"
@@ -0,0 +1,109 @@
+import json
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import importer
+from app.config import settings
+from app.database import Base
+from app.importer import load_markdown_dir
+from app.schemas.note import NoteCreate, NoteImportNode
+from app.services.note_service import NoteService
+
+
+def make_session():
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine, expire_on_commit=False)()
+
+
+def test_bulk_import_builds_nested_tree_after_existing_siblings():
+    db = make_session()
+    service = NoteService(db)
+    existing = service.create(NoteCreate(title="Existing"))
+
+    result = service.bulk_import([
+        NoteImportNode(title="A", children=[
+            NoteImportNode(title="A1", content="body"),
+            NoteImportNode(title="A2", children=[NoteImportNode(title="A2a")]),
+        ]),
+        NoteImportNode(title="B"),
+    ])
+
+    assert result.created == 5
+    roots = service.get_children(None)
+    assert [n.title for n in roots] == ["Existing", "A", "B"]
+    assert [n.position for n in roots] == [0, 1, 2]
+    assert [n.id for n in roots[1:]] == result.root_ids
+    a_children = service.get_children(result.root_ids[0])
+    assert [(n.title, n.position) for n in a_children] == [("A1", 0), ("A2", 1)]
+    assert a_children[0].content == "body"
+    assert [n.title for n in service.get_children(a_children[1].id)] == ["A2a"]
+    assert existing.id not in result.root_ids
+
+
+def test_bulk_import_rank_mode_assigns_ordered_ranks():
+    db = make_session()
+    service = NoteService(db, ordering_mode="rank")
+    service.create(NoteCreate(title="Existing"))
+
+    service.bulk_import([NoteImportNode(title=f"N{i}") for i in range(5)])
+
+    assert [n.title for n in service.get_children(None)] == ["Existing"] + [f"N{i}" for i in range(5)]
+
+
+def test_bulk_import_rank_mode_many_roots_keep_short_ranks():
+    db = make_session()
+    service = NoteService(db, ordering_mode="rank")
+    service.create(NoteCreate(title="Existing"))
+
+    service.bulk_import([NoteImportNode(title=f"N{i}") for i in range(2500)])
+
+    children = service.get_children(None)
+    assert [n.title for n in children] == ["Existing"] + [f"N{i}" for i in range(2500)]
+    # Must fit the String(64) rank column
+    assert max(len(n.rank) for n in children) <= 4
+    assert not service.rebalance_parents
+
+
+def test_bulk_import_rejects_missing_parent():
+    db = make_session()
+    service = NoteService(db)
+
+    with pytest.raises(ValueError, match="Parent note does not exist"):
+        service.bulk_import([NoteImportNode(title="A")], parent_id="missing")
+
+
+def test_load_markdown_dir(tmp_path):
+    (tmp_path / "guide.md").write_text("# User Guide\n\nWelcome")
+    (tmp_path / "guide").mkdir()
+    (tmp_path / "guide" / "install.md").write_text("Run it")
+    (tmp_path / "api").mkdir()
+    (tmp_path / "api" / "index.md").write_text("# API\nEndpoints")
+    (tmp_path / "api" / "notes.md").write_text("# Notes API")
+
+    nodes = load_markdown_dir(tmp_path)
+
+    assert [n.title for n in nodes] == ["API", "User Guide"]
+    assert nodes[0].content == "Endpoints"
+    assert [c.title for c in nodes[0].children] == ["Notes API"]
+    assert nodes[1].content == "Welcome"
+    assert [(c.title, c.content) for c in nodes[1].children] == [("install", "Run it")]
+
+
+def test_importer_cli_uses_the_configured_ordering_mode(tmp_path, monkeypatch):
+    db = make_session()
+    service = NoteService(db, ordering_mode="rank")
+    for title in ("a", "b"):
+        service.create(NoteCreate(title=title))
+    source = tmp_path / "export.json"
+    source.write_text(json.dumps([{"title": "imported"}]), encoding="utf-8")
+    monkeypatch.setattr(settings, "ordering_mode", "rank")
+    monkeypatch.setattr(importer, "SessionLocal", lambda: db)
+
+    importer.main([str(source)])
+
+    roots = service.get_children(None)
+    assert [(n.title, n.position) for n in roots] == [("a", 0), ("b", 1), ("imported", 2)]
+    assert all(n.rank is not None for n in roots)
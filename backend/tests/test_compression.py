@@ -0,0 +1,80 @@
+import asyncio
+import gzip
+
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+from app.compression import CompressionMiddleware, brotli
+
+BIG = {"items": [{"title": f"note {i}", "content": "lorem ipsum " * 20} for i in range(50)]}
+
+
+async def big(request):
+    return JSONResponse(BIG, headers={"ETag": '"v1"'})
+
+
+async def small(request):
+    return JSONResponse({"ok": True})
+
+
+async def png(request):
+    return Response(b"\x89PNG" + b"0" * 4000, media_type="image/png")
+
+
+async def stream(request):
+    async def lines():
+        for i in range(3):
+            yield f'{{"n": {i}, "pad": "{"x" * 2000}"}}\n'
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+def get(path, accept_encoding):
+    app = CompressionMiddleware(
+        Starlette(routes=[Route("/big", big), Route("/small", small), Route("/png", png), Route("/stream", stream)]),
+        minimum_size=500,
+    )
+
+    async def request():
+        # Raw bytes: no automatic decoding by httpx
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            async with client.stream("GET", path, headers={"Accept-Encoding": accept_encoding}) as response:
+                return response, b"".join([chunk async for chunk in response.aiter_raw()])
+
+    return asyncio.run(request())
+
+
+def test_gzip_large_json_and_weaken_etag():
+    response, body = get("/big", "gzip")
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.headers["etag"] == 'W/"v1"'
+    assert int(response.headers["content-length"]) == len(body)
+    assert gzip.decompress(body) == JSONResponse(BIG).body
+
+
+@pytest.mark.skipif(brotli is None, reason="brotli not installed")
+def test_brotli_preferred_when_accepted():
+    response, body = get("/big", "gzip, br")
+
+    assert response.headers["content-encoding"] == "br"
+    assert brotli.decompress(body) == JSONResponse(BIG).body
+    assert get("/big", "br;q=0, gzip")[0].headers["content-encoding"] == "gzip"
+
+
+def test_small_binary_and_unaccepted_responses_are_untouched():
+    assert "content-encoding" not in get("/small", "gzip")[0].headers
+    assert "content-encoding" not in get("/png", "gzip")[0].headers
+    assert "content-encoding" not in get("/big", "identity")[0].headers
+
+
+def test_streaming_body_is_compressed_incrementally():
+    response, body = get("/stream", "gzip")
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert gzip.decompress(body).decode().count("\n") == 3
@@ -0,0 +1,15 @@
+import pytest
+from pydantic import ValidationError
+
+from app.config import Settings
+
+
+@pytest.mark.parametrize("field", ["delete_mode", "ordering_mode", "database_mode"])
+def test_unknown_mode_fails_at_startup(field):
+    with pytest.raises(ValidationError):
+        Settings(database_url="sqlite://", **{field: "Trash"})
+
+
+def test_modes_accept_their_documented_values():
+    settings = Settings(database_url="sqlite://", delete_mode="trash", ordering_mode="rank", database_mode="async")
+    assert (settings.delete_mode, settings.ordering_mode, settings.database_mode) == ("trash", "rank", "async")
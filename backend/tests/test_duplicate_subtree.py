@@ -0,0 +1,97 @@
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.schemas.note import NoteCreate, NoteImportNode
+from app.services.note_service import NoteService
+
+
+def make_session():
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine, expire_on_commit=False)()
+
+
+def build_tree(service):
+    first = service.create(NoteCreate(title="First"))
+    section = service.create(NoteCreate(title="Section", content="body"))
+    last = service.create(NoteCreate(title="Last"))
+    service.bulk_import(
+        [
+            NoteImportNode(title="A", children=[NoteImportNode(title="A1"), NoteImportNode(title="A2")]),
+            NoteImportNode(title="B"),
+        ],
+        parent_id=section.id,
+    )
+    return first, section, last
+
+
+def outline(service, parent_id, depth=0):
+    lines = []
+    for note in service.get_children(parent_id):
+        lines.append("  " * depth + note.title)
+        lines.extend(outline(service, note.id, depth + 1))
+    return lines
+
+
+def test_duplicate_copies_subtree_after_the_original():
+    db = make_session()
+    service = NoteService(db)
+    first, section, last = build_tree(service)
+
+    copy = service.duplicate(section.id)
+
+    assert copy.id != section.id
+    assert copy.content == "body"
+    assert [n.title for n in service.get_children(None)] == ["First", "Section", "Section (copy)", "Last"]
+    assert [n.position for n in service.get_children(None)] == [0, 1, 2, 3]
+    assert outline(service, copy.id) == outline(service, section.id) == ["A", "  A1", "  A2", "B"]
+    notes = service.get_all()
+    copied_ids = {n.id for n in notes if n.path.startswith(f"/{copy.id}/")}
+    original_ids = {n.id for n in notes if n.path.startswith(f"/{section.id}/")}
+    assert len(copied_ids) == len(original_ids) == 5
+    assert len(notes) == 2 + 5 + 5
+
+
+def test_duplicate_inserts_rows_without_per_node_round_trips():
+    db = make_session()
+    service = NoteService(db)
+    section = service.create(NoteCreate(title="Section"))
+    service.bulk_import([NoteImportNode(title=f"Page {i}") for i in range(200)], parent_id=section.id)
+
+    statements = []
+    event.listen(db.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+    service.duplicate(section.id)
+
+    assert len(statements) < 20
+    assert len(service.get_children(None)) == 2
+    assert db.query(type(section)).count() == 402
+
+
+def test_duplicate_in_rank_mode_slots_between_neighbours():
+    db = make_session()
+    service = NoteService(db, ordering_mode="rank")
+    first, section, last = build_tree(service)
+
+    copy = service.duplicate(section.id)
+
+    assert [n.title for n in service.get_children(None)] == ["First", "Section", "Section (copy)", "Last"]
+    assert copy.position == 2
+    assert outline(service, copy.id) == ["A", "  A1", "  A2", "B"]
+
+
+def test_duplicate_missing_note_returns_none():
+    service = NoteService(make_session())
+    assert service.duplicate("missing") is None
+
+
+def test_duplicate_keeps_a_full_length_title_within_the_column():
+    db = make_session()
+    service = NoteService(db)
+    original = service.create(NoteCreate(title="t" * 255))
+
+    copy = service.duplicate(original.id)
+
+    assert len(copy.title) == 255
+    assert copy.title == "t" * 248 + " (copy)"
+    assert service.duplicate(service.create(NoteCreate(title="Short")).id).title == "Short (copy)"
@@ -0,0 +1,83 @@
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+import pytest
+
+from app.database import Base
+from app.models.note import Note
+from app.schemas.note import NoteCreate, NoteImportNode, NoteMove, NoteReorder, NoteUpdate
+from app.services.note_service import NoteService
+
+
+def make_session():
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine, expire_on_commit=False)()
+
+
+def assert_paths_consistent(db):
+    """Every stored path equals the one derived from the parent_id chain."""
+    rows = db.query(Note.id, Note.parent_id, Note.path).all()
+    parent_of = {row.id: row.parent_id for row in rows}
+    for row in rows:
+        chain = []
+        current = row.id
+        while current is not None:
+            chain.append(current)
+            current = parent_of[current]
+        assert row.path == "/" + "/".join(reversed(chain)) + "/"
+
+
+def test_paths_follow_moves():
+    db = make_session()
+    service = NoteService(db)
+
+    a = service.create(NoteCreate(title="A"))
+    b = service.create(NoteCreate(title="B", parent_id=a.id))
+    c = service.create(NoteCreate(title="C", parent_id=b.id))
+    d = service.create(NoteCreate(title="D"))
+    assert_paths_consistent(db)
+
+    service.reorder(b.id, NoteReorder(parent_id=d.id, position=0))
+    assert_paths_consistent(db)
+
+    service.update(c.id, NoteUpdate(parent_id=None))
+    assert_paths_consistent(db)
+
+    service.bulk_reorder([
+        NoteMove(id=a.id, parent_id=c.id, position=0),
+        NoteMove(id=c.id, parent_id=d.id, position=0),
+    ])
+    assert_paths_consistent(db)
+
+    service.bulk_import([NoteImportNode(title="I", children=[NoteImportNode(title="J")])], parent_id=a.id)
+    assert_paths_consistent(db)
+
+
+def test_descendant_check_has_no_depth_limit():
+    db = make_session()
+    service = NoteService(db)
+
+    root = service.create(NoteCreate(title="Level 0"))
+    node = root
+    for depth in range(1, 150):
+        node = service.create(NoteCreate(title=f"Level {depth}", parent_id=node.id))
+
+    with pytest.raises(ValueError, match="descendant"):
+        service.reorder(root.id, NoteReorder(parent_id=node.id, position=0))
+
+
+def test_breadcrumbs_and_subtree():
+    db = make_session()
+    service = NoteService(db)
+
+    a = service.create(NoteCreate(title="A"))
+    b = service.create(NoteCreate(title="B", parent_id=a.id))
+    c = service.create(NoteCreate(title="C", parent_id=b.id))
+    service.create(NoteCreate(title="Other"))
+
+    assert [n.title for n in service.get_breadcrumbs(c.id)] == ["A", "B", "C"]
+    assert service.get_breadcrumbs("missing") is None
+
+    subtree = service.get_tree(root_id=b.id)
+    assert [n.title for n in subtree] == ["B"]
+    assert [n.title for n in subtree[0].children] == ["C"]
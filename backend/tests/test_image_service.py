@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+
+from app.services.image_service import (
+    ImagePipeline,
+    describe_variants,
+    generate_variants,
+    modern_formats,
+    plan_widths,
+    variant_name,
+)
+
+Image = pytest.importorskip("PIL.Image")
+
+BLOB = "ab/cd/" + "ab" * 32 + ".png"
+
+
+def write_png(tmp_path, size=(1000, 500)):
+    (tmp_path / BLOB).parent.mkdir(parents=True)
+    Image.new("RGB", size, "red").save(tmp_path / BLOB)
+
+
+def test_plan_widths_never_upscales():
+    assert plan_widths(1000) == [320, 640, 1000]
+    assert plan_widths(200) == [200]
+    assert plan_widths(5000) == [320, 640, 1280, 2048]
+
+
+def test_generate_variants_writes_resized_modern_formats(tmp_path):
+    write_png(tmp_path)
+
+    written = generate_variants(str(tmp_path), BLOB)
+
+    assert len(written) == 3 * len(modern_formats())
+    with Image.open(tmp_path / variant_name(BLOB, 640, "webp")) as image:
+        assert image.size == (640, 320)
+    # Idempotent: existing derivatives are skipped
+    assert generate_variants(str(tmp_path), BLOB) == []
+
+
+def test_plan_matches_what_is_generated(tmp_path):
+    write_png(tmp_path)
+    pipeline = ImagePipeline(tmp_path, workers=1)
+
+    planned = pipeline.plan(BLOB, "/uploads")
+    try:
+        asyncio.run(pipeline.generate(BLOB))
+    finally:
+        pipeline.shutdown()
+
+    assert (planned["width"], planned["height"]) == (1000, 500)
+    assert planned["src"] == f"/uploads/{BLOB}"
+    assert describe_variants(tmp_path, BLOB, "/uploads")["sources"] == planned["sources"]
+    assert "/uploads/" + variant_name(BLOB, 320, "webp") + " 320w" in planned["sources"][-1]["srcset"]
+
+
+def test_has_variants_once_every_planned_derivative_exists(tmp_path):
+    write_png(tmp_path)
+    pipeline = ImagePipeline(tmp_path, workers=1)
+    assert not pipeline.has_variants(BLOB)
+
+    generate_variants(str(tmp_path), BLOB)
+    assert pipeline.has_variants(BLOB)
+
+    (tmp_path / variant_name(BLOB, 320, "webp")).unlink()
+    assert not pipeline.has_variants(BLOB)
+
+
+def test_non_images_and_corrupt_files_are_skipped(tmp_path):
+    pipeline = ImagePipeline(tmp_path, workers=1)
+    (tmp_path / "doc.pdf").write_bytes(b"%PDF")
+    (tmp_path / "broken.png").write_bytes(b"not a png")
+
+    assert pipeline.plan("doc.pdf", "/uploads") is None
+    assert pipeline.plan("broken.png", "/uploads") is None
+    assert generate_variants(str(tmp_path), "broken.png") == []
+    assert describe_variants(tmp_path, "broken.png", "/uploads") is None
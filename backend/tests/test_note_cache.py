@@ -0,0 +1,70 @@
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.schemas.note import NoteCreate, NoteReorder, NoteUpdate
+from app.services.cache import InMemoryCache, NoteCache
+from app.services.note_service import NoteService
+
+
+def make_session():
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine, expire_on_commit=False)()
+
+
+def test_in_memory_cache_evicts_least_recently_used():
+    cache = InMemoryCache(max_entries=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    cache.get("a")
+    cache.set("c", "3")
+
+    assert cache.get("a") == b"1"
+    assert cache.get("b") is None
+    assert cache.get("c") == b"3"
+
+
+def test_in_memory_cache_expires_entries():
+    cache = InMemoryCache()
+    cache.set("a", "1", ex=0)
+    assert cache.get("a") is None
+
+
+def test_reads_hit_cache_and_writes_invalidate():
+    db = make_session()
+    cache = NoteCache(InMemoryCache())
+    service = NoteService(db, cache=cache)
+
+    parent = service.create(NoteCreate(title="Parent"))
+    child1 = service.create(NoteCreate(title="Child 1", parent_id=parent.id))
+    service.create(NoteCreate(title="Child 2", parent_id=parent.id))
+
+    assert service.get_by_id(child1.id).title == "Child 1"
+    assert service.get_by_id(child1.id).title == "Child 1"
+    assert cache.stats()["hits"] == 1
+
+    service.update(child1.id, NoteUpdate(title="Renamed"))
+    assert service.get_by_id(child1.id).title == "Renamed"
+
+    assert [c.title for c in service.get_children(parent.id)] == ["Renamed", "Child 2"]
+    service.reorder(child1.id, NoteReorder(parent_id=parent.id, position=1))
+    assert [c.title for c in service.get_children(parent.id)] == ["Child 2", "Renamed"]
+    # Sibling shifted by the move must not be served with its old position
+    assert service.get_by_id(child1.id).position == 1
+
+
+def test_delete_invalidates_cascaded_descendants():
+    db = make_session()
+    cache = NoteCache(InMemoryCache())
+    service = NoteService(db, cache=cache)
+
+    parent = service.create(NoteCreate(title="Parent"))
+    child = service.create(NoteCreate(title="Child", parent_id=parent.id))
+    assert service.get_by_id(child.id) is not None
+    assert len(service.get_all()) == 2
+
+    service.delete(parent.id)
+
+    assert service.get_by_id(child.id) is None
+    assert service.get_all() == []
@@ -0,0 +1,108 @@
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.schemas.note import NoteCreate, NoteImportNode, NoteReorder, NoteUpdate
+from app.services.note_service import ChangesExpired, NoteService
+
+
+def make_session():
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine, expire_on_commit=False)()
+
+
+def test_changes_since_token_include_only_later_writes():
+    db = make_session()
+    service = NoteService(db)
+    old = service.create(NoteCreate(title="Old"))
+    token = service.get_changes().token
+
+    new = service.create(NoteCreate(title="New"))
+    service.update(new.id, NoteUpdate(title="New, edited"))
+
+    changes = service.get_changes(since=token)
+    assert [note.id for note in changes.items] == [new.id]
+    assert changes.items[0].title == "New, edited"
+    assert changes.deleted == []
+    assert old.id not in {note.id for note in changes.items}
+
+    assert service.get_changes(since=changes.token).items == []
+
+
+def test_cascade_delete_leaves_tombstones_for_the_whole_subtree():
+    db = make_session()
+    service = NoteService(db)
+    parent = service.create(NoteCreate(title="Parent"))
+    child = service.create(NoteCreate(title="Child", parent_id=parent.id))
+    grandchild = service.create(NoteCreate(title="Grandchild", parent_id=child.id))
+    sibling = service.create(NoteCreate(title="Sibling"))
+    token = service.get_changes().token
+
+    service.delete(parent.id)
+
+    changes = service.get_changes(since=token)
+    assert set(changes.deleted) == {parent.id, child.id, grandchild.id}
+    # Closing the gap renumbered the remaining root note
+    assert [(note.id, note.position) for note in changes.items] == [(sibling.id, 0)]
+
+
+def test_created_then_deleted_is_reported_as_deleted_only():
+    db = make_session()
+    service = NoteService(db)
+    token = service.get_changes().token
+    note = service.create(NoteCreate(title="Short-lived"))
+    service.delete(note.id)
+
+    changes = service.get_changes(since=token)
+    assert changes.items == []
+    assert changes.deleted == [note.id]
+
+
+def test_changes_are_paged_by_limit():
+    db = make_session()
+    service = NoteService(db)
+    token = service.get_changes().token
+    service.bulk_import([NoteImportNode(title=f"Imported {i}") for i in range(5)])
+
+    first = service.get_changes(since=token, limit=3)
+    second = service.get_changes(since=first.token, limit=3)
+    assert first.has_more and not second.has_more
+    titles = [note.title for note in first.items + second.items]
+    assert sorted(titles) == [f"Imported {i}" for i in range(5)]
+
+
+def test_rank_mode_move_logs_only_the_moved_note_with_its_rank():
+    db = make_session()
+    service = NoteService(db, ordering_mode="rank")
+    notes = [service.create(NoteCreate(title=f"Note {i}")) for i in range(3)]
+    token = service.get_changes().token
+    held = service.get_all()
+
+    service.reorder(notes[2].id, NoteReorder(parent_id=None, position=0))
+
+    changes = service.get_changes(since=token)
+    assert [(note.title, note.position) for note in changes.items] == [("Note 2", 0)]
+    # Merging by id and sorting by rank gives the client the server's order
+    merged = {note.id: note.rank for note in held} | {note.id: note.rank for note in changes.items}
+    resorted = sorted(merged, key=merged.__getitem__)
+    assert resorted == [note.id for note in service.get_children(None)]
+
+
+def test_pruned_or_foreign_tokens_expire():
+    db = make_session()
+    service = NoteService(db)
+    for i in range(3):
+        service.create(NoteCreate(title=f"Note {i}"))
+    latest = service.get_changes().token
+
+    with pytest.raises(ChangesExpired):
+        service.get_changes(since=latest + 10)
+
+    service.create(NoteCreate(title="Kept"))
+    service.prune_changes(timedelta(seconds=-1))
+    with pytest.raises(ChangesExpired):
+        service.get_changes(since=0)
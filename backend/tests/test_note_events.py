@@ -0,0 +1,93 @@
+import asyncio
+import json
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.schemas.note import NoteCreate, NoteReorder, NoteUpdate
+from app.services.events import NoteEvents, chunk_payloads, format_sse
+from app.services.note_service import NoteService
+
+
+def make_session():
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine, expire_on_commit=False)()
+
+
+def drain(subscription):
+    events = []
+    while not subscription.queue.empty():
+        events.append(subscription.queue.get_nowait())
+    return events
+
+
+def test_writes_push_events_with_change_tokens():
+    async def scenario():
+        events = NoteEvents()
+        subscription = events.subscribe()
+        service = NoteService(make_session(), events=events)
+
+        parent = service.create(NoteCreate(title="Parent"))
+        child = service.create(NoteCreate(title="Child"))
+        service.update(child.id, NoteUpdate(title="Renamed"))
+        service.reorder(child.id, NoteReorder(parent_id=parent.id, position=0))
+        service.delete(parent.id)
+        await asyncio.sleep(0)
+
+        received = drain(subscription)
+        assert [(e["type"], e["id"]) for e in received] == [
+            ("created", parent.id),
+            ("created", child.id),
+            ("updated", child.id),
+            ("moved", child.id),
+            ("deleted", parent.id),
+        ]
+        tokens = [e["token"] for e in received]
+        assert tokens == sorted(tokens)
+        # Tokens index the change log: the delete (with its cascade) is what follows the move
+        changes = service.get_changes(since=tokens[3])
+        assert set(changes.deleted) == {parent.id, child.id}
+        events.unsubscribe(subscription)
+
+    asyncio.run(scenario())
+
+
+def test_failed_write_publishes_nothing():
+    async def scenario():
+        events = NoteEvents()
+        subscription = events.subscribe()
+        service = NoteService(make_session(), events=events)
+        try:
+            service.create(NoteCreate(title="Orphan", parent_id="missing"))
+        except ValueError:
+            pass
+        await asyncio.sleep(0)
+        assert drain(subscription) == []
+
+    asyncio.run(scenario())
+
+
+def test_slow_subscriber_is_flagged_for_resync():
+    async def scenario():
+        events = NoteEvents()
+        subscription = events.subscribe()
+        events.publish([{"type": "updated", "id": str(i)} for i in range(subscription.queue.maxsize + 1)])
+        await asyncio.sleep(0)
+        assert subscription.overflowed
+
+    asyncio.run(scenario())
+
+
+def test_notify_payloads_stay_under_the_limit():
+    events = [{"type": "created", "id": f"{i:036d}", "parent_id": None, "token": i} for i in range(500)]
+    payloads = chunk_payloads(events, limit=1000)
+    assert all(len(payload) <= 1000 for payload in payloads)
+    assert [e for payload in payloads for e in json.loads(payload)] == events
+
+
+def test_format_sse_uses_token_as_event_id():
+    message = format_sse({"type": "deleted", "id": "n1", "parent_id": None, "token": 7})
+    assert message.startswith("id: 7\nevent: deleted\ndata: {")
+    assert message.endswith("\n\n")
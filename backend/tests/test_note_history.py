@@ -0,0 +1,90 @@
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import NoteRevision
+from app.schemas.note import NoteCreate, NotePatch, NoteUpdate, TextEdit
+from app.services.history import SNAPSHOT_INTERVAL, apply_delta, make_delta
+from app.services.note_service import NoteService
+
+
+def make_session():
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine, expire_on_commit=False)(), engine
+
+
+def test_delta_round_trip():
+    before = {"title": "Doc", "content": "aaa bbb aaa", "sidenote": None}
+    after = {"title": "Doc", "content": "aaa ccc bbb aaa", "sidenote": "side"}
+    delta = make_delta(before, after)
+    assert "title" not in delta
+    assert delta["content"] == [4, 7, "ccc "]
+    assert apply_delta(before, delta) == after
+    # Repeated characters must not let prefix and suffix overlap
+    assert apply_delta({"content": "aa"}, make_delta({"content": "aa"}, {"content": "aaa"})) == {"content": "aaa"}
+
+
+def test_every_version_is_rebuilt_from_snapshots_and_deltas():
+    db, _ = make_session()
+    service = NoteService(db)
+    note = service.create(NoteCreate(title="Log", content=""))
+    expected = {1: ""}
+    for i in range(2, 2 * SNAPSHOT_INTERVAL + 3):
+        if i % 2:
+            note = service.patch(note.id, NotePatch(version=note.version, content=[TextEdit(pos=0, insert=f"{i};")]))
+        else:
+            note = service.update(note.id, NoteUpdate(content=f"{note.content}line {i}\n"))
+        expected[note.version] = note.content
+
+    history = service.get_history(note.id, limit=1000)
+    assert [entry.version for entry in history] == sorted(expected, reverse=True)
+    snapshots = {entry.version for entry in history if entry.kind == "snapshot"}
+    assert snapshots == {1, SNAPSHOT_INTERVAL + 1, 2 * SNAPSHOT_INTERVAL + 1}
+    for version, content in expected.items():
+        assert service.get_history_version(note.id, version).content == content
+
+    # Deltas stay small however long the note gets
+    largest_delta = max(entry.size for entry in history if entry.kind == "delta")
+    assert largest_delta < 60 < len(note.content)
+    assert service.get_history(note.id, limit=2, before_version=3)[0].version == 2
+
+
+def test_diff_between_versions():
+    db, _ = make_session()
+    service = NoteService(db)
+    note = service.create(NoteCreate(title="Doc", content="one\ntwo\n"))
+    service.update(note.id, NoteUpdate(content="one\n2\n"))
+    service.update(note.id, NoteUpdate(title="Doc v3"))
+
+    diff = service.diff_history(note.id, 1, 3)
+    assert set(diff.changes) == {"title", "content"}
+    assert "-two\n+2\n" in diff.changes["content"]
+    assert service.diff_history(note.id, 1, 9) is None
+    assert service.get_history("missing") is None
+
+
+def test_diff_separates_lines_without_a_trailing_newline():
+    db, _ = make_session()
+    service = NoteService(db)
+    note = service.create(NoteCreate(title="Note", content="x"))
+    service.update(note.id, NoteUpdate(content="new"))
+
+    diff = service.diff_history(note.id, 1, 2).changes["content"]
+
+    assert diff == "--- v1\n+++ v2\n@@ -1 +1 @@\n-x\n+new\n"
+
+
+def test_notes_without_history_get_their_base_version_on_first_edit():
+    db, _ = make_session()
+    service = NoteService(db)
+    note = service.create(NoteCreate(title="Old", content="before history"))
+    db.query(NoteRevision).delete()
+    db.commit()
+
+    service.update(note.id, NoteUpdate(content="after"))
+    assert service.get_history_version(note.id, 1).content == "before history"
+    assert service.get_history_version(note.id, 2).content == "after"
+    # Moves and reorders are not versions
+    service.update(note.id, NoteUpdate(parent_id=None))
+    assert db.query(func.count()).select_from(NoteRevision).scalar() == 2
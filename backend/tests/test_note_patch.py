@@ -0,0 +1,77 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.schemas.note import NoteCreate, NotePatch, NoteReorder, NoteUpdate, TextEdit
+from app.services.note_service import NoteService, VersionConflict, apply_text_edits
+
+
+def make_session():
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine, expire_on_commit=False)(), engine
+
+
+def test_apply_text_edits_in_order():
+    edits = [TextEdit(pos=6, delete=5, insert="there"), TextEdit(pos=0, insert="Oh, ")]
+    assert apply_text_edits("hello world", edits) == "Oh, hello there"
+    with pytest.raises(ValueError):
+        apply_text_edits("short", [TextEdit(pos=3, delete=10)])
+
+
+def test_apply_text_edits_counts_utf16_code_units():
+    # "😀" is one code point but two UTF-16 units, as "😀ab".length === 4 in JS
+    assert apply_text_edits("😀ab", [TextEdit(pos=3, delete=1, insert="c")]) == "😀ac"
+    assert apply_text_edits("a😀b", [TextEdit(pos=1, delete=2, insert="🎉")]) == "a🎉b"
+    with pytest.raises(ValueError):
+        apply_text_edits("a😀b", [TextEdit(pos=2, delete=1)])
+    with pytest.raises(ValueError):
+        apply_text_edits("😀", [TextEdit(pos=0, delete=3)])
+
+
+def test_patch_applies_edits_and_bumps_version():
+    db, _ = make_session()
+    service = NoteService(db)
+    note = service.create(NoteCreate(title="Doc", content="The quick fox"))
+    assert note.version == 1
+
+    patched = service.patch(note.id, NotePatch(version=1, content=[TextEdit(pos=10, insert="brown ")]))
+    assert patched.content == "The quick brown fox"
+    assert patched.version == 2
+    # Moves are not content versions
+    service.reorder(note.id, NoteReorder(parent_id=None, position=0))
+    assert service.get_by_id(note.id).version == 2
+
+
+def test_stale_version_is_rejected_without_writing():
+    db, _ = make_session()
+    service = NoteService(db)
+    note = service.create(NoteCreate(title="Doc", content="abc"))
+    service.update(note.id, NoteUpdate(content="abcd"))
+
+    with pytest.raises(VersionConflict) as conflict:
+        service.patch(note.id, NotePatch(version=1, content=[TextEdit(pos=0, insert="x")]))
+    assert conflict.value.current_version == 2
+    assert service.get_by_id(note.id).content == "abcd"
+
+    with pytest.raises(VersionConflict):
+        service.update(note.id, NoteUpdate(title="Late", version=1))
+    assert service.update(note.id, NoteUpdate(title="Current", version=2)).version == 3
+
+
+def test_concurrent_writer_loses_the_compare_and_set():
+    db, engine = make_session()
+    first = NoteService(db)
+    note = first.create(NoteCreate(title="Doc", content="abc"))
+
+    # A second session reads version 1 ...
+    other_db = sessionmaker(bind=engine, expire_on_commit=False)()
+    other = NoteService(other_db)
+    stale = other._load(note.id)
+    assert stale.version == 1
+    # ... then someone else commits version 2 before it writes
+    first.patch(note.id, NotePatch(version=1, content=[TextEdit(pos=3, insert="d")]))
+
+    with pytest.raises(VersionConflict):
+        other._claim_version(stale, 1)
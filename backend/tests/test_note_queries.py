@@ -0,0 +1,119 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.schemas.note import NoteCreate, NoteReorder, NoteSummary, NoteUpdate
+from app.services.note_service import NoteService
+
+
+def make_session():
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine, expire_on_commit=False)()
+
+
+def test_summaries_match_full_list_without_bodies():
+    """Tree view returns the same rows/order as get_all() but only slim columns."""
+    db = make_session()
+    service = NoteService(db)
+
+    parent = service.create(NoteCreate(title="Parent", content="x" * 1000, sidenote="side"))
+    service.create(NoteCreate(title="Child", parent_id=parent.id, content="body"))
+    service.create(NoteCreate(title="Root 2"))
+
+    full = service.get_all()
+    summaries = service.get_summaries()
+
+    assert [s.id for s in summaries] == [n.id for n in full]
+    assert [(s.title, s.parent_id, s.position) for s in summaries] == [
+        (n.title, n.parent_id, n.position) for n in full
+    ]
+    assert set(NoteSummary.model_fields) == {"id", "title", "parent_id", "position"}
+
+
+def test_tree_nests_children_in_position_order():
+    db = make_session()
+    service = NoteService(db)
+
+    parent = service.create(NoteCreate(title="Parent"))
+    service.create(NoteCreate(title="Child 1", parent_id=parent.id))
+    child2 = service.create(NoteCreate(title="Child 2", parent_id=parent.id))
+    service.create(NoteCreate(title="Grandchild", parent_id=child2.id))
+    service.create(NoteCreate(title="Root 2"))
+
+    tree = service.get_tree()
+    assert [n.title for n in tree] == ["Parent", "Root 2"]
+    assert [c.title for c in tree[0].children] == ["Child 1", "Child 2"]
+    assert [g.title for g in tree[0].children[1].children] == ["Grandchild"]
+
+
+def test_tree_root_id_and_max_depth():
+    db = make_session()
+    service = NoteService(db)
+
+    parent = service.create(NoteCreate(title="Parent"))
+    child = service.create(NoteCreate(title="Child", parent_id=parent.id))
+    service.create(NoteCreate(title="Grandchild", parent_id=child.id))
+
+    subtree = service.get_tree(root_id=child.id)
+    assert [n.title for n in subtree] == ["Child"]
+    assert [g.title for g in subtree[0].children] == ["Grandchild"]
+
+    shallow = service.get_tree(max_depth=1)
+    assert [c.title for c in shallow[0].children] == ["Child"]
+    assert shallow[0].children[0].children == []
+
+    assert service.get_tree(root_id="missing") is None
+
+
+def test_keyset_pages_cover_full_list_in_order():
+    db = make_session()
+    service = NoteService(db)
+
+    parent = service.create(NoteCreate(title="Parent"))
+    for i in range(5):
+        service.create(NoteCreate(title=f"Child {i}", parent_id=parent.id))
+    for i in range(3):
+        service.create(NoteCreate(title=f"Root {i}"))
+
+    expected = [n.id for n in service.get_all()]
+    seen: list[str] = []
+    cursor = None
+    while True:
+        page, cursor = service.get_page(cursor=cursor, limit=3)
+        seen.extend(n.id for n in page)
+        if cursor is None:
+            break
+
+    assert sorted(seen) == sorted(expected)
+    assert len(seen) == len(set(seen)) == 9
+    assert seen == [n.id for n in service.iter_all(batch_size=2)]
+
+
+def test_invalid_cursor_raises_value_error():
+    db = make_session()
+    service = NoteService(db)
+
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        service.get_page(cursor="not-a-cursor")
+
+
+def test_revision_advances_on_every_write():
+    db = make_session()
+    service = NoteService(db)
+
+    assert service.get_revision() == (0, None)
+
+    parent = service.create(NoteCreate(title="Parent"))
+    child = service.create(NoteCreate(title="Child", parent_id=parent.id))
+    assert service.get_revision()[0] == 2
+
+    service.update(child.id, NoteUpdate(title="Renamed"))
+    service.reorder(child.id, NoteReorder(parent_id=None, position=0))
+    service.delete(child.id)
+    revision, last_modified = service.get_revision()
+    assert revision == 5
+    assert last_modified is not None
+    assert service.get_updated_at(child.id) is None
+    assert service.get_updated_at(parent.id) is not None
@@ -0,0 +1,69 @@
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.schemas.note import NoteCreate, NoteImportNode, NoteUpdate
+from app.services.note_service import NoteService
+
+
+def make_session():
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine, expire_on_commit=False)()
+
+
+def test_search_ranks_title_matches_and_highlights():
+    db = make_session()
+    service = NoteService(db)
+
+    body = service.create(NoteCreate(title="Groceries", content="remember the kubernetes book"))
+    title = service.create(NoteCreate(title="Kubernetes notes", content="pods and services"))
+    service.create(NoteCreate(title="Unrelated", content="nothing here"))
+
+    page = service.search("kubernetes")
+
+    assert [hit.id for hit in page.items] == [title.id, body.id]
+    assert "<mark>" in page.items[0].snippet
+    assert page.next_offset is None
+
+
+def test_search_snippet_escapes_note_markup():
+    db = make_session()
+    service = NoteService(db)
+    service.create(NoteCreate(title="Page", content='kubernetes <script>alert("x")</script> & more'))
+
+    snippet = service.search("kubernetes").items[0].snippet
+
+    assert "<script>" not in snippet
+    assert "&lt;script&gt;" in snippet and "&amp;" in snippet
+    assert "<mark>kubernetes</mark>" in snippet
+
+
+def test_search_tracks_updates_deletes_and_bulk_inserts():
+    db = make_session()
+    service = NoteService(db)
+
+    note = service.create(NoteCreate(title="Draft", content="alpha"))
+    service.update(note.id, NoteUpdate(content="bravo"))
+    assert service.search("alpha").items == []
+    assert [hit.id for hit in service.search("bravo").items] == [note.id]
+
+    service.bulk_import([NoteImportNode(title="Imported bravo")])
+    assert len(service.search("bravo").items) == 2
+
+    service.delete(note.id)
+    assert [hit.title for hit in service.search("bravo").items] == ["Imported bravo"]
+
+
+def test_search_paginates_and_tolerates_syntax():
+    db = make_session()
+    service = NoteService(db)
+    for i in range(5):
+        service.create(NoteCreate(title=f"Meeting {i}"))
+
+    first = service.search("meeting", limit=3)
+    second = service.search("meeting", limit=3, offset=first.next_offset)
+
+    assert len(first.items) == 3 and first.next_offset == 3
+    assert len(second.items) == 2 and second.next_offset is None
+    assert service.search('meeting" OR (').items == []
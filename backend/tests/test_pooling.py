@@ -0,0 +1,90 @@
+import sqlite3
+
+import pytest
+from sqlalchemy import create_engine, exc
+
+from app import database
+from app.pooling import SLOW_CHECKOUT_SECONDS, PoolMetrics, TimedQueuePool, pool_stats
+
+
+class IsolatedPool(TimedQueuePool):
+    # Counters of its own, not shared with the app's engine
+    metrics = PoolMetrics()
+
+
+def make_pool(pool_size=1, max_overflow=1, timeout=SLOW_CHECKOUT_SECONDS * 1.5):
+    IsolatedPool.metrics.reset()
+    return IsolatedPool(
+        lambda: sqlite3.connect(":memory:", check_same_thread=False),
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        timeout=timeout,
+    )
+
+
+def test_metrics_count_checkouts_overflow_and_timeouts():
+    pool = make_pool()
+    first = pool.connect()
+    stats = pool_stats(pool, max_overflow=1)
+    assert (stats["checked_out"], stats["overflow"], stats["checkouts"]) == (1, 0, 1)
+
+    second = pool.connect()
+    stats = pool_stats(pool, max_overflow=1)
+    assert (stats["checked_out"], stats["overflow"], stats["max_overflow"]) == (2, 1, 1)
+
+    with pytest.raises(exc.TimeoutError):
+        pool.connect()
+    stats = pool_stats(pool)
+    assert stats["checkouts"] == 2 and stats["timeouts"] == 1
+    assert stats["slow_checkouts"] == 1
+    assert stats["wait_ms_max"] >= SLOW_CHECKOUT_SECONDS * 1000
+    assert stats["wait_ms_avg"] == pytest.approx(stats["wait_ms_max"] / 3, rel=0.5)
+    assert "max_overflow" not in stats
+
+    second.close()
+    first.close()
+    stats = pool_stats(pool)
+    assert (stats["checked_out"], stats["checked_in"], stats["overflow"]) == (0, 1, 0)
+
+
+def test_metrics_reset():
+    metrics = PoolMetrics()
+    metrics.record(0.5)
+    metrics.record(0.2, timed_out=True)
+    assert metrics.snapshot() == {
+        "checkouts": 1,
+        "slow_checkouts": 2,
+        "timeouts": 1,
+        "wait_ms_avg": 350.0,
+        "wait_ms_max": 500.0,
+    }
+    metrics.reset()
+    assert metrics.snapshot()["checkouts"] == 0
+
+
+def test_health_payload_reports_the_engine_pool(tmp_path, monkeypatch):
+    IsolatedPool.metrics.reset()
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", poolclass=IsolatedPool, pool_size=2, max_overflow=3)
+    monkeypatch.setattr(database, "engine", engine)
+    monkeypatch.setattr(database, "async_engine", None)
+    monkeypatch.setattr(database.settings, "db_max_overflow", 3)
+    with engine.connect():
+        payload = database.get_pool_stats()
+
+    assert list(payload) == ["sync"]
+    assert payload["sync"] == {
+        **payload["sync"],
+        "pool": "IsolatedPool",
+        "size": 2,
+        "checked_out": 1,
+        "overflow": 0,
+        "max_overflow": 3,
+        "checkouts": 1,
+        "timeouts": 0,
+    }
+    engine.dispose()
+
+
+def test_plain_pools_report_only_their_class():
+    engine = create_engine("sqlite://")
+    assert pool_stats(engine.pool) == {"pool": type(engine.pool).__name__}
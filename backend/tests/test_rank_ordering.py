@@ -0,0 +1,155 @@
+import random
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.schemas.note import NoteCreate, NoteReorder, NoteUpdate
+from app.services.cache import InMemoryCache, NoteCache
+from app.services.note_service import NoteService
+from app.services.ranking import rank_between, spread_ranks
+
+
+def make_session():
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine, expire_on_commit=False)()
+
+
+def test_rank_between_stays_ordered_under_random_inserts():
+    ranks: list[str] = []
+    rng = random.Random(0)
+    for _ in range(2000):
+        index = rng.randint(0, len(ranks))
+        before = ranks[index - 1] if index > 0 else None
+        after = ranks[index] if index < len(ranks) else None
+        ranks.insert(index, rank_between(before, after))
+    assert ranks == sorted(ranks)
+    assert len(set(ranks)) == len(ranks)
+
+
+def test_spread_ranks_are_increasing():
+    ranks = spread_ranks(500)
+    assert ranks == sorted(ranks)
+    assert len(set(ranks)) == 500
+
+
+def test_rank_mode_move_writes_only_the_moved_row():
+    db = make_session()
+    service = NoteService(db, ordering_mode="rank")
+
+    parent = service.create(NoteCreate(title="Parent"))
+    children = [service.create(NoteCreate(title=f"Child {i}", parent_id=parent.id)) for i in range(4)]
+    ranks_before = {c.id: c.rank for c in service.get_children(parent.id)}
+
+    service.reorder(children[3].id, NoteReorder(parent_id=parent.id, position=1))
+
+    result = service.get_children(parent.id)
+    assert [c.title for c in result] == ["Child 0", "Child 3", "Child 1", "Child 2"]
+    assert [c.position for c in result] == [0, 1, 2, 3]
+    assert {c.id: c.rank for c in result if c.id != children[3].id} == {
+        k: v for k, v in ranks_before.items() if k != children[3].id
+    }
+
+
+def test_rank_mode_move_between_parents_and_rebalance():
+    db = make_session()
+    service = NoteService(db, ordering_mode="rank")
+
+    parent1 = service.create(NoteCreate(title="Parent 1"))
+    parent2 = service.create(NoteCreate(title="Parent 2"))
+    child = service.create(NoteCreate(title="Child", parent_id=parent1.id))
+    service.create(NoteCreate(title="Other", parent_id=parent2.id))
+
+    moved = service.reorder(child.id, NoteReorder(parent_id=parent2.id, position=0))
+    assert moved.position == 0
+    assert [c.title for c in service.get_children(parent2.id)] == ["Child", "Other"]
+
+    assert service.rebalance_ranks(parent2.id) == 2
+    result = service.get_children(parent2.id)
+    assert [c.title for c in result] == ["Child", "Other"]
+    assert [c.rank for c in result] == spread_ranks(2)
+
+
+def test_rebuild_ranks_follows_positions():
+    db = make_session()
+    service = NoteService(db)
+
+    parent = service.create(NoteCreate(title="Parent"))
+    a = service.create(NoteCreate(title="A", parent_id=parent.id))
+    service.create(NoteCreate(title="B", parent_id=parent.id))
+    service.reorder(a.id, NoteReorder(parent_id=parent.id, position=1))
+
+    assert service.rebuild_ranks() == 3
+    ranked = NoteService(db, ordering_mode="rank")
+    assert [c.title for c in ranked.get_children(parent.id)] == ["B", "A"]
+
+
+def test_rank_mode_validators_change_when_a_sibling_moves_ahead():
+    db = make_session()
+    service = NoteService(db, ordering_mode="rank")
+
+    a = service.create(NoteCreate(title="A"))
+    b = service.create(NoteCreate(title="B"))
+    updated_at, position = service.get_validators(a.id)
+    assert position == 0
+
+    service.reorder(b.id, NoteReorder(parent_id=None, position=0))
+    assert service.get_validators(a.id) == (updated_at, 1)
+    assert NoteService(db).get_validators(a.id)[1] is None
+
+
+def test_rank_mode_pages_and_export_report_derived_positions():
+    db = make_session()
+    service = NoteService(db, ordering_mode="rank")
+    notes = [service.create(NoteCreate(title=f"N{i}")) for i in range(5)]
+    # A move rewrites only the moved row's rank, leaving stored positions stale
+    service.reorder(notes[4].id, NoteReorder(parent_id=None, position=0))
+    expected = ["N4", "N0", "N1", "N2", "N3"]
+
+    first, cursor = service.get_page(limit=2)
+    second, _ = service.get_page(cursor=cursor, limit=3)
+    assert [n.title for n in first + second] == expected
+    assert [n.position for n in first + second] == [0, 1, 2, 3, 4]
+
+    exported = [(n.title, n.position) for n in service.iter_all(batch_size=2)]
+    assert exported == list(zip(expected, range(5)))
+
+
+def test_spread_ranks_after_an_existing_rank():
+    for after in ("i", "zz", "z", "0001"):
+        ranks = spread_ranks(3000, after=after)
+        assert ranks == sorted(ranks) and ranks[0] > after
+        assert len(set(ranks)) == 3000
+
+
+def test_rank_mode_cached_siblings_follow_delete_move_and_restore():
+    db = make_session()
+    service = NoteService(db, cache=NoteCache(InMemoryCache()), ordering_mode="rank", delete_mode="trash")
+    folder = service.create(NoteCreate(title="Folder"))
+    a, b, c = (service.create(NoteCreate(title=title)) for title in "abc")
+
+    def cached_position(note_id):
+        note = service.get_by_id(note_id)
+        assert note.position == service.get_validators(note_id)[1]
+        return note.position
+
+    assert cached_position(c.id) == 3
+    service.delete(a.id)
+    assert cached_position(c.id) == 2
+    service.update(b.id, NoteUpdate(parent_id=folder.id))
+    assert cached_position(c.id) == 1
+    service.restore(a.id)
+    assert [cached_position(note.id) for note in (folder, c, a)] == [0, 1, 2]
+
+
+def test_rank_mode_breadcrumbs_report_derived_positions():
+    db = make_session()
+    service = NoteService(db, ordering_mode="rank")
+    parent = service.create(NoteCreate(title="Parent"))
+    children = [service.create(NoteCreate(title=f"Child {i}", parent_id=parent.id)) for i in range(3)]
+    service.reorder(children[2].id, NoteReorder(parent_id=parent.id, position=0))
+    service.reorder(parent.id, NoteReorder(parent_id=None, position=0))
+
+    crumbs = service.get_breadcrumbs(children[1].id)
+    assert [(crumb.title, crumb.position) for crumb in crumbs] == [("Parent", 0), ("Child 1", 2)]
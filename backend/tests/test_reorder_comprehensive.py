@@ -1,8 +1,9 @@
+import pytest
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
 from app.database import Base
-from app.schemas.note import NoteCreate, NoteReorder
+from app.schemas.note import NoteCreate, NoteMove, NoteReorder
 from app.services.note_service import NoteService
 
 
@@ -135,3 +136,48 @@ def test_move_to_root():
     roots = service.get_children(None)
     assert len(roots) == 3
     assert [n.position for n in roots] == [0, 1, 2]
+
+
+def test_bulk_reorder_matches_sequential_moves():
+    """Bulk moves give the same result as issuing the single reorders in order."""
+    db = make_session()
+    service = NoteService(db)
+
+    parent1 = service.create(NoteCreate(title="Parent 1"))
+    parent2 = service.create(NoteCreate(title="Parent 2"))
+    a = service.create(NoteCreate(title="A", parent_id=parent1.id))
+    b = service.create(NoteCreate(title="B", parent_id=parent1.id))
+    c = service.create(NoteCreate(title="C", parent_id=parent1.id))
+
+    moved = service.bulk_reorder([
+        NoteMove(id=c.id, parent_id=parent1.id, position=0),
+        NoteMove(id=a.id, parent_id=parent2.id, position=0),
+        NoteMove(id=parent2.id, parent_id=parent1.id, position=5),
+    ])
+
+    assert [n.id for n in moved] == [c.id, a.id, parent2.id]
+    children1 = service.get_children(parent1.id)
+    assert [n.title for n in children1] == ["C", "B", "Parent 2"]
+    assert [n.position for n in children1] == [0, 1, 2]
+    assert [n.title for n in service.get_children(parent2.id)] == ["A"]
+    assert [n.position for n in service.get_children(None)] == [0]
+    assert b.id in {n.id for n in children1}
+
+
+def test_bulk_reorder_rejects_cycle_atomically():
+    db = make_session()
+    service = NoteService(db)
+
+    parent = service.create(NoteCreate(title="Parent"))
+    child = service.create(NoteCreate(title="Child", parent_id=parent.id))
+    other = service.create(NoteCreate(title="Other"))
+
+    with pytest.raises(ValueError, match="descendant"):
+        service.bulk_reorder([
+            NoteMove(id=other.id, parent_id=parent.id, position=0),
+            NoteMove(id=parent.id, parent_id=child.id, position=0),
+        ])
+
+    # Nothing from the rejected batch was applied
+    assert [n.title for n in service.get_children(None)] == ["Parent", "Other"]
+    assert [n.title for n in service.get_children(parent.id)] == ["Child"]
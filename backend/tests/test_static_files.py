@@ -0,0 +1,113 @@
+import asyncio
+import gzip
+
+import httpx
+from starlette.applications import Starlette
+from starlette.routing import Mount
+
+from app.static_files import IMMUTABLE_CACHE_CONTROL, UploadFiles, precompress
+
+SVG = b"<svg xmlns='http://www.w3.org/2000/svg'>" + b"<rect width='1' height='1'/>" * 200 + b"</svg>"
+
+
+class Client:
+    """Minimal sync wrapper over httpx's ASGI transport (no TestClient thread)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    def get(self, url, headers=None):
+        async def request():
+            transport = httpx.ASGITransport(app=self.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await client.get(url, headers=headers)
+
+        return asyncio.run(request())
+
+
+def make_client(tmp_path):
+    return Client(Starlette(routes=[Mount("/uploads", UploadFiles(directory=str(tmp_path)))]))
+
+
+def test_files_are_immutable_with_strong_etag_and_ranges(tmp_path):
+    (tmp_path / "ab").mkdir()
+    (tmp_path / "ab" / "abc123.png").write_bytes(b"0123456789")
+    client = make_client(tmp_path)
+
+    response = client.get("/uploads/ab/abc123.png")
+    assert response.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+    assert response.headers["etag"] == '"abc123.png"'
+
+    assert client.get("/uploads/ab/abc123.png", headers={"If-None-Match": '"abc123.png"'}).status_code == 304
+
+    partial = client.get("/uploads/ab/abc123.png", headers={"Range": "bytes=2-5", "If-Range": '"abc123.png"'})
+    assert partial.status_code == 206
+    assert partial.content == b"2345"
+
+    # A validator for other content: the whole (current) file instead of a range
+    stale = client.get("/uploads/ab/abc123.png", headers={"Range": "bytes=2-5", "If-Range": '"other.png"'})
+    assert stale.status_code == 200
+    assert stale.content == b"0123456789"
+
+
+def test_svg_is_served_precompressed_when_accepted(tmp_path):
+    (tmp_path / "logo.svg").write_bytes(SVG)
+    written = precompress(tmp_path / "logo.svg")
+    assert tmp_path / "logo.svg.gz" in written
+    client = make_client(tmp_path)
+
+    response = client.get("/uploads/logo.svg", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["content-type"].startswith("image/svg+xml")
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.content == SVG  # httpx decodes the gzip body
+    assert int(response.headers["content-length"]) == len(gzip.compress(SVG, compresslevel=9, mtime=0))
+
+    identity = client.get("/uploads/logo.svg", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in identity.headers
+    assert identity.content == SVG
+
+
+def test_whole_file_goes_out_via_pathsend_when_offered(tmp_path):
+    (tmp_path / "abc123.png").write_bytes(b"0123456789")
+    app = Starlette(routes=[Mount("/uploads", UploadFiles(directory=str(tmp_path)))])
+
+    def request(headers=(), method="GET"):
+        messages = []
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            messages.append(message)
+
+        scope = {
+            "type": "http",
+            "http_version": "1.1",
+            "method": method,
+            "scheme": "http",
+            "path": "/uploads/abc123.png",
+            "raw_path": b"/uploads/abc123.png",
+            "root_path": "",
+            "query_string": b"",
+            "headers": [(name.encode(), value.encode()) for name, value in headers],
+            "server": ("test", 80),
+            "extensions": {"http.response.pathsend": {}},
+        }
+        asyncio.run(app(scope, receive, send))
+        return messages
+
+    start, body = request()
+    assert start["status"] == 200 and (b"content-length", b"10") in start["headers"]
+    assert body == {"type": "http.response.pathsend", "path": str(tmp_path / "abc123.png")}
+
+    # Ranges and HEAD still go through FileResponse
+    assert [m["type"] for m in request(headers=[("range", "bytes=2-5")])][-1] == "http.response.body"
+    assert [m["type"] for m in request(method="HEAD")][-1] == "http.response.body"
+
+
+def test_staging_directories_are_not_served(tmp_path):
+    (tmp_path / ".sessions").mkdir()
+    (tmp_path / ".sessions" / "partial.part").write_bytes(b"secret")
+
+    assert make_client(tmp_path).get("/uploads/.sessions/partial.part").status_code == 404
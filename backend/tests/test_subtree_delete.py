@@ -0,0 +1,69 @@
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models.note import Note
+from app.schemas.note import NoteCreate, NoteImportNode
+from app.services.note_service import NoteService
+
+
+def make_session():
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine, expire_on_commit=False)()
+
+
+def nested(depth, fanout):
+    if depth == 0:
+        return []
+    return [NoteImportNode(title=f"d{depth}", children=nested(depth - 1, fanout)) for _ in range(fanout)]
+
+
+def test_subtree_delete_is_one_statement_regardless_of_size():
+    db = make_session()
+    service = NoteService(db)
+    keep = service.create(NoteCreate(title="Keep"))
+    section = service.create(NoteCreate(title="Section"))
+    after = service.create(NoteCreate(title="After"))
+    service.bulk_import(nested(4, 4), parent_id=section.id)  # 340 descendants
+    db.expunge_all()
+
+    statements = []
+    event.listen(db.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+    assert service.delete(section.id)
+
+    deletes = [sql for sql in statements if sql.lstrip().upper().startswith("DELETE FROM NOTES")]
+    assert len(deletes) == 1
+    assert len(statements) < 15
+    assert not [obj for obj in db.identity_map.values() if isinstance(obj, Note) and obj.title.startswith("d")]
+    assert db.query(Note).count() == 2
+    assert [(n.id, n.position) for n in service.get_children(None)] == [(keep.id, 0), (after.id, 1)]
+    assert len(service.get_changes(since=0).deleted) == 341
+
+
+def test_reset_tombstones_every_note():
+    db = make_session()
+    service = NoteService(db)
+    service.bulk_import(nested(2, 3))
+    token = service.get_changes().token
+
+    service.delete_all_notes()
+
+    assert db.query(Note).count() == 0
+    assert len(service.get_changes(since=token).deleted) == 12
+
+
+def test_subtree_delete_tombstones_cascaded_rows_with_fk_enforcement():
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    event.listen(engine, "connect", lambda connection, _: connection.execute("PRAGMA foreign_keys=ON"))
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine, expire_on_commit=False)()
+    service = NoteService(db)
+    section = service.create(NoteCreate(title="Section"))
+    service.bulk_import(nested(3, 3), parent_id=section.id)  # 39 descendants
+    token = service.get_changes().token
+
+    assert service.delete(section.id)
+
+    assert db.query(Note).count() == 0
+    assert len(service.get_changes(since=token).deleted) == 40
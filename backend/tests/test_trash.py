@@ -0,0 +1,100 @@
+from datetime import timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models.note import Note
+from app.schemas.note import NoteCreate, NoteImportNode
+from app.services.note_service import NoteService
+
+
+def make_session():
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine, expire_on_commit=False)()
+
+
+def make_tree(service):
+    first = service.create(NoteCreate(title="First"))
+    section = service.create(NoteCreate(title="Section", content="findme"))
+    last = service.create(NoteCreate(title="Last"))
+    service.bulk_import([NoteImportNode(title="Child", children=[NoteImportNode(title="Grandchild")])], section.id)
+    return first, section, last
+
+
+def test_trashed_subtree_disappears_from_reads_but_keeps_its_rows():
+    db = make_session()
+    service = NoteService(db, delete_mode="trash")
+    first, section, last = make_tree(service)
+    token = service.get_changes().token
+
+    assert service.delete(section.id)
+
+    assert [(n.title, n.position) for n in service.get_children(None)] == [("First", 0), ("Last", 1)]
+    assert [n.title for n in service.get_all()] == ["First", "Last"]
+    assert service.get_by_id(section.id) is None
+    assert service.search("findme").items == []
+    assert len(service.get_changes(since=token).deleted) == 3
+    assert db.query(Note).count() == 5
+    assert [(n.id, n.title) for n in service.get_trash()] == [(section.id, "Section")]
+
+
+def test_restore_brings_back_only_what_was_trashed_together():
+    db = make_session()
+    service = NoteService(db, delete_mode="trash")
+    first, section, last = make_tree(service)
+    child = next(n for n in service.get_children(section.id))
+    service.delete(child.id)
+    service.delete(section.id)
+    assert {n.title for n in service.get_trash()} == {"Section", "Child"}
+
+    restored = service.restore(section.id)
+
+    assert restored.position == 2
+    assert [n.title for n in service.get_children(None)] == ["First", "Last", "Section"]
+    # Child was trashed on its own earlier and stays there
+    assert service.get_children(section.id) == []
+    assert [n.title for n in service.get_trash()] == ["Child"]
+    assert service.restore(section.id) is None
+
+
+def test_restore_under_a_purged_parent_goes_to_the_root():
+    db = make_session()
+    service = NoteService(db, delete_mode="trash")
+    first, section, last = make_tree(service)
+    child = service.get_children(section.id)[0]
+    service.delete(child.id)
+    service.delete(section.id)
+    service.restore(child.id)
+
+    restored = service.get_by_id(child.id)
+    assert restored.parent_id is None
+    assert restored.path == f"/{child.id}/"
+    assert [n.title for n in service.get_children(child.id)] == ["Grandchild"]
+
+
+def test_purge_removes_old_trash_in_batches_deepest_first():
+    db = make_session()
+    service = NoteService(db, delete_mode="trash")
+    section = service.create(NoteCreate(title="Section"))
+    pages = [NoteImportNode(title=f"P{i}", children=[NoteImportNode(title="Sub")]) for i in range(10)]
+    service.bulk_import(pages, section.id)
+    keep = service.create(NoteCreate(title="Keep"))
+    service.delete(section.id)
+
+    assert service.purge_trash(timedelta(days=1)) == 0
+    assert service.purge_trash(timedelta(0), batch_size=4) == 21
+
+    assert db.query(Note).count() == 1
+    assert service.get_trash() == []
+    assert service.get_by_id(keep.id) is not None
+
+
+def test_hard_mode_still_deletes_immediately():
+    db = make_session()
+    service = NoteService(db)
+    first, section, last = make_tree(service)
+    service.delete(section.id)
+    assert db.query(Note).count() == 2
+    assert service.get_trash() == []
@@ -0,0 +1,84 @@
+from datetime import timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models.upload import UploadBlob
+from app.schemas.note import NoteCreate, NoteImportNode, NoteUpdate
+from app.services.blob_service import BlobService, extract_blob_hashes
+from app.services.note_service import NoteService
+
+SHA_A = "a" * 64
+SHA_B = "b" * 64
+
+
+def make_session():
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine, expire_on_commit=False)()
+
+
+def url(sha: str) -> str:
+    return f"/uploads/{sha[:2]}/{sha[2:4]}/{sha}.png"
+
+
+def register(db, tmp_path, sha):
+    path = url(sha).removeprefix("/uploads/")
+    (tmp_path / path).parent.mkdir(parents=True, exist_ok=True)
+    (tmp_path / path).write_bytes(b"x")
+    return BlobService(db).register(sha, path, 1)
+
+
+def test_register_returns_existing_path_on_hash_hit(tmp_path):
+    db = make_session()
+
+    assert register(db, tmp_path, SHA_A) == (url(SHA_A).removeprefix("/uploads/"), False)
+    assert BlobService(db).register(SHA_A, "aa/aa/other.jpg", 1) == (url(SHA_A).removeprefix("/uploads/"), True)
+    assert db.query(UploadBlob).count() == 1
+
+
+def test_extract_blob_hashes_ignores_legacy_and_foreign_urls():
+    text = f"![a]({url(SHA_A)}) ![legacy](/uploads/0123abcd.png) {url(SHA_B)} {url(SHA_A)}"
+    assert extract_blob_hashes(text, None) == {SHA_A, SHA_B}
+
+
+def test_note_writes_maintain_reference_counts(tmp_path):
+    db = make_session()
+    register(db, tmp_path, SHA_A)
+    register(db, tmp_path, SHA_B)
+    service = NoteService(db)
+    blobs = BlobService(db)
+
+    note = service.create(NoteCreate(title="A", content=f"![img]({url(SHA_A)})"))
+    service.create(NoteCreate(title="B", sidenote=url(SHA_A)))
+    service.bulk_import([
+        NoteImportNode(title="C", content=url(SHA_B), children=[NoteImportNode(title="D", content=url(SHA_B))]),
+    ])
+    assert (blobs.ref_count(SHA_A), blobs.ref_count(SHA_B)) == (2, 2)
+
+    service.update(note.id, NoteUpdate(content=url(SHA_B)))
+    assert (blobs.ref_count(SHA_A), blobs.ref_count(SHA_B)) == (1, 3)
+
+    service.delete(note.id)
+    assert blobs.ref_count(SHA_B) == 2
+
+
+def test_garbage_collection_deletes_only_old_orphans(tmp_path):
+    db = make_session()
+    register(db, tmp_path, SHA_A)
+    register(db, tmp_path, SHA_B)
+    service = NoteService(db)
+    note = service.create(NoteCreate(title="A", content=url(SHA_A)))
+    blobs = BlobService(db)
+
+    # Within the grace period nothing goes, referenced or not
+    assert blobs.collect_garbage(tmp_path, grace=timedelta(hours=1)) == 0
+    assert blobs.collect_garbage(tmp_path, grace=timedelta(0)) == 1
+    assert not (tmp_path / url(SHA_B).removeprefix("/uploads/")).exists()
+    assert (tmp_path / url(SHA_A).removeprefix("/uploads/")).exists()
+
+    service.delete(note.id)
+    assert blobs.stats()["orphaned"] == 1
+    assert blobs.collect_garbage(tmp_path, grace=timedelta(0)) == 1
+    assert blobs.stats() == {"blobs": 0, "bytes": 0, "orphaned": 0}
@@ -0,0 +1,141 @@
+import asyncio
+import os
+import time
+import uuid
+
+import pytest
+
+from app.services.upload_service import UploadOffsetMismatch, UploadStore, UploadTooLarge
+
+
+async def chunks(*parts: bytes):
+    for part in parts:
+        yield part
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_save_stream_writes_file(tmp_path):
+    store = UploadStore(tmp_path, max_size=10)
+
+    stored = run(store.save_stream(chunks(b"hello", b" you"), "Photo.PNG"))
+
+    assert stored.name.endswith(".png")
+    assert stored.size == 9
+    assert (tmp_path / stored.name).read_bytes() == b"hello you"
+
+
+def test_save_stream_aborts_past_limit_and_cleans_up(tmp_path):
+    store = UploadStore(tmp_path, max_size=8)
+    consumed = []
+
+    async def body():
+        for part in (b"12345", b"67890", b"never read"):
+            consumed.append(part)
+            yield part
+
+    with pytest.raises(UploadTooLarge):
+        run(store.save_stream(body(), "big.jpg"))
+
+    assert len(consumed) == 2
+    assert [path for path in tmp_path.rglob("*") if path.is_file()] == []
+
+
+def test_resumable_session_round_trip(tmp_path):
+    store = UploadStore(tmp_path, max_size=4, max_session_size=100)
+    session = run(store.create_session("large.heic", 10))
+
+    run(store.write_chunk(session.id, 0, chunks(b"01234")))
+    with pytest.raises(UploadOffsetMismatch) as exc:
+        run(store.write_chunk(session.id, 0, chunks(b"01234")))
+    assert exc.value.received == 5
+    with pytest.raises(ValueError):
+        run(store.complete_session(session.id))
+
+    assert run(store.get_session(session.id)).received == 5
+    run(store.write_chunk(session.id, 5, chunks(b"56", b"789")))
+    stored = run(store.complete_session(session.id))
+
+    assert (tmp_path / stored.name).read_bytes() == b"0123456789"
+    assert run(store.get_session(session.id)) is None
+
+
+def test_session_chunk_past_declared_size_is_rolled_back(tmp_path):
+    store = UploadStore(tmp_path, max_size=4, max_session_size=100)
+    session = run(store.create_session("a.png", 6))
+    run(store.write_chunk(session.id, 0, chunks(b"abc")))
+
+    with pytest.raises(UploadTooLarge):
+        run(store.write_chunk(session.id, 3, chunks(b"de", b"fgh")))
+
+    assert run(store.get_session(session.id)).received == 3
+    with pytest.raises(UploadTooLarge):
+        run(store.create_session("huge.png", 101))
+    assert run(store.get_session("../../etc/passwd")) is None
+
+
+def test_identical_content_is_stored_once_under_sharded_path(tmp_path):
+    store = UploadStore(tmp_path, max_size=100)
+
+    first = run(store.save_stream(chunks(b"same ", b"bytes"), "one.png"))
+    second = run(store.save_stream(chunks(b"same bytes"), "two.png"))
+
+    assert first.name == second.name == f"{first.sha256[:2]}/{first.sha256[2:4]}/{first.sha256}.png"
+    assert not first.deduplicated and second.deduplicated
+    assert [path for path in tmp_path.rglob("*") if path.is_file()] == [tmp_path / first.name]
+
+
+def test_concurrent_ranges_at_one_offset_are_serialized(tmp_path):
+    store = UploadStore(tmp_path, max_size=4, max_session_size=100)
+
+    async def slow(*parts: bytes):
+        for part in parts:
+            await asyncio.sleep(0.01)
+            yield part
+
+    async def scenario():
+        session = await store.create_session("a.bin", 6)
+        return session, await asyncio.gather(
+            store.write_chunk(session.id, 0, slow(b"aa", b"aa", b"aa")),
+            store.write_chunk(session.id, 0, slow(b"bb", b"bb", b"bb")),
+            return_exceptions=True,
+        )
+
+    session, results = run(scenario())
+    assert isinstance(results[1], UploadOffsetMismatch)
+    assert (tmp_path / ".sessions" / f"{session.id}.part").read_bytes() == b"aaaaaa"
+
+
+def test_probing_unknown_sessions_leaves_no_locks_behind(tmp_path):
+    store = UploadStore(tmp_path, max_size=4, max_session_size=100)
+
+    async def scenario():
+        for _ in range(20):
+            session_id = uuid.uuid4().hex
+            assert await store.write_chunk(session_id, 0, chunks(b"x")) is None
+            assert await store.complete_session(session_id) is None
+            assert not await store.abort_session(session_id)
+        session = await store.create_session("a.bin", 2)
+        await store.write_chunk(session.id, 0, chunks(b"ab"))
+        assert await store.complete_session(session.id) is not None
+
+    run(scenario())
+    assert store._session_locks == {}
+
+
+def test_expire_sessions_removes_only_idle_sessions_and_stray_temp_files(tmp_path):
+    store = UploadStore(tmp_path, max_size=4, max_session_size=100)
+    idle = run(store.create_session("old.bin", 10))
+    active = run(store.create_session("new.bin", 10))
+    stray = tmp_path / ".tmp" / "deadbeef"
+    stray.write_bytes(b"partial")
+    old = time.time() - 7200
+    for path in [*tmp_path.glob(f".sessions/{idle.id}.*"), stray]:
+        os.utime(path, (old, old))
+
+    assert run(store.expire_sessions(3600)) == 1
+    assert run(store.get_session(idle.id)) is None
+    assert run(store.get_session(active.id)) is not None
+    assert not stray.exists()
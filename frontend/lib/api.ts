@@ -1,7 +1,7 @@
-import type { Note, NoteCreate, NoteUpdate, NoteReorder, NoteTreeNode } from "@/types/note";
+import type { Note, NoteCreate, NoteUpdate, NoteReorder, NoteMove, NoteTreeNode } from "@/types/note";
 
 // Re-export types for convenience
-export type { Note, NoteCreate, NoteUpdate, NoteReorder, NoteTreeNode } from "@/types/note";
+export type { Note, NoteCreate, NoteUpdate, NoteReorder, NoteMove, NoteTreeNode } from "@/types/note";
 
 export function getApiUrl(): string {
   if (typeof window === "undefined") {
@@ -56,6 +56,21 @@ export async function reorderNote(id: string, data: NoteReorder): Promise<Note>
   return res.json();
 }
 
+/**
+ * Apply several moves in one request/transaction (applied in order).
+ */
+export async function bulkReorderNotes(moves: NoteMove[]): Promise<Note[]> {
+  const res = await fetch(`${getApiUrl()}/api/notes/reorder`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ moves }),
+  });
+  if (!res.ok) {
+    throw new Error("Failed to reorder notes");
+  }
+  return res.json();
+}
+
 export async function deleteNote(id: string): Promise<void> {
   const res = await fetch(`${getApiUrl()}/api/notes/${id}`, {
     method: "DELETE",
@@ -29,6 +29,10 @@ export interface NoteReorder {
   position: number;
 }
 
+export interface NoteMove extends NoteReorder {
+  id: string;
+}
+
 // Tree structure for sidebar
 export interface NoteTreeNode extends Note {
   children: NoteTreeNode[];